@@ -0,0 +1,428 @@
+# api.py - 스케줄/재생 상태 HTTP API (ASGI)
+# 실행: uvicorn api:app --host 0.0.0.0 --port 8000
+import asyncio
+import hashlib
+import json
+import re
+from urllib.parse import parse_qs, urlencode
+
+from database.schedule_db import (
+    init_db,
+    add_schedule,
+    get_schedule,
+    list_schedules,
+    search_schedules,
+    get_schedule_version,
+    delete_schedule,
+    update_schedule,
+    toggle_schedule,
+    is_youtube_url,
+    parse_schedule_time,
+    get_current_video,
+    set_current_video,
+    clear_current_video)
+from database.catalog import search_catalog
+from database.connection import (
+    CONFIGURED_TENANTS,
+    TENANT_TOKENS,
+    get_tenant,
+    is_configured_tenant,
+    tenant_for_token,
+    use_tenant,
+    validate_tenant)
+from database.conflicts import ScheduleConflict
+from database.prefetch import PREFETCH_COUNT, PREFETCH_LOOKAHEAD, get_upcoming
+from database.kiosk import HEARTBEAT_INTERVAL, NowPlayingBroadcaster, render_player_page
+from database.search_client import SearchUnavailable
+from database.youtube_search import search_with_status
+
+MAX_PAGE_SIZE = 200
+FILE_TYPES = ('youtube', 'local', 'html')
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class Request:
+    def __init__(self, scope, body):
+        self.scope = scope
+        self.method = scope['method']
+        self.path = scope['path']
+        self.query = {k: v[-1] for k, v in parse_qs(scope.get('query_string', b'').decode()).items()}
+        self.headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope.get('headers', [])}
+        self.body = body
+        self.token = None
+        self.tenant, self.tenant_error = self._resolve_tenant()
+
+    def _resolve_tenant(self):
+        """Return (tenant, None) or (None, HTTPError) for the tenant this request may use.
+
+        With TENANT_TOKENS set the tenant comes from the bearer token
+        (``Authorization: Bearer ...``, or ``?token=`` for EventSource and the
+        player page, which cannot send headers); X-Tenant / ?tenant= may only
+        repeat it. Without tokens any client can pick any tenant listed in
+        TENANTS, so tenants are separated but not protected from each other.
+        """
+        # 테넌트: X-Tenant 헤더 (EventSource / 플레이어 페이지는 헤더를 못 보내므로 ?tenant= 도 허용)
+        requested = self.headers.get('x-tenant') or self.query.get('tenant')
+        if TENANT_TOKENS:
+            scheme, _, token = self.headers.get('authorization', '').partition(' ')
+            token = token.strip() if scheme.lower() == 'bearer' else self.query.get('token')
+            self.token = token
+            tenant = tenant_for_token(token)
+            if tenant is None:
+                return None, HTTPError(401, 'missing or invalid token')
+            if requested and requested != tenant:
+                return None, HTTPError(403, f'token does not grant tenant {requested!r}')
+            return tenant, None
+        if not requested:
+            return get_tenant(), None
+        try:
+            tenant = validate_tenant(requested)
+        except ValueError as e:
+            return None, HTTPError(400, str(e))
+        # 목록에 없는 이름으로 새 데이터베이스를 만들지 않음
+        if not is_configured_tenant(tenant):
+            return None, HTTPError(404, f'unknown tenant {tenant!r}')
+        return tenant, None
+
+    def json(self):
+        try:
+            data = json.loads(self.body or b'{}')
+        except ValueError:
+            raise HTTPError(400, 'invalid JSON body')
+        if not isinstance(data, dict):
+            raise HTTPError(400, 'JSON body must be an object')
+        return data
+
+    def int_query(self, name, default, minimum=0, maximum=None):
+        try:
+            value = int(self.query.get(name, default))
+        except ValueError:
+            raise HTTPError(400, f'{name} must be an integer')
+        if value < minimum or (maximum is not None and value > maximum):
+            raise HTTPError(400, f'{name} out of range')
+        return value
+
+class Response:
+    def __init__(self, status=200, data=None, etag=None, headers=None, body=None,
+                 content_type='application/json; charset=utf-8'):
+        self.status = status
+        self.etag = etag
+        self.headers = dict(headers or {})
+        self.content_type = content_type
+        if body is not None:
+            self.body = body
+        elif data is not None:
+            self.body = json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+        else:
+            self.body = b''
+
+def _etag_for(data):
+    return '"' + hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16] + '"'
+
+def not_modified(request, etag):
+    if_none_match = request.headers.get('if-none-match', '')
+    return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+
+def conditional(request, etag, build):
+    """Answer 304 when the client already has ``etag``; otherwise build the response"""
+    if not_modified(request, etag):
+        return Response(304, etag=etag)
+    response = build()
+    response.etag = etag
+    return response
+
+async def run_db(func, *args):
+    # sqlite 작업은 스레드에서 실행 (연결은 database.connection 의 풀에서 재사용)
+    return await asyncio.to_thread(func, *args)
+
+def _validate_schedule(data):
+    schedule_time = data.get('schedule_time')
+    file_path = data.get('file_path')
+    file_type = data.get('file_type', 'youtube')
+    title = data.get('title')
+    # UI 와 같은 검사 (parse_schedule_time) - 저장 형식 HH:MM 으로 맞춤
+    try:
+        schedule_time = parse_schedule_time(schedule_time if isinstance(schedule_time, str) else None)[0]
+    except ValueError:
+        raise HTTPError(422, 'schedule_time must be HH:MM (UTC)')
+    if not file_path or not title:
+        raise HTTPError(422, 'file_path and title are required')
+    if file_type not in FILE_TYPES:
+        raise HTTPError(422, f'file_type must be one of {", ".join(FILE_TYPES)}')
+    if file_type == 'youtube' and not is_youtube_url(file_path):
+        raise HTTPError(422, 'file_path is not a YouTube URL')
+    duration_seconds = data.get('duration_seconds')
+    priority = data.get('priority')
+    if duration_seconds is not None and (not isinstance(duration_seconds, int) or duration_seconds < 0):
+        raise HTTPError(422, 'duration_seconds must be a non-negative integer')
+    if priority is not None and not isinstance(priority, int):
+        raise HTTPError(422, 'priority must be an integer')
+    return schedule_time, file_path, file_type, title, duration_seconds, priority
+
+# 핸들러
+async def list_schedules_handler(request):
+    limit = request.int_query('limit', 50, minimum=1, maximum=MAX_PAGE_SIZE)
+    offset = request.int_query('offset', 0)
+    version = await run_db(get_schedule_version)
+    etag = f'W/"schedules-{request.tenant}-{version}-{limit}-{offset}"'
+    if not_modified(request, etag):
+        return Response(304, etag=etag)
+    items, total = await run_db(list_schedules, limit, offset)
+    next_offset = offset + limit if offset + limit < total else None
+    return Response(data={'items': items, 'total': total, 'limit': limit,
+                          'offset': offset, 'next_offset': next_offset}, etag=etag)
+
+async def search_schedules_handler(request):
+    query = request.query.get('q', '').strip()
+    if not query:
+        raise HTTPError(422, 'q is required')
+    limit = request.int_query('limit', 50, minimum=1, maximum=MAX_PAGE_SIZE)
+    items = await run_db(search_schedules, query, limit)
+    return Response(data={'query': query, 'items': items})
+
+async def search_catalog_handler(request):
+    query = request.query.get('q', '').strip()
+    if not query:
+        raise HTTPError(422, 'q is required')
+    limit = request.int_query('limit', 20, minimum=1, maximum=MAX_PAGE_SIZE)
+    items = await run_db(search_catalog, query, limit)
+    return Response(data={'query': query, 'items': items})
+
+async def get_schedule_handler(request, schedule_id):
+    schedule = await run_db(get_schedule, int(schedule_id))
+    if schedule is None:
+        raise HTTPError(404, 'schedule not found')
+    return conditional(request, _etag_for(schedule), lambda: Response(data=schedule))
+
+async def create_schedule_handler(request):
+    schedule_time, file_path, file_type, title, duration_seconds, priority = _validate_schedule(request.json())
+    try:
+        schedule_id = await run_db(add_schedule, schedule_time, file_path, file_type, title,
+                                   duration_seconds, priority or 0)
+    except ScheduleConflict as e:
+        raise HTTPError(409, str(e))
+    schedule = await run_db(get_schedule, schedule_id)
+    return Response(201, data=schedule, headers={'location': f'/schedules/{schedule_id}'})
+
+async def update_schedule_handler(request, schedule_id):
+    schedule_id = int(schedule_id)
+    if await run_db(get_schedule, schedule_id) is None:
+        raise HTTPError(404, 'schedule not found')
+    schedule_time, file_path, file_type, title, duration_seconds, priority = _validate_schedule(request.json())
+    try:
+        await run_db(update_schedule, schedule_id, schedule_time, file_path, file_type, title,
+                     duration_seconds, priority)
+    except ScheduleConflict as e:
+        raise HTTPError(409, str(e))
+    return Response(data=await run_db(get_schedule, schedule_id))
+
+async def patch_schedule_handler(request, schedule_id):
+    schedule_id = int(schedule_id)
+    data = request.json()
+    if 'is_active' not in data:
+        raise HTTPError(422, 'only is_active can be patched')
+    if await run_db(get_schedule, schedule_id) is None:
+        raise HTTPError(404, 'schedule not found')
+    await run_db(toggle_schedule, schedule_id, 1 if data['is_active'] else 0)
+    return Response(data=await run_db(get_schedule, schedule_id))
+
+async def delete_schedule_handler(request, schedule_id):
+    schedule_id = int(schedule_id)
+    if await run_db(get_schedule, schedule_id) is None:
+        raise HTTPError(404, 'schedule not found')
+    await run_db(delete_schedule, schedule_id)
+    return Response(204)
+
+async def search_handler(request):
+    query = request.query.get('q', '').strip()
+    if not query:
+        raise HTTPError(422, 'q is required')
+    limit = request.int_query('limit', 10, minimum=1, maximum=50)
+    try:
+        results, status = await asyncio.to_thread(search_with_status, query, limit)
+    except SearchUnavailable as e:
+        raise HTTPError(503, f'search unavailable: {e}')
+    except Exception as e:
+        raise HTTPError(502, f'search failed: {e}')
+    return Response(data={'query': query, 'items': results, 'status': status})
+
+async def get_now_playing_handler(request):
+    video = await run_db(get_current_video)
+    return conditional(request, _etag_for(video), lambda: Response(data={'current_video': video}))
+
+async def set_now_playing_handler(request):
+    data = request.json()
+    if not data.get('file_path') or not data.get('title'):
+        raise HTTPError(422, 'file_path and title are required')
+    await run_db(set_current_video, data['file_path'], data['title'])
+    return Response(data={'current_video': await run_db(get_current_video)})
+
+async def clear_now_playing_handler(request):
+    await run_db(clear_current_video)
+    return Response(204)
+
+async def player_handler(request):
+    # EventSource 는 헤더를 못 보내므로 테넌트 / 토큰을 주소에 넣음
+    params = {'token': request.token} if TENANT_TOKENS else {'tenant': request.tenant}
+    events_url = f'/events?{urlencode(params)}'
+    return Response(body=render_player_page(events_url).encode('utf-8'),
+                    content_type='text/html; charset=utf-8',
+                    headers={'cache-control': 'no-cache'})
+
+# 테넌트별 재생 상태 감시 (설정된 테넌트마다 최대 하나)
+broadcasters = {}
+
+def get_broadcaster(tenant):
+    broadcaster = broadcasters.get(tenant)
+    if broadcaster is None:
+        broadcaster = broadcasters[tenant] = NowPlayingBroadcaster()
+    return broadcaster
+
+class StreamResponse:
+    """Marker for handlers that write their own streaming body"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+async def events_handler(request):
+    broadcaster = get_broadcaster(request.tenant)
+
+    async def stream(send, disconnected):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ]})
+        async with broadcaster.listen():
+            version = broadcaster.version
+            # 재연결 대기 시간 힌트 + 현재 상태 (연결하자마자 전송)
+            await send({'type': 'http.response.body', 'more_body': True,
+                        'body': b'retry: 3000\n' + broadcaster.events_since(0)})
+            while not disconnected.is_set():
+                if await broadcaster.wait_for_change(version, timeout=HEARTBEAT_INTERVAL):
+                    body = broadcaster.events_since(version)
+                    version = broadcaster.version
+                else:
+                    body = b': heartbeat\n\n'
+                await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    return StreamResponse(stream)
+
+async def upcoming_handler(request):
+    count = request.int_query('count', PREFETCH_COUNT, minimum=1, maximum=50)
+    lookahead = request.int_query('lookahead', PREFETCH_LOOKAHEAD, minimum=1, maximum=86400)
+    items = await run_db(get_upcoming, count, lookahead)
+    return conditional(request, _etag_for(items), lambda: Response(data={'items': items}))
+
+ROUTES = [
+    ('GET', re.compile(r'^/schedules$'), list_schedules_handler),
+    ('POST', re.compile(r'^/schedules$'), create_schedule_handler),
+    ('GET', re.compile(r'^/schedules/search$'), search_schedules_handler),
+    ('GET', re.compile(r'^/schedules/(\d+)$'), get_schedule_handler),
+    ('PUT', re.compile(r'^/schedules/(\d+)$'), update_schedule_handler),
+    ('PATCH', re.compile(r'^/schedules/(\d+)$'), patch_schedule_handler),
+    ('DELETE', re.compile(r'^/schedules/(\d+)$'), delete_schedule_handler),
+    ('GET', re.compile(r'^/search$'), search_handler),
+    ('GET', re.compile(r'^/catalog/search$'), search_catalog_handler),
+    ('GET', re.compile(r'^/now-playing$'), get_now_playing_handler),
+    ('PUT', re.compile(r'^/now-playing$'), set_now_playing_handler),
+    ('DELETE', re.compile(r'^/now-playing$'), clear_now_playing_handler),
+    ('GET', re.compile(r'^/upcoming$'), upcoming_handler),
+    ('GET', re.compile(r'^/player$'), player_handler),
+    ('GET', re.compile(r'^/events$'), events_handler),
+]
+
+def _route(method, path):
+    allowed = []
+    for route_method, pattern, handler in ROUTES:
+        match = pattern.match(path)
+        if match:
+            if route_method == method or (method == 'HEAD' and route_method == 'GET'):
+                return handler, match.groups()
+            allowed.append(route_method)
+    if allowed:
+        raise HTTPError(405, 'method not allowed')
+    raise HTTPError(404, 'not found')
+
+async def _read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+async def _send(send, response, head=False):
+    headers = [(b'content-type', response.content_type.encode())]
+    if response.etag:
+        headers.append((b'etag', response.etag.encode()))
+        headers.append((b'cache-control', b'no-cache'))
+    for name, value in response.headers.items():
+        headers.append((name.lower().encode('latin-1'), str(value).encode('latin-1')))
+    # 같은 URL 이라도 테넌트마다 내용이 다름
+    headers.append((b'vary', b'X-Tenant, Authorization'))
+    body = b'' if response.status in (204, 304) or head else response.body
+    headers.append((b'content-length', str(len(body) if not head else len(response.body)).encode()))
+    await send({'type': 'http.response.start', 'status': response.status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+# 설정된 테넌트의 데이터베이스를 시작할 때 모두 준비 (요청으로는 새 데이터베이스를 만들지 않음)
+async def _init_tenant_dbs():
+    for tenant in sorted(CONFIGURED_TENANTS):
+        with use_tenant(tenant):
+            await run_db(init_db)
+
+async def app(scope, receive, send):
+    """ASGI entry point"""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await _init_tenant_dbs()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    request = Request(scope, await _read_body(receive))
+    if request.tenant is None:
+        error = request.tenant_error
+        await _send(send, Response(error.status, data={'error': error.message}))
+        return
+    # 이 요청의 모든 DB 작업 (run_db 스레드 포함) 은 요청한 테넌트의 데이터베이스로 감
+    with use_tenant(request.tenant):
+        try:
+            handler, args = _route(request.method, request.path)
+            response = await handler(request, *args)
+        except HTTPError as e:
+            response = Response(e.status, data={'error': e.message})
+        except Exception as e:
+            print(f"API error: {e}")
+            response = Response(500, data={'error': 'internal error'})
+        if isinstance(response, StreamResponse):
+            await _stream(response, receive, send)
+            return
+        await _send(send, response, head=request.method == 'HEAD')
+
+async def _stream(response, receive, send):
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                disconnected.set()
+                return
+
+    watcher = asyncio.create_task(watch_disconnect())
+    writer = asyncio.create_task(response.stream(send, disconnected))
+    # 클라이언트가 끊기면 대기 중인 스트림도 바로 정리
+    await asyncio.wait({watcher, writer}, return_when=asyncio.FIRST_COMPLETED)
+    for task in (watcher, writer):
+        task.cancel()
+    await asyncio.gather(watcher, writer, return_exceptions=True)
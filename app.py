@@ -1,26 +1,59 @@
+import time as time_module
+_script_started = time_module.perf_counter()
+
 import streamlit as st
 import streamlit.components.v1 as components
 from datetime import datetime, time
 import threading
-import time as time_module
 import os
 import json
 import re
-import sqlite3
-import scrapetube
 
 from database.schedule_db import (
     init_db, 
     add_schedule, 
+    add_schedules,
+    space_schedule_times,
     get_schedules,
+    search_schedules,
+    get_conflicting_ids,
+    get_schedule,
     delete_schedule, 
     update_schedule, 
     toggle_schedule,
     is_youtube_url,
+    is_schedule_time,
     get_current_video,
     clear_current_video,
     set_current_video,
     check_schedule_once)
+from database.backup import start_backup_worker
+from database.conflicts import CONFLICT_POLICY, ScheduleConflict
+from database.connection import get_tenant, is_configured_tenant, set_tenant, validate_tenant
+from database.catalog import (
+    start_sync_worker,
+    add_subscription,
+    delete_subscription,
+    get_subscriptions,
+    sync_subscription,
+    search_catalog)
+from database.media_library import (
+    start_library,
+    search_media,
+    media_exists,
+    get_broken_schedules)
+from database.media_server import MEDIA_SERVER_URL, start_media_server
+from database.youtube_search import search_with_status, search_many, split_queries, process_results
+from database.search_client import SearchUnavailable
+from database.scheduler import SchedulerEngine
+from database.timeline import get_schedule_arrays, get_timeline_view
+from database.prefetch import get_upcoming, prefetch_tags
+from database.profiling import SLOW_STAGE_MS, start_profiler
+from database.startup_profile import RenderTimer, is_enabled as startup_profile_enabled
+from database.play_history import (
+    get_fires_per_hour,
+    get_lateness_percentiles,
+    get_missed_schedules)
 
 # 페이지 설정
 st.set_page_config(
@@ -33,57 +66,47 @@ st.set_page_config(
     }
 )
 
-# 비디오 재생 체크 (백그라운드)
+# 실행 단계별 프로파일링 (?profile=1 | cprofile | pyinstrument 또는 APP_PROFILE)
+# 이전 실행이 st.rerun / st.stop 으로 중간에 끝났으면 거기까지 기록
+if st.session_state.get('rerun_profiler') is not None:
+    st.session_state.rerun_profiler.abandon()
+    st.session_state.rerun_profiler.dump()
+profiler = start_profiler(st.query_params.get('profile'), _script_started,
+                          label=st.query_params.get('screen') or '')
+st.session_state.rerun_profiler = profiler if profiler.enabled else None
+profiler.begin("session init")
+
+# 비디오 재생 체크 (백그라운드) - check_schedule_once 와 같은 스케줄러 엔진으로 매 분 확인
 def check_schedule():
-    while True:
-        try:
-            current_time = datetime.now().strftime("%H:%M")
-            conn = sqlite3.connect('video_schedule.db')
-            c = conn.cursor()
-            
-            # 현재 시간과 일치하는 활성화된 스케줄 찾기
-            c.execute('''
-                SELECT * FROM schedules 
-                WHERE schedule_time = ? AND is_active = 1
-            ''', (current_time,))
-            
-            schedules = c.fetchall()
-            
-            for schedule in schedules:
-                schedule_id, _, file_path, file_type, title, _, _, last_played = schedule
-                
-                # 같은 시간대에 이미 재생되었는지 확인 (last_played와 current_time 비교)
-                if last_played != current_time:
-                    # 재생 처리
-                    if file_type == 'youtube':
-                        # Use embedded player for Streamlit Cloud
-                        set_current_video(file_path, title)
-                    elif file_type == 'local':
-                        if os.path.exists(file_path):
-                            if os.name == 'nt':
-                                os.startfile(file_path)
-                            else:
-                                os.system(f'open "{file_path}"')
-                    elif file_type == "html":
-                        # Use embedded display for HTML files
-                        set_current_video(f'file://{os.path.abspath(file_path)}', title)
-                    
-                    # 데이터베이스에 재생 시간 업데이트
-                    c.execute('UPDATE schedules SET last_played = ? WHERE id = ?', (current_time, schedule_id))
-                    conn.commit()
-            
-            conn.close()
-            
-        except Exception as e:
-            print(f"스케줄 체크 오류: {e}")
-        
-        # 30초마다 체크
-        time_module.sleep(60)
+    SchedulerEngine(screen='background').run()
+
+# 테넌트(사용자) 선택 - ?tenant=이름 으로 지정, 세션 동안 유지
+# 스케줄 / 재생 상태는 테넌트마다 별도 데이터베이스에 저장되므로 매 실행마다 연결 경로를 설정
+if 'tenant' not in st.session_state:
+    try:
+        tenant = validate_tenant(st.query_params.get('tenant') or get_tenant())
+    except ValueError:
+        st.error("❌ 잘못된 테넌트 이름입니다 (영문 소문자, 숫자, '-', '_' 만 사용, 최대 32자)")
+        st.stop()
+    # 설정된 테넌트만 사용 (주소만 바꿔 새 데이터베이스를 만들지 않도록)
+    if not is_configured_tenant(tenant):
+        st.error(f"❌ 등록되지 않은 테넌트입니다: {tenant} (TENANTS 환경 변수에 추가하세요)")
+        st.stop()
+    st.session_state.tenant = tenant
+set_tenant(st.session_state.tenant)
 
 # 세션 상태 초기화
 if 'scheduler_started' not in st.session_state:
     st.session_state.scheduler_started = False
     init_db()
+    # 로컬 미디어 폴더 색인 및 감시 시작 (MEDIA_DIRS 설정 시)
+    start_library()
+    # 로컬 HTML/비디오 파일을 페이지에서 재생하기 위한 미디어 서버
+    start_media_server()
+    # 구독한 채널/재생목록 백그라운드 동기화
+    start_sync_worker()
+    # 데이터베이스 자동 스냅샷 (BACKUP_INTERVAL 초마다, 쓰기를 멈추지 않음)
+    start_backup_worker()
     # 백그라운드 스케줄러 시작 (local only - unreliable on Streamlit Cloud)
     # Instead, we'll check schedule synchronously on each app run
     # scheduler_thread = threading.Thread(target=check_schedule, daemon=True)
@@ -94,8 +117,13 @@ if 'scheduler_started' not in st.session_state:
 if 'current_video' not in st.session_state:
     st.session_state.current_video = None
 
+# 화면 식별자 (재생 기록용) - ?screen=lobby 처럼 지정 가능
+if 'screen_id' not in st.session_state:
+    st.session_state.screen_id = st.query_params.get('screen') or f"session-{os.urandom(3).hex()}"
+
 # Check schedule synchronously on every run (Streamlit Cloud compatible)
-check_schedule_once(st.session_state)
+with profiler.stage("check_schedule_once"):
+    check_schedule_once(st.session_state, st.session_state.screen_id)
 
 # Timezone info for users
 if 'timezone_offset' not in st.session_state:
@@ -112,6 +140,7 @@ st.sidebar.markdown(f"**⏰ Time Info:**")
 st.sidebar.caption(f"🌍 Server (UTC): {current_utc}")
 st.sidebar.caption(f"🏠 Your Time (UTC+{st.session_state.timezone_offset}): {current_local}")
 st.sidebar.caption(f"💡 Schedule videos using YOUR local time")
+st.sidebar.caption(f"👤 테넌트: {st.session_state.tenant}")
 
 # 편집 모드 세션 상태 초기화
 if 'editing_id' not in st.session_state:
@@ -156,10 +185,43 @@ def utc_to_local(utc_time_str, offset_hours):
     except:
         return utc_time_str
 
+# 스케줄 추가 결과 메시지 ('queue' 정책으로 시간이 옮겨졌으면 알려줌)
+def added_message(schedule_id, title, utc_time):
+    stored_time = get_schedule(schedule_id)['schedule_time']
+    local_time = utc_to_local(stored_time, st.session_state.timezone_offset)
+    if stored_time != utc_time:
+        return f"✅ '{title}' 스케줄이 다른 스케줄과 겹치지 않도록 서울 시간 {local_time} (UTC {stored_time})로 옮겨 추가되었습니다!"
+    return f"✅ '{title}' 스케줄이 서울 시간 {local_time} (UTC {stored_time})에 추가되었습니다!"
+
+# 미디어 라이브러리에서 파일 선택 (직접 입력도 가능)
+def pick_media_file(label, placeholder, key):
+    """Search the local media index and return the chosen or typed path"""
+    query = st.text_input(f"{label} 검색", placeholder="파일 이름 일부를 입력하세요", key=f"{key}_query")
+    matches = search_media(query, limit=20)
+    if matches:
+        options = ["(직접 입력)"] + [path for path, _, _, _ in matches]
+        choice = st.selectbox(label, options, key=f"{key}_choice",
+                              format_func=lambda p: p if p == "(직접 입력)" else os.path.basename(p))
+        if choice != "(직접 입력)":
+            st.caption(f"📁 {choice}")
+            return choice
+    return st.text_input(label, placeholder=placeholder, key=key)
+
 # UI
 st.title("🎬 비디오 스케줄러")
 
+# 시작 프로파일링 (STARTUP_PROFILE=1): 첫 렌더링까지 걸린 시간
+if startup_profile_enabled():
+    render_timer = RenderTimer(_script_started)
+    first_render_ms = render_timer.mark_first_render()
+    print(f"[STARTUP] first render after {first_render_ms:.0f} ms")
+    if render_timer.over_budget():
+        st.sidebar.warning(f"🐢 첫 렌더링 {first_render_ms:.0f} ms (예산 초과)")
+    else:
+        st.sidebar.caption(f"⚡ 첫 렌더링 {first_render_ms:.0f} ms")
+
 # Check if there's a current video to play
+profiler.begin("now playing")
 current_video = get_current_video()
 if current_video:
     # Handle both old format (url) and new format (file_path)
@@ -199,6 +261,19 @@ if current_video:
         """
         components.html(youtube_embed, height=450)
         
+        if st.button("⏹️ 재생 중지", width='stretch'):
+            clear_current_video(st.session_state)
+            st.rerun()
+    elif video_url.startswith(MEDIA_SERVER_URL):
+        # 내장 미디어 서버로 스트리밍되는 로컬 파일 (HTML 또는 비디오)
+        if video_url.lower().endswith(('.html', '.htm')):
+            components.iframe(video_url, height=450)
+        else:
+            components.html(f"""
+            <video src="{video_url}" controls autoplay playsinline preload="metadata"
+                   style="width: 100%; max-height: 440px; background: #000;"></video>
+            """, height=450)
+        
         if st.button("⏹️ 재생 중지", width='stretch'):
             clear_current_video(st.session_state)
             st.rerun()
@@ -210,16 +285,21 @@ if current_video:
 
 st.markdown("---")
 
+# 이전 실행에서 남긴 완료 메시지 (추가 후 바로 rerun 하므로 여기서 표시 - 모든 탭 공통)
+if st.session_state.get('flash_message'):
+    st.success(st.session_state.pop('flash_message'))
+
 # 탭 구성
-tab1, tab2, tab3 = st.tabs(["🔍 YouTube 검색", "📅 스케줄 추가", "📋 스케줄 목록"])
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["🔍 YouTube 검색", "📅 스케줄 추가", "📋 스케줄 목록", "📊 재생 기록", "📡 구독"])
 
+profiler.begin("tab1 search")
 with tab1:
     st.header("YouTube 비디오 검색")
-    
     # 검색 입력
     search_col1, search_col2 = st.columns([4, 1])
     with search_col1:
-        search_query = st.text_input("검색어를 입력하세요", placeholder="예: 요가 운동", key="youtube_search")
+        search_query = st.text_input("검색어를 입력하세요", placeholder="예: 요가 운동 (여러 개는 쉼표로: 요가, 음악, 뉴스)",
+                                     key="youtube_search")
     with search_col2:
         st.write("")
         st.write("")
@@ -227,42 +307,103 @@ with tab1:
     
     # 검색 실행
     if search_button and search_query:
-        with st.spinner("검색 중..."):
-            try:
-                # scrapetube를 사용하여 YouTube 검색
-                videos = scrapetube.get_search(search_query, limit=10)
-                results = []
-                
-                for video in videos:
-                    video_id = video.get('videoId')
-                    if video_id:
-                        video_data = {
-                            'title': video.get('title', {}).get('runs', [{}])[0].get('text', 'No Title'),
-                            'link': f'https://www.youtube.com/watch?v={video_id}',
-                            'videoId': video_id,
-                            'thumbnails': [{'url': f'https://i.ytimg.com/vi/{video_id}/hqdefault.jpg'}],
-                            'channel': {
-                                'name': video.get('longBylineText', {}).get('runs', [{}])[0].get('text', 'Unknown')
-                            },
-                            'duration': video.get('lengthText', {}).get('simpleText', 'N/A'),
-                            'viewCount': {
-                                'short': video.get('shortViewCountText', {}).get('simpleText', 'N/A')
-                            }
-                        }
-                        results.append(video_data)
-                
-                st.session_state.search_results = results
-                st.success(f"✅ {len(st.session_state.search_results)}개의 결과를 찾았습니다!")
-            except Exception as e:
-                st.error(f"검색 중 오류가 발생했습니다: {e}")
-                st.session_state.search_results = []
+        queries = split_queries(search_query)
+        if len(queries) > 1:
+            # 여러 검색어는 동시에 검색해서 합침 (가장 느린 검색 하나만큼만 기다림)
+            with st.spinner(f"{len(queries)}개 검색어 검색 중..."):
+                results, errors = search_many(queries, limit=10)
+            st.session_state.search_results = results
+            for query, error in errors.items():
+                st.warning(f"⚠️ '{query}' 검색 실패: {error}")
+            if results:
+                st.success(f"✅ {len(queries) - len(errors)}개 검색어로 {len(results)}개의 결과를 찾았습니다!")
+        else:
+            with st.spinner("검색 중..."):
+                try:
+                    # scrapetube를 사용하여 YouTube 검색 (속도 제한 / 재시도 / 캐시)
+                    results, status = search_with_status(queries[0] if queries else search_query, limit=10)
+                    
+                    st.session_state.search_results = results
+                    if status == 'stale':
+                        st.warning(f"⚠️ YouTube 검색이 원활하지 않아 이전에 저장된 결과 {len(results)}개를 표시합니다.")
+                    else:
+                        st.success(f"✅ {len(st.session_state.search_results)}개의 결과를 찾았습니다!")
+                except SearchUnavailable as e:
+                    # 이전 검색 결과는 그대로 둠
+                    st.error(f"지금은 검색할 수 없습니다. 잠시 후 다시 시도해주세요. ({e})")
+                except Exception as e:
+                    st.error(f"검색 중 오류가 발생했습니다: {e}")
     
     # 검색 결과 표시
     if st.session_state.search_results:
         st.markdown("---")
         st.subheader("검색 결과")
         
-        for idx, video in enumerate(st.session_state.search_results):
+        # 필터 / 정렬 (다시 검색하지 않고 현재 결과에 적용)
+        with st.expander("🔧 필터 / 정렬"):
+            filter_col1, filter_col2, filter_col3 = st.columns(3)
+            with filter_col1:
+                duration_range = st.slider("재생 시간 (분)", 0, 180, (0, 180), key="filter_duration")
+            with filter_col2:
+                channel_names = sorted({v.get('channel', {}).get('name', 'Unknown') for v in st.session_state.search_results})
+                selected_channels = st.multiselect("채널", channel_names, key="filter_channels")
+            with filter_col3:
+                sort_labels = {'relevance': "관련도", 'duration': "재생 시간", 'views': "조회수", 'channel': "채널"}
+                sort_by = st.selectbox("정렬", list(sort_labels), format_func=sort_labels.get, key="filter_sort")
+            hide_scheduled = st.checkbox("이미 스케줄에 있는 영상 숨기기", key="filter_hide_scheduled")
+        
+        visible_results = process_results(
+            st.session_state.search_results,
+            hide_scheduled=hide_scheduled,
+            min_seconds=duration_range[0] * 60 if duration_range[0] > 0 else None,
+            max_seconds=duration_range[1] * 60 if duration_range[1] < 180 else None,
+            channels=selected_channels,
+            sort_by=sort_by)
+        st.caption(f"{len(visible_results)} / {len(st.session_state.search_results)}개 표시")
+        
+        # 선택한 영상 한 번에 스케줄 추가 (시간 자동 배치, 한 번의 트랜잭션)
+        picked = [v for v in visible_results if st.session_state.get(f"pick_{v['videoId']}")]
+        if picked:
+            with st.container(border=True):
+                st.markdown(f"**☑️ {len(picked)}개 선택됨**")
+                batch_col1, batch_col2, batch_col3 = st.columns(3)
+                with batch_col1:
+                    batch_time = st.text_input("시작 시간 (서울 시간)", value="12:00", key="batch_time")
+                with batch_col2:
+                    spacing_labels = {'back_to_back': "연속 재생 (영상 길이)", 'interval': "N분 간격", 'same': "같은 시간"}
+                    spacing_mode = st.selectbox("간격", list(spacing_labels), format_func=spacing_labels.get, key="batch_mode")
+                with batch_col3:
+                    spacing_minutes = st.number_input(
+                        "간격 (분)" if spacing_mode == 'interval' else "영상 사이 여유 (분)",
+                        min_value=0, max_value=720, value=10 if spacing_mode == 'interval' else 0,
+                        disabled=spacing_mode == 'same', key=f"batch_minutes_{spacing_mode}")
+                
+                try:
+                    planned_times = space_schedule_times(
+                        batch_time, [v.get('duration_seconds') for v in picked], spacing_mode,
+                        interval_minutes=spacing_minutes if spacing_mode == 'interval' else 10,
+                        gap_minutes=spacing_minutes if spacing_mode == 'back_to_back' else 0)
+                except ValueError:
+                    planned_times = None
+                    st.error("⚠️ 시작 시간을 HH:MM 형식으로 입력해주세요.")
+                
+                if planned_times:
+                    st.caption(" · ".join(f"{t} {v['title'][:20]}" for t, v in zip(planned_times, picked)))
+                    if st.button("✅ 선택한 영상 모두 스케줄 추가", type="primary", key="batch_add"):
+                        try:
+                            add_schedules([
+                                (local_to_utc(t, st.session_state.timezone_offset), v['link'], "youtube",
+                                 v['title'][:50], v.get('duration_seconds'))
+                                for t, v in zip(planned_times, picked)])
+                        except ScheduleConflict as e:
+                            st.error(f"⚠️ 다른 스케줄 {len(e.conflicts)}개와 재생 시간이 겹쳐 추가하지 않았습니다.")
+                        else:
+                            for v in picked:
+                                del st.session_state[f"pick_{v['videoId']}"]
+                            st.session_state.flash_message = f"✅ {len(picked)}개 스케줄이 추가되었습니다! ({planned_times[0]} ~ {planned_times[-1]})"
+                            st.rerun()
+        
+        for idx, video in enumerate(visible_results):
             with st.container():
                 col1, col2 = st.columns([1, 3])
                 
@@ -274,9 +415,13 @@ with tab1:
                 
                 with col2:
                     # 제목과 정보
-                    st.markdown(f"**{video['title']}**")
+                    st.checkbox("선택", key=f"pick_{video['videoId']}")
+                    scheduled_mark = " ✅ 스케줄됨" if video.get('scheduled') else ""
+                    st.markdown(f"**{video['title']}**{scheduled_mark}")
                     st.caption(f"👤 {video.get('channel', {}).get('name', 'Unknown')}")
                     st.caption(f"⏱️ {video.get('duration', 'N/A')} | 👁️ {video.get('viewCount', {}).get('short', 'N/A')}")
+                    if video.get('queries'):
+                        st.caption("🔎 " + ", ".join(video['queries']))
                     
                     # URL 표시
                     video_url = video['link']
@@ -316,14 +461,20 @@ with tab1:
                         button_col1, button_col2 = st.columns(2)
                         with button_col1:
                             if st.button("✅ 스케줄 추가", key=f"add_schedule_{idx}", type="primary", width='stretch'):
-                                if schedule_title and schedule_time_input:
+                                if schedule_title and schedule_time_input and not is_schedule_time(schedule_time_input):
+                                    st.error("⚠️ 시간을 HH:MM 형식으로 입력해주세요.")
+                                elif schedule_title and schedule_time_input:
                                     # Convert local time to UTC
                                     utc_time = local_to_utc(schedule_time_input, st.session_state.timezone_offset)
-                                    add_schedule(utc_time, video_url, "youtube", schedule_title)
-                                    st.success(f"✅ '{schedule_title}' 스케줄이 서울 시간 {schedule_time_input} (UTC {utc_time})에 추가되었습니다!")
-                                    st.session_state.selected_video = None
-                                    time_module.sleep(1)
-                                    st.rerun()
+                                    try:
+                                        schedule_id = add_schedule(utc_time, video_url, "youtube", schedule_title,
+                                                                   duration_seconds=video.get('duration_seconds'))
+                                    except ScheduleConflict as e:
+                                        st.error(f"⚠️ 다른 스케줄 {len(e.conflicts)}개와 재생 시간이 겹칩니다.")
+                                    else:
+                                        st.session_state.flash_message = added_message(schedule_id, schedule_title, utc_time)
+                                        st.session_state.selected_video = None
+                                        st.rerun()
                                 else:
                                     st.error("⚠️ 제목과 시간을 모두 입력해주세요.")
                         
@@ -336,6 +487,7 @@ with tab1:
     else:
         st.info("🔍 검색어를 입력하고 검색 버튼을 클릭하세요.")
 
+profiler.begin("tab2 add")
 with tab2:
     st.header("새 스케줄 추가")
     
@@ -344,16 +496,23 @@ with tab2:
     with col1:
         title = st.text_input("제목", placeholder="예: 아침 운동 영상", key="title_input")
         schedule_time = st.text_input("재생 시간 (서울 시간)", value="12:00", help="HH:MM 형식으로 입력 (24시간제) - 서울 시간으로 입력하세요", key="schedule_time_input")
+        length_col, priority_col = st.columns(2)
+        with length_col:
+            duration_minutes = st.number_input("재생 길이 (분)", min_value=0, max_value=24 * 60, value=0,
+                                               help="겹침 확인에 사용 (0 = 모름, 1분으로 계산)", key="duration_input")
+        with priority_col:
+            priority = st.number_input("우선순위", min_value=0, max_value=100, value=0,
+                                       help="재생 시간이 겹치면 높은 쪽이 재생됩니다 (priority 방식)", key="priority_input")
         
     with col2:
         file_type = st.radio("파일 유형", ["YouTube URL", "로컬 파일", "html"], horizontal=True)
         
         if file_type == "YouTube URL":
             file_path = st.text_input("YouTube URL", placeholder="https://www.youtube.com/watch?v=...")
-        elif file_type == "local":
-            file_path = st.text_input("파일 경로", placeholder="C:/videos/video.mp4")
+        elif file_type == "로컬 파일":
+            file_path = pick_media_file("파일 경로", "C:/videos/video.mp4", "local_path_input")
         elif file_type == "html":
-            file_path = st.text_input("HTML 파일 경로", placeholder="C:/path/to/file.html")
+            file_path = pick_media_file("HTML 파일 경로", "C:/path/to/file.html", "html_path_input")
     
     if st.button("➕ 스케줄 추가", type="primary", width='stretch'):
         if title and file_path:
@@ -363,19 +522,28 @@ with tab2:
             
             # 유효성 검사
             valid = True
-            if f_type == "youtube" and not is_youtube_url(file_path):
+            if not is_schedule_time(schedule_time):
+                st.error("⚠️ 시간을 HH:MM 형식으로 입력해주세요.")
+                valid = False
+            elif f_type == "youtube" and not is_youtube_url(file_path):
                 st.error("⚠️ 유효한 YouTube URL을 입력해주세요.")
                 valid = False
-            elif f_type == "local" and not os.path.exists(file_path):
+            elif f_type in ("local", "html") and not media_exists(file_path):
                 st.warning("⚠️ 파일이 존재하지 않습니다. 경로를 확인해주세요.")
             
             if valid:
-                add_schedule(utc_time, file_path, f_type, title)
-                st.success(f"✅ '{title}' 스케줄이 서울 시간 {schedule_time} (UTC {utc_time})에 추가되었습니다!")
-                st.rerun()
+                try:
+                    schedule_id = add_schedule(utc_time, file_path, f_type, title,
+                                               duration_seconds=duration_minutes * 60 or None, priority=priority)
+                except ScheduleConflict as e:
+                    st.error(f"⚠️ 다른 스케줄 {len(e.conflicts)}개와 재생 시간이 겹칩니다.")
+                else:
+                    st.session_state.flash_message = added_message(schedule_id, title, utc_time)
+                    st.rerun()
         else:
             st.error("⚠️ 제목과 파일 경로를 모두 입력해주세요.")
 
+profiler.begin("tab3 list")
 with tab3:
     st.header("등록된 스케줄")
     
@@ -383,9 +551,79 @@ with tab3:
     current_time = datetime.now().strftime("%H:%M:%S")
     st.info(f"🕐 현재 시간: {current_time}")
     
-    schedules_df = get_schedules()
+    with profiler.stage("get_schedules"):
+        schedules_df = get_schedules()
+    # 제목 / URL / 파일 경로 검색 (전문 검색 인덱스, 관련도 순)
+    schedule_query = st.text_input("🔎 스케줄 검색", placeholder="제목, URL 또는 파일 경로", key="schedule_query")
+    if schedule_query and not schedules_df.empty:
+        listed_ids = set(schedules_df['id'])
+        matched_ids = [s['id'] for s in search_schedules(schedule_query, limit=200) if s['id'] in listed_ids]
+        schedules_df = schedules_df.set_index('id', drop=False).loc[matched_ids]
+        st.caption(f"검색 결과 {len(schedules_df)}개")
+    # 파일이 없는 로컬 스케줄 (재생 전에 표시)
+    broken_schedules = get_broken_schedules()
+    if broken_schedules:
+        st.warning(f"⚠️ 파일을 찾을 수 없는 스케줄이 {len(broken_schedules)}개 있습니다.")
+    # 재생 시간이 겹치는 스케줄 (스케줄이 바뀔 때만 다시 계산)
+    conflicting_ids = get_conflicting_ids()
+    if conflicting_ids:
+        st.warning(f"⏱️ 재생 시간이 겹치는 스케줄이 {len(conflicting_ids)}개 있습니다. (처리 방식: {CONFLICT_POLICY})")
+    
+    schedule_view = st.radio("보기", ["📋 목록", "🗓️ 타임라인"], horizontal=True, key="schedule_view",
+                             label_visibility="collapsed")
+    offset_minutes = st.session_state.timezone_offset * 60
+    # 표시용 현지 시간 (모든 스케줄을 한 번에 변환, 스케줄이 바뀔 때만 다시 읽음)
+    local_time_labels = get_schedule_arrays()[1].local_labels(offset_minutes)
     
-    if not schedules_df.empty:
+    if schedule_view == "🗓️ 타임라인":
+        timeline_days = st.selectbox("기간", [1, 7], format_func=lambda d: "오늘" if d == 1 else "7일",
+                                     key="timeline_days")
+        local_now = datetime.utcnow() + timedelta(minutes=offset_minutes)
+        view = get_timeline_view(offset_minutes, timeline_days, local_now.date())
+        day_labels = [(local_now + timedelta(days=d)).strftime("%m/%d (%a)") for d in range(timeline_days)]
+        
+        if timeline_days == 1:
+            # 시간별 재생 목록
+            for hour in range(24):
+                window = view.occurrences_between(hour * 60, (hour + 1) * 60)
+                titles = view.titles[window]
+                if not len(titles):
+                    continue
+                minutes = view.starts[window] % 60
+                overlap = " ⏱️" if view.overlap_peak[hour] > 1 else ""
+                items = " · ".join(f"{hour:02d}:{m:02d} {t[:25]}" for m, t in zip(minutes[:6].tolist(), titles[:6]))
+                more = f" 외 {len(titles) - 6}개" if len(titles) > 6 else ""
+                st.markdown(f"**{hour:02d}시** ({view.busy_minutes[hour]}분 재생){overlap} — {items}{more}")
+        else:
+            # 요일 × 시간 표 (칸 색 = 그 시간에 재생 중인 분, 숫자 = 시작하는 스케줄 수)
+            busy = view.hourly_grid()
+            starts = view.hourly_grid(view.starts_per_hour)
+            peaks = view.hourly_grid(view.overlap_peak)
+            header = "".join(f"<th>{h}</th>" for h in range(24))
+            rows = []
+            for d, label in enumerate(day_labels):
+                cells = "".join(
+                    f"<td title='{busy[d, h]}분 재생, {starts[d, h]}개 시작' style='background:rgba(255,75,75,{busy[d, h] / 60:.2f});"
+                    f"{'outline:2px solid #f0a000;' if peaks[d, h] > 1 else ''}'>{starts[d, h] or ''}</td>"
+                    for h in range(24))
+                rows.append(f"<tr><th>{label}</th>{cells}</tr>")
+            st.markdown(
+                "<table style='border-collapse:collapse;font-size:0.75em;text-align:center;width:100%'>"
+                f"<tr><th></th>{header}</tr>{''.join(rows)}</table>", unsafe_allow_html=True)
+            st.caption("색이 진할수록 그 시간에 오래 재생됩니다. 노란 테두리는 재생 시간이 겹치는 시간입니다.")
+        
+        # 빈 시간 (MIN_GAP_MINUTES 이상)
+        if len(view.gap_starts):
+            st.markdown("**빈 시간**")
+            gaps = []
+            for start, end in zip(view.gap_starts[:12].tolist(), view.gap_ends[:12].tolist()):
+                day = day_labels[start // 1440] if timeline_days > 1 else ""
+                end_label = "24:00" if end % 1440 == 0 else f"{end % 1440 // 60:02d}:{end % 60:02d}"
+                gaps.append(f"{day} {start % 1440 // 60:02d}:{start % 60:02d} ~ {end_label} ({end - start}분)".strip())
+            st.caption(" · ".join(gaps) + (f" 외 {len(view.gap_starts) - 12}개" if len(view.gap_starts) > 12 else ""))
+    
+    elif not schedules_df.empty:
+        profiler.begin("tab3 rows")
         for idx, row in schedules_df.iterrows():
             with st.container():
                 # 편집 모드인 경우
@@ -397,36 +635,42 @@ with tab3:
                     with edit_col1:
                         edit_title = st.text_input("제목", value=row['title'], key=f"edit_title_{row['id']}")
                         # Convert UTC to local for display
-                        local_time_display = utc_to_local(row['schedule_time'], st.session_state.timezone_offset)
+                        local_time_display = local_time_labels.get(row['id'], row['schedule_time'])
                         edit_time = st.text_input("재생 시간 (서울 시간)", value=local_time_display, key=f"edit_time_{row['id']}")
                     
                     with edit_col2:
-                        current_file_type = "YouTube URL" if row['file_type'] == 'youtube' else "로컬 파일"
-                        edit_file_type = st.radio("파일 유형", ["YouTube URL", "로컬 파일"], 
-                                                  index=0 if row['file_type'] == 'youtube' else 1,
+                        edit_file_type = st.radio("파일 유형", ["YouTube URL", "로컬 파일", "html"],
+                                                  index={'youtube': 0, 'local': 1, 'html': 2}.get(row['file_type'], 1),
                                                   key=f"edit_type_{row['id']}", horizontal=True)
                         edit_file_path = st.text_input("파일 경로/URL", value=row['file_path'], key=f"edit_path_{row['id']}")
                     
                     btn_col1, btn_col2 = st.columns(2)
                     with btn_col1:
                         if st.button("💾 저장", key=f"save_{row['id']}", width='stretch', type="primary"):
-                            f_type = "youtube" if edit_file_type == "YouTube URL" else "local"
+                            f_type = "youtube" if edit_file_type == "YouTube URL" else "local" if edit_file_type == "로컬 파일" else "html"
                             
                             # 유효성 검사
                             valid = True
-                            if f_type == "youtube" and not is_youtube_url(edit_file_path):
+                            if not is_schedule_time(edit_time):
+                                st.error("⚠️ 시간을 HH:MM 형식으로 입력해주세요.")
+                                valid = False
+                            elif f_type == "youtube" and not is_youtube_url(edit_file_path):
                                 st.error("⚠️ 유효한 YouTube URL을 입력해주세요.")
                                 valid = False
-                            elif f_type == "local" and not os.path.exists(edit_file_path):
+                            elif f_type in ("local", "html") and not media_exists(edit_file_path):
                                 st.warning("⚠️ 파일이 존재하지 않습니다. 경로를 확인해주세요.")
                             
                             if valid:
                                 # Convert local time to UTC
                                 utc_edit_time = local_to_utc(edit_time, st.session_state.timezone_offset)
-                                update_schedule(row['id'], utc_edit_time, edit_file_path, f_type, edit_title)
-                                st.session_state.editing_id = None
-                                st.success(f"✅ '{edit_title}' 스케줄이 수정되었습니다!")
-                                st.rerun()
+                                try:
+                                    update_schedule(row['id'], utc_edit_time, edit_file_path, f_type, edit_title)
+                                except ScheduleConflict as e:
+                                    st.error(f"⚠️ 다른 스케줄 {len(e.conflicts)}개와 재생 시간이 겹칩니다.")
+                                else:
+                                    st.session_state.editing_id = None
+                                    st.success(f"✅ '{edit_title}' 스케줄이 수정되었습니다!")
+                                    st.rerun()
                     
                     with btn_col2:
                         if st.button("❌ 취소", key=f"cancel_{row['id']}", width='stretch'):
@@ -439,11 +683,13 @@ with tab3:
                     
                     with col1:
                         status = "🟢" if row['is_active'] else "🔴"
-                        st.write(f"{status} **{row['title']}**")
+                        broken = " ⚠️ 파일 없음" if row['id'] in broken_schedules else ""
+                        overlap = " ⏱️ 겹침" if row['id'] in conflicting_ids else ""
+                        st.write(f"{status} **{row['title']}**{broken}{overlap}")
                     
                     with col2:
                         # Display time in local timezone
-                        local_time = utc_to_local(row['schedule_time'], st.session_state.timezone_offset)
+                        local_time = local_time_labels.get(row['id'], row['schedule_time'])
                         st.write(f"🕐 {local_time}")
                     
                     with col3:
@@ -468,13 +714,123 @@ with tab3:
                     
                     with st.expander("상세 정보"):
                         st.text(f"파일 경로: {row['file_path']}")
+                        duration = row['duration_seconds']
+                        if duration and duration > 0:  # 길이를 모르면 None / NaN
+                            st.text(f"재생 길이: {int(duration) // 60}분 {int(duration) % 60}초")
+                        st.text(f"우선순위: {row['priority']}")
                         st.text(f"등록일: {row['created_at']}")
                 
                 st.markdown("---")
     else:
         st.info("📝 등록된 스케줄이 없습니다. '스케줄 추가' 탭에서 새 스케줄을 추가해보세요!")
 
+profiler.begin("tab4 history")
+with tab4:
+    st.header("재생 기록")
+    
+    history_hours = st.selectbox("기간", [24, 72, 168], format_func=lambda h: f"최근 {h}시간", key="history_hours")
+    since = datetime.now() - timedelta(hours=history_hours)
+    
+    # 지연 시간 백분위수
+    percentiles = get_lateness_percentiles(since)
+    p_col1, p_col2, p_col3 = st.columns(3)
+    for col, p in zip((p_col1, p_col2, p_col3), (50, 90, 99)):
+        with col:
+            value = percentiles.get(p)
+            st.metric(f"지연 p{p}", f"{value / 1000:.1f}초" if value is not None else "-")
+    
+    # 시간별 재생 횟수
+    fires = get_fires_per_hour(since)
+    if fires:
+        import pandas as pd
+        fires_df = pd.DataFrame(
+            [(datetime.fromtimestamp(hour_start), count) for hour_start, count in fires],
+            columns=["시간", "재생 횟수"])
+        st.bar_chart(fires_df, x="시간", y="재생 횟수")
+    else:
+        st.info("📭 해당 기간에 재생 기록이 없습니다.")
+    
+    # 오늘 놓친 스케줄
+    st.subheader("오늘 놓친 스케줄")
+    missed = get_missed_schedules()
+    if missed:
+        for item in missed:
+            st.write(f"⚠️ **{item['title']}** - 🕐 {utc_to_local(item['schedule_time'], st.session_state.timezone_offset)}")
+    else:
+        st.success("✅ 놓친 스케줄이 없습니다.")
+
+profiler.begin("tab5 subscriptions")
+with tab5:
+    st.header("채널 / 재생목록 구독")
+    
+    # 구독 추가
+    sub_col1, sub_col2, sub_col3 = st.columns([1, 3, 2])
+    with sub_col1:
+        sub_kind = st.radio("유형", ["channel", "playlist"], format_func={'channel': "채널", 'playlist': "재생목록"}.get, key="sub_kind")
+    with sub_col2:
+        sub_source = st.text_input("채널 ID / URL / @핸들 또는 재생목록 ID", key="sub_source")
+    with sub_col3:
+        sub_title = st.text_input("이름", key="sub_title")
+    if st.button("➕ 구독 추가", key="sub_add"):
+        if sub_source:
+            add_subscription(sub_kind, sub_source, sub_title)
+            st.rerun()
+        else:
+            st.error("⚠️ 채널 또는 재생목록을 입력해주세요.")
+    
+    # 구독 목록
+    for sub in get_subscriptions():
+        s_col1, s_col2, s_col3, s_col4 = st.columns([4, 2, 1, 1])
+        with s_col1:
+            icon = "📺" if sub['kind'] == 'channel' else "🎞️"
+            st.write(f"{icon} **{sub['title']}** ({sub['video_count']}개)")
+        with s_col2:
+            synced = datetime.fromtimestamp(sub['last_synced_at']).strftime("%m-%d %H:%M") if sub['last_synced_at'] else "-"
+            st.caption(f"마지막 동기화: {synced}")
+        with s_col3:
+            if st.button("🔄", key=f"sub_sync_{sub['id']}"):
+                with st.spinner("동기화 중..."):
+                    added = sync_subscription(sub['id'])
+                st.session_state.flash_message = f"✅ {sub['title']}: 새 영상 {added}개"
+                st.rerun()
+        with s_col4:
+            if st.button("🗑️", key=f"sub_delete_{sub['id']}"):
+                delete_subscription(sub['id'])
+                st.rerun()
+    
+    # 카탈로그 검색 (YouTube 에 다시 요청하지 않음)
+    st.markdown("---")
+    catalog_query = st.text_input("구독한 영상 검색", placeholder="제목 또는 채널", key="catalog_query")
+    if catalog_query:
+        for item in search_catalog(catalog_query):
+            item_url = f"https://www.youtube.com/watch?v={item['video_id']}"
+            c_col1, c_col2, c_col3, c_col4 = st.columns([5, 2, 1, 1])
+            with c_col1:
+                st.write(f"**{item['title']}**")
+                st.caption(f"👤 {item['channel'] or 'Unknown'}")
+            with c_col2:
+                catalog_time = st.text_input("재생 시간 (서울 시간)", value="12:00", key=f"catalog_time_{item['video_id']}", label_visibility="collapsed")
+            with c_col3:
+                if st.button("📅", key=f"catalog_schedule_{item['video_id']}"):
+                    if not is_schedule_time(catalog_time):
+                        st.error("⚠️ 시간을 HH:MM 형식으로 입력해주세요.")
+                    else:
+                        utc_time = local_to_utc(catalog_time, st.session_state.timezone_offset)
+                        try:
+                            schedule_id = add_schedule(utc_time, item_url, "youtube", item['title'][:50],
+                                                       duration_seconds=item['duration_seconds'])
+                        except ScheduleConflict as e:
+                            st.error(f"⚠️ 다른 스케줄 {len(e.conflicts)}개와 재생 시간이 겹칩니다.")
+                        else:
+                            st.session_state.flash_message = added_message(schedule_id, item['title'][:50], utc_time)
+                            st.rerun()
+            with c_col4:
+                if st.button("▶️", key=f"catalog_play_{item['video_id']}"):
+                    set_current_video(item_url, item['title'], st.session_state)
+                    st.rerun()
+
 # 사이드바
+profiler.begin("sidebar")
 with st.sidebar:
     st.header("ℹ️ 사용 방법")
     st.markdown("""
@@ -516,16 +872,38 @@ with st.sidebar:
 is_editing = st.session_state.get('editing_id') is not None
 is_adding_from_search = st.session_state.get('selected_video') is not None
 
+profiler.begin("auto refresh")
 if not current_video and not is_editing and not is_adding_from_search:
+    # 곧 재생될 스케줄이 있으면 플레이어/썸네일을 미리 불러오고 정확한 시각에 새로고침
+    upcoming = get_upcoming()
+    refresh_ms = 60000
+    if upcoming:
+        until_next_ms = int((upcoming[0]['fire_at'] - time_module.time()) * 1000) + 500
+        refresh_ms = max(1000, min(refresh_ms, until_next_ms))
     # JavaScript auto-refresh every 60 seconds to check for scheduled videos
     components.html(
-        """
+        f"""
+        {prefetch_tags(upcoming)}
         <script>
-            setTimeout(function() {
+            setTimeout(function() {{
                 window.parent.location.reload();
-            }, 60000);
+            }}, {refresh_ms});
         </script>
         """,
         height=0
     )
 # If video is playing or user is editing, no auto-refresh to avoid interruption
+
+# 프로파일 결과 (사이드바 + profiles/ 폴더)
+if profiler.enabled:
+    stages = profiler.finish()
+    profile_path = profiler.dump()
+    st.session_state.rerun_profiler = None
+    with st.sidebar.expander(f"⏱️ 실행 프로파일 {profiler.total_ms:.0f} ms", expanded=True):
+        for name, ms, depth in stages:
+            slow = " 🐢" if ms >= SLOW_STAGE_MS else ""
+            st.caption(f"{'　' * depth}{name}: {ms:.1f} ms{slow}")
+        slowest = profiler.slowest(1)
+        if slowest:
+            st.caption(f"가장 느린 단계: **{slowest[0][0]}**")
+        st.caption(f"💾 {profile_path}")
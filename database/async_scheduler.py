@@ -0,0 +1,166 @@
+# database/async_scheduler.py
+import asyncio
+import heapq
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from database.connection import get_tenant, set_tenant
+from database.schedule_db import next_fire_at
+from database.scheduler import DueSchedule, SchedulerEngine, SqliteStorage
+
+# 동시에 실행할 수 있는 재생 동작 수
+MAX_CONCURRENT_ACTIONS = 16
+# 재생 동작 하나의 최대 실행 시간 (초)
+ACTION_TIMEOUT = 30
+# 데이터베이스에서 스케줄을 다시 읽는 주기 (초)
+REFRESH_INTERVAL = 30
+# 종료 시 실행 중인 동작을 기다리는 시간 (초)
+SHUTDOWN_GRACE = 5
+
+class AsyncScheduler:
+    """Heap-based scheduler that dispatches play actions without blocking each other.
+
+    Claiming, the conflict policy, the play action and play history all come
+    from a SchedulerEngine (so several schedulers, and the Streamlit sessions,
+    never fire the same schedule twice); this class adds the heap and runs the
+    play actions as tasks bounded by a semaphore, each with its own timeout.
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_ACTIONS, action_timeout=ACTION_TIMEOUT,
+                 refresh_interval=REFRESH_INTERVAL, screen='async-scheduler', tenant=None, engine=None):
+        # 한 스케줄러는 한 테넌트의 스케줄만 재생 (기본: 만든 곳의 테넌트, TENANT 환경 변수)
+        self.tenant = tenant or get_tenant()
+        self.engine = engine or SchedulerEngine(SqliteStorage(self.tenant), screen=screen)
+        self.max_concurrent = max_concurrent
+        self.action_timeout = action_timeout
+        self.refresh_interval = refresh_interval
+        self.screen = screen
+        self._heap = []
+        self._schedules = {}
+        self._tasks = set()
+        self._stop = None
+        self._loop = None
+        self._semaphore = None
+        self._executor = None
+        self._db_executor = None
+
+    def _rebuild(self, rows, now):
+        self._schedules = {row[0]: row for row in rows}
+        self._heap = []
+        for schedule_id, schedule_time, _, _, _ in rows:
+            fire_at = next_fire_at(schedule_time, now)
+            if fire_at is not None:
+                self._heap.append((fire_at, schedule_id))
+        heapq.heapify(self._heap)
+
+    async def _refresh(self):
+        rows = await self._loop.run_in_executor(self._db_executor, self.engine.storage.load_active)
+        self._rebuild(rows, self.engine.clock.now())
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, schedule_id = heapq.heappop(self._heap)
+            due.append((fire_at, schedule_id))
+            # 다음 날 같은 시간으로 다시 등록
+            heapq.heappush(self._heap, (fire_at + timedelta(days=1), schedule_id))
+        return due
+
+    async def _fire(self, due):
+        by_minute = {}
+        for fire_at, schedule_id in due:
+            by_minute.setdefault(fire_at, []).append(schedule_id)
+        for fire_at, ids in by_minute.items():
+            # 클레임을 기다리는 동안 새로고침으로 행이 바뀔 수 있으므로 먼저 복사해 둠
+            rows = {schedule_id: self._schedules[schedule_id] for schedule_id in ids if schedule_id in self._schedules}
+            claimed = await self._loop.run_in_executor(
+                self._db_executor, self.engine.claim, list(rows), fire_at)
+            for schedule_id in claimed:
+                _, _, file_path, file_type, title = rows[schedule_id]
+                schedule = DueSchedule(schedule_id, file_path, file_type, title)
+                task = asyncio.create_task(self._dispatch(schedule, fire_at))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, schedule, fire_at):
+        title = schedule.title
+        async with self._semaphore:
+            fired_at = self.engine.clock.now()
+            try:
+                await asyncio.wait_for(
+                    self._loop.run_in_executor(self._executor, self.engine.play, schedule),
+                    timeout=self.action_timeout)
+            except asyncio.TimeoutError:
+                print(f"스케줄 재생 시간 초과: {title}")
+            self.engine.record(schedule, fire_at, fired_at)
+
+    async def run(self):
+        """Fire schedules until stop() is called"""
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        set_tenant(self.tenant)
+        # 재생 동작용 스레드 풀과 DB 작업(클레임 / 새로고침)용 스레드를 분리 - 시간 초과된 동작은
+        # 스레드를 계속 점유하지만 스케줄러 자체는 멈추지 않음
+        # (run_in_executor 는 테넌트를 넘기지 않으므로 스레드마다 설정)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent,
+                                            thread_name_prefix='scheduler-action',
+                                            initializer=set_tenant, initargs=(self.tenant,))
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='scheduler-db',
+                                               initializer=set_tenant, initargs=(self.tenant,))
+        try:
+            await self._refresh()
+            next_refresh = self._loop.time() + self.refresh_interval
+            while not self._stop.is_set():
+                now = self.engine.clock.now()
+                due = self._pop_due(now)
+                if due:
+                    await self._fire(due)
+                if self._loop.time() >= next_refresh:
+                    await self._refresh()
+                    next_refresh = self._loop.time() + self.refresh_interval
+                # 다음 스케줄 또는 다음 새로고침까지 대기
+                wait = next_refresh - self._loop.time()
+                if self._heap:
+                    wait = min(wait, (self._heap[0][0] - self.engine.clock.now()).total_seconds())
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=max(0.0, wait))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self._shutdown()
+
+    async def _shutdown(self):
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=SHUTDOWN_GRACE)
+            for task in pending:
+                task.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._db_executor.shutdown(wait=False, cancel_futures=True)
+
+    def stop(self):
+        """Request a clean shutdown (safe to call from any thread)"""
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+def run_scheduler(**kwargs):
+    """Run an AsyncScheduler in the current thread until interrupted"""
+    scheduler = AsyncScheduler(**kwargs)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, scheduler.stop)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass  # Windows 또는 메인 스레드가 아닌 경우
+        await scheduler.run()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    run_scheduler()
@@ -0,0 +1,225 @@
+# database/backup.py
+# 실행: python -m database.backup snapshot | list | restore --at "2026-10-18 12:00" | prune  [--tenant 이름]
+import argparse
+import os
+import sqlite3
+import threading
+import time as time_module
+from datetime import datetime, timedelta
+
+from database.connection import BUSY_TIMEOUT, DEFAULT_TENANT, get_db_path, list_tenants, validate_tenant
+
+# 스냅샷 폴더 (테넌트마다 하위 폴더)
+BACKUP_DIR = os.environ.get('BACKUP_DIR', 'backups')
+# 자동 스냅샷 주기 (초, 0 이면 사용 안 함)
+BACKUP_INTERVAL = int(os.environ.get('BACKUP_INTERVAL', '3600'))
+# 한 단계에 복사할 페이지 수 / 단계 사이 쉬는 시간 (초) - 쓰기 작업이 끼어들 틈을 줌
+BACKUP_PAGES = 256
+BACKUP_STEP_SLEEP = 0.01
+# 보관: 최근 BACKUP_KEEP 개 + 최근 BACKUP_KEEP_DAYS 일 동안 하루 하나씩
+BACKUP_KEEP = int(os.environ.get('BACKUP_KEEP', '24'))
+BACKUP_KEEP_DAYS = int(os.environ.get('BACKUP_KEEP_DAYS', '14'))
+
+_STAMP = '%Y%m%d-%H%M%S'
+_worker = None
+_worker_lock = threading.Lock()
+# 같은 테넌트의 스냅샷 / 복원이 겹치지 않도록
+_backup_lock = threading.Lock()
+
+def backup_dir(tenant=None):
+    return os.path.join(BACKUP_DIR, validate_tenant(tenant or DEFAULT_TENANT))
+
+def _open(path):
+    # 풀에 속하지 않는 별도 연결 (스냅샷 중에도 풀의 연결은 그대로 사용됨)
+    return sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+
+# 스냅샷 목록 (오래된 것부터)
+def list_backups(tenant=None):
+    """Return [(taken_at datetime, path, size)] for a tenant's snapshots, oldest first"""
+    folder = backup_dir(tenant)
+    backups = []
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return backups
+    for name in names:
+        stem, ext = os.path.splitext(name)
+        if ext != '.db':
+            continue
+        try:
+            taken_at = datetime.strptime(stem.split('_')[-1], _STAMP)
+        except ValueError:
+            continue
+        path = os.path.join(folder, name)
+        backups.append((taken_at, path, os.path.getsize(path)))
+    return sorted(backups)
+
+def _modified_at(path):
+    # WAL 모드에서는 최근 변경이 -wal 파일에만 있을 수 있음
+    return max((os.path.getmtime(p) for p in (path, path + '-wal') if os.path.exists(p)), default=0)
+
+# 온라인 스냅샷 (쓰기를 멈추지 않음)
+def snapshot(tenant=None, label='snapshot', force=False):
+    """Copy a tenant's live database into a new snapshot file and return its path.
+
+    Uses the SQLite online backup API ``BACKUP_PAGES`` pages at a time with a
+    short sleep between steps. In WAL mode each step only holds a read lock,
+    so the scheduler's writes never wait on a backup. The copy is written to
+    a ``.partial`` file, checked, then renamed into place. Returns None (no new
+    file) when nothing changed since the newest snapshot, unless ``force``.
+    """
+    tenant = tenant or DEFAULT_TENANT
+    source_path = get_db_path(tenant)
+    if not os.path.exists(source_path):
+        return None
+    folder = backup_dir(tenant)
+    os.makedirs(folder, exist_ok=True)
+    with _backup_lock:
+        existing = list_backups(tenant)
+        if not force and existing and os.path.getmtime(existing[-1][1]) >= _modified_at(source_path):
+            return None
+        taken_at = datetime.now()
+        path = os.path.join(folder, f'{label}_{taken_at.strftime(_STAMP)}.db')
+        partial = path + '.partial'
+        source = _open(source_path)
+        target = sqlite3.connect(partial)
+        try:
+            source.backup(target, pages=BACKUP_PAGES, sleep=BACKUP_STEP_SLEEP)
+            # 스냅샷은 WAL 없이 파일 하나로 보관
+            target.execute('PRAGMA journal_mode=DELETE')
+            if target.execute('PRAGMA quick_check').fetchone()[0] != 'ok':
+                raise sqlite3.DatabaseError('snapshot failed quick_check')
+        except Exception:
+            target.close()
+            os.remove(partial)
+            raise
+        finally:
+            source.close()
+        target.close()
+        os.replace(partial, path)
+    return path
+
+# 보관 정책에 맞지 않는 스냅샷 삭제
+def prune(tenant=None, keep=BACKUP_KEEP, keep_days=BACKUP_KEEP_DAYS):
+    """Delete snapshots beyond the newest ``keep`` and one-per-day for ``keep_days``; return removed paths"""
+    backups = list_backups(tenant)
+    keep_paths = {path for _, path, _ in backups[-keep:]} if keep > 0 else set()
+    cutoff = datetime.now() - timedelta(days=keep_days)
+    days = set()
+    for taken_at, path, _ in reversed(backups):
+        # 하루에 하나 (그날의 마지막 스냅샷)
+        if taken_at >= cutoff and taken_at.date() not in days:
+            days.add(taken_at.date())
+            keep_paths.add(path)
+    removed = []
+    for _, path, _ in backups:
+        if path not in keep_paths:
+            os.remove(path)
+            removed.append(path)
+    return removed
+
+def find_backup(at, tenant=None):
+    """Return the path of the newest snapshot taken at or before ``at`` (None if there is none)"""
+    found = None
+    for taken_at, path, _ in list_backups(tenant):
+        if taken_at <= at:
+            found = path
+    return found
+
+# 스냅샷으로 복원
+def restore(path, tenant=None):
+    """Replace a tenant's live database with a snapshot, in place.
+
+    The current data is snapshotted first (label ``pre-restore``). The copy
+    runs as a single backup step, so other connections see either the old or
+    the restored database, never a mix. The schedule version is moved past
+    its pre-restore value so processes that cache by version reload.
+    """
+    tenant = tenant or DEFAULT_TENANT
+    live_path = get_db_path(tenant)
+    if os.path.dirname(live_path):
+        os.makedirs(os.path.dirname(live_path), exist_ok=True)
+    safety = snapshot(tenant, label='pre-restore', force=True) if os.path.exists(live_path) else None
+    with _backup_lock:
+        live = _open(live_path)
+        source = sqlite3.connect(f'file:{os.path.abspath(path)}?mode=ro', uri=True)
+        try:
+            try:
+                before = live.execute('SELECT version FROM schedule_version WHERE id = 1').fetchone()[0]
+            except (sqlite3.Error, TypeError):
+                before = 0
+            source.backup(live)
+            with live:
+                live.execute('UPDATE schedule_version SET version = MAX(version, ?) + 1 WHERE id = 1', (before,))
+        finally:
+            source.close()
+            live.close()
+    return safety
+
+# 자동 스냅샷 (백그라운드 작업)
+def backup_all():
+    """Snapshot every changed tenant database and apply retention"""
+    for tenant in list_tenants():
+        try:
+            snapshot(tenant)
+            prune(tenant)
+        except Exception as e:
+            print(f"Backup error ({tenant}): {e}")
+
+def start_backup_worker(interval=BACKUP_INTERVAL):
+    """Take snapshots from a background thread every ``interval`` seconds (once per process)"""
+    global _worker
+    if interval <= 0:
+        return
+
+    def run():
+        while True:
+            time_module.sleep(interval)
+            backup_all()
+
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=run, name='db-backup', daemon=True)
+            _worker.start()
+
+def _parse_at(text):
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f'invalid time: {text!r} (use "YYYY-MM-DD HH:MM")')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Snapshot, list, restore and prune schedule database backups')
+    parser.add_argument('--tenant', default=DEFAULT_TENANT)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('snapshot', help='take a snapshot now (even if nothing changed)')
+    commands.add_parser('list', help='list snapshots')
+    restore_parser = commands.add_parser('restore', help='restore the newest snapshot at or before --at')
+    target = restore_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--at', type=_parse_at, help='local time, e.g. "2026-10-18 12:00"')
+    target.add_argument('--file', help='snapshot file to restore')
+    prune_parser = commands.add_parser('prune', help='apply the retention policy')
+    prune_parser.add_argument('--keep', type=int, default=BACKUP_KEEP)
+    prune_parser.add_argument('--keep-days', type=int, default=BACKUP_KEEP_DAYS)
+    args = parser.parse_args(argv)
+    tenant = validate_tenant(args.tenant)
+
+    if args.command == 'snapshot':
+        print(snapshot(tenant, force=True) or 'no database to back up')
+    elif args.command == 'list':
+        for taken_at, path, size in list_backups(tenant):
+            print(f"{taken_at:%Y-%m-%d %H:%M:%S}  {size / 1024:8.1f} KB  {path}")
+    elif args.command == 'restore':
+        path = args.file or find_backup(args.at, tenant)
+        if path is None:
+            parser.exit(1, f"no snapshot at or before {args.at}\n")
+        safety = restore(path, tenant)
+        print(f"restored {path}" + (f" (previous data saved to {safety})" if safety else ''))
+    elif args.command == 'prune':
+        for path in prune(tenant, args.keep, args.keep_days):
+            print(f"removed {path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+# database/catalog.py
+import threading
+import time as time_module
+
+from database.connection import get_connection, list_tenants, use_tenant
+from database.fulltext import fts_query
+
+# 첫 동기화 때 가져올 최대 영상 수
+INITIAL_LIMIT = 200
+# 구독 하나를 다시 동기화하는 주기 (초)
+SYNC_INTERVAL = 30 * 60
+# 연속된 동기화 사이 최소 대기 시간 (초) - YouTube 요청 속도 제한
+SYNC_MIN_GAP = 5
+# scrapetube 페이지 요청 사이 대기 시간 (초)
+PAGE_SLEEP = 1
+
+_worker = None
+_worker_lock = threading.Lock()
+_sync_lock = threading.Lock()
+_last_sync_at = 0.0
+
+# 구독 / 영상 카탈로그 테이블 초기화
+def init_catalog(conn):
+    """Create the subscription list and the local video catalog"""
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS subscriptions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL CHECK (kind IN ('channel', 'playlist')),
+            source_id TEXT NOT NULL,
+            title TEXT,
+            last_seen_video_id TEXT,
+            last_synced_at INTEGER,
+            UNIQUE (kind, source_id)
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS videos (
+            video_id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            channel TEXT,
+            duration_seconds INTEGER,
+            views INTEGER,
+            subscription_id INTEGER,
+            fetched_at INTEGER NOT NULL
+        )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_videos_subscription ON videos (subscription_id, fetched_at)')
+
+# 구독 추가
+def add_subscription(kind, source_id, title=None):
+    conn = get_connection()
+    try:
+        with conn:
+            cur = conn.execute('''
+                INSERT OR IGNORE INTO subscriptions (kind, source_id, title) VALUES (?, ?, ?)
+            ''', (kind, source_id.strip(), title or source_id.strip()))
+        return cur.lastrowid
+    finally:
+        conn.close()
+
+# 구독 삭제 (가져온 영상은 카탈로그에 남김)
+def delete_subscription(subscription_id):
+    conn = get_connection()
+    try:
+        with conn:
+            conn.execute('DELETE FROM subscriptions WHERE id = ?', (subscription_id,))
+    finally:
+        conn.close()
+
+# 구독 목록
+def get_subscriptions():
+    """Return subscriptions as dicts, with the number of catalogued videos"""
+    conn = get_connection()
+    try:
+        rows = conn.execute('''
+            SELECT s.id, s.kind, s.source_id, s.title, s.last_seen_video_id, s.last_synced_at,
+                   (SELECT COUNT(*) FROM videos v WHERE v.subscription_id = s.id)
+            FROM subscriptions s ORDER BY s.title
+        ''').fetchall()
+    finally:
+        conn.close()
+    keys = ('id', 'kind', 'source_id', 'title', 'last_seen_video_id', 'last_synced_at', 'video_count')
+    return [dict(zip(keys, row)) for row in rows]
+
+def _fetch(kind, source_id, limit):
+    import scrapetube
+    if kind == 'playlist':
+        return scrapetube.get_playlist(source_id, limit=limit, sleep=PAGE_SLEEP)
+    if source_id.startswith('UC') and len(source_id) == 24:
+        return scrapetube.get_channel(channel_id=source_id, limit=limit, sleep=PAGE_SLEEP, sort_by='newest')
+    if source_id.startswith('@'):
+        source_id = f'https://www.youtube.com/{source_id}'
+    return scrapetube.get_channel(channel_url=source_id, limit=limit, sleep=PAGE_SLEEP, sort_by='newest')
+
+# 구독 하나 동기화 (증분)
+def sync_subscription(subscription_id):
+    """Fetch new videos for one subscription; return how many were added.
+
+    Channels are read newest first and stop at the last video seen by the
+    previous sync, so a steady-state sync costs one page. Playlists are
+    ordered oldest first, so they are read fully but only unknown videos are written.
+    """
+    global _last_sync_at
+    from database.youtube_search import parse_video
+    conn = get_connection()
+    try:
+        row = conn.execute(
+            'SELECT kind, source_id, title, last_seen_video_id FROM subscriptions WHERE id = ?',
+            (subscription_id,)).fetchone()
+        if row is None:
+            return 0
+        known = {r[0] for r in conn.execute(
+            'SELECT video_id FROM videos WHERE subscription_id = ?', (subscription_id,))}
+    finally:
+        conn.close()
+    kind, source_id, title, last_seen = row
+
+    with _sync_lock:
+        # 동기화 사이 최소 간격 유지
+        wait = SYNC_MIN_GAP - (time_module.monotonic() - _last_sync_at)
+        if wait > 0:
+            time_module.sleep(wait)
+        try:
+            new_videos = []
+            limit = None if kind == 'playlist' else INITIAL_LIMIT
+            for raw in _fetch(kind, source_id, limit):
+                video = parse_video(raw)
+                if video is None:
+                    continue
+                if video['videoId'] in known or video['videoId'] == last_seen:
+                    # 채널은 최신순이므로 이미 본 영상부터는 모두 이전 것
+                    if kind == 'channel':
+                        break
+                    continue
+                new_videos.append(video)
+        finally:
+            _last_sync_at = time_module.monotonic()
+
+    now = int(time_module.time())
+    conn = get_connection()
+    try:
+        with conn:
+            before = conn.total_changes
+            conn.executemany('''
+                INSERT OR IGNORE INTO videos
+                    (video_id, title, channel, duration_seconds, views, subscription_id, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(v['videoId'], v['title'],
+                   v['channel']['name'] if v['channel']['name'] != 'Unknown' else title,
+                   v.get('duration_seconds'), v.get('views'), subscription_id, now)
+                  for v in new_videos])
+            added = conn.total_changes - before
+            newest = new_videos[0]['videoId'] if new_videos and kind == 'channel' else last_seen
+            conn.execute('''
+                UPDATE subscriptions SET last_seen_video_id = ?, last_synced_at = ? WHERE id = ?
+            ''', (newest, now, subscription_id))
+    finally:
+        conn.close()
+    return added
+
+# 오래된 구독 동기화 (백그라운드 작업)
+def sync_due():
+    """Sync every subscription not synced within SYNC_INTERVAL"""
+    cutoff = int(time_module.time()) - SYNC_INTERVAL
+    conn = get_connection()
+    try:
+        due = [row[0] for row in conn.execute(
+            'SELECT id FROM subscriptions WHERE last_synced_at IS NULL OR last_synced_at < ? ORDER BY last_synced_at',
+            (cutoff,))]
+    finally:
+        conn.close()
+    for subscription_id in due:
+        try:
+            sync_subscription(subscription_id)
+        except Exception as e:
+            print(f"Subscription sync error ({subscription_id}): {e}")
+
+def start_sync_worker(check_interval=60):
+    """Keep every tenant's subscriptions in sync from a background thread (once per process)"""
+    global _worker
+
+    def run():
+        while True:
+            # 테넌트마다 자기 구독만 자기 데이터베이스에 동기화
+            for tenant in list_tenants():
+                with use_tenant(tenant):
+                    try:
+                        sync_due()
+                    except Exception as e:
+                        print(f"Subscription sync error ({tenant}): {e}")
+            time_module.sleep(check_interval)
+
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=run, name='catalog-sync', daemon=True)
+            _worker.start()
+
+# 카탈로그 검색 (전문 검색 인덱스)
+def search_catalog(query, limit=20):
+    """Return catalogued videos matching every word of ``query`` as a prefix, best matches first"""
+    match = fts_query(query)
+    if match is None:
+        return []
+    conn = get_connection()
+    try:
+        rows = conn.execute('''
+            SELECT v.video_id, v.title, v.channel, v.duration_seconds, v.views FROM videos_fts f
+            JOIN videos v ON v.video_id = f.video_id
+            WHERE videos_fts MATCH ?
+            ORDER BY bm25(videos_fts, 0.0, 10.0, 3.0), v.fetched_at DESC LIMIT ?
+        ''', (match, limit)).fetchall()
+    finally:
+        conn.close()
+    keys = ('video_id', 'title', 'channel', 'duration_seconds', 'views')
+    return [dict(zip(keys, row)) for row in rows]
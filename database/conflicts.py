@@ -0,0 +1,189 @@
+# database/conflicts.py
+import bisect
+import itertools
+import os
+import threading
+
+from database.connection import get_db_path
+
+# 겹치는 스케줄 처리 방식
+#   reject  - 겹치면 추가/수정을 거부
+#   queue   - 앞 스케줄이 끝나는 첫 빈 시간으로 미룸
+#   priority - 그대로 저장, 재생 시 우선순위가 높은 스케줄만 재생
+#   preempt - 그대로 저장, 나중에 시작하는 스케줄이 앞 스케줄을 끊고 재생 (기존 동작)
+CONFLICT_POLICIES = ('reject', 'queue', 'priority', 'preempt')
+CONFLICT_POLICY = os.environ.get('SCHEDULE_CONFLICT_POLICY', 'preempt')
+if CONFLICT_POLICY not in CONFLICT_POLICIES:
+    print(f"Unknown SCHEDULE_CONFLICT_POLICY {CONFLICT_POLICY!r}, using 'preempt'")
+    CONFLICT_POLICY = 'preempt'
+# 길이를 모르는 스케줄이 차지하는 시간 (초) - 최소 1분
+DEFAULT_DURATION = max(60, int(os.environ.get('SCHEDULE_DEFAULT_DURATION', '60')))
+
+DAY = 24 * 60 * 60
+
+class ScheduleConflict(ValueError):
+    """Raised when a schedule overlaps others and the policy cannot place it"""
+
+    def __init__(self, message, conflicts):
+        super().__init__(message)
+        self.conflicts = conflicts
+
+def _span(duration_seconds):
+    return max(duration_seconds or DEFAULT_DURATION, 60)
+
+class ScheduleTimeline:
+    """Interval index over one (repeating) day of active schedules.
+
+    Intervals are kept sorted by start second, next to the running maximum of
+    their end seconds. A lookup for [start, end) bisects both lists and only
+    walks the intervals between the first one whose running end passes
+    ``start`` and the last one starting before ``end``. That is O(log n) plus
+    the walk: usually just the overlaps, but a long schedule keeps every
+    interval that starts while it plays inside the walk. Writes are O(n)
+    (list insert and the copy writers make), which is fine for one day of
+    schedules. Midnight is handled by repeating the query one day earlier
+    and later.
+    """
+
+    def __init__(self, rows=()):
+        # rows: (id, schedule_minute, duration_seconds, priority)
+        self.items = sorted((minute * 60, minute * 60 + _span(duration), schedule_id, priority or 0)
+                            for schedule_id, minute, duration, priority in rows)
+        self.by_id = {item[2]: item for item in self.items}
+        self._reindex()
+
+    def _reindex(self):
+        self.starts = [item[0] for item in self.items]
+        # i 번째까지 중 가장 늦게 끝나는 시각 (정렬되어 있으므로 bisect 가능)
+        self.max_ends = list(itertools.accumulate((item[1] for item in self.items), max))
+        self._conflicting = None
+
+    def __len__(self):
+        return len(self.items)
+
+    def copy(self):
+        timeline = ScheduleTimeline()
+        timeline.items = list(self.items)
+        timeline.starts = list(self.starts)
+        timeline.max_ends = list(self.max_ends)
+        timeline.by_id = dict(self.by_id)
+        return timeline
+
+    def add(self, schedule_id, minute, duration_seconds=None, priority=0):
+        self.remove(schedule_id)
+        item = (minute * 60, minute * 60 + _span(duration_seconds), schedule_id, priority or 0)
+        bisect.insort(self.items, item)
+        self.by_id[schedule_id] = item
+        self._reindex()
+
+    def remove(self, schedule_id):
+        item = self.by_id.pop(schedule_id, None)
+        if item is not None:
+            del self.items[bisect.bisect_left(self.items, item)]
+            self._reindex()
+
+    def overlapping(self, start, end, exclude=None):
+        """Return intervals (start, end, id, priority) that overlap [start, end) seconds"""
+        found = {}
+        for shift in (0, -DAY, DAY):
+            lo = bisect.bisect_right(self.max_ends, start + shift)
+            hi = bisect.bisect_left(self.starts, end + shift)
+            for item in self.items[lo:hi]:
+                if item[1] > start + shift and item[2] != exclude:
+                    found[item[2]] = item
+        return sorted(found.values())
+
+    def conflicts_for(self, minute, duration_seconds=None, exclude=None):
+        start = minute * 60
+        return self.overlapping(start, start + _span(duration_seconds), exclude)
+
+    def first_free_minute(self, minute, duration_seconds=None, exclude=None):
+        """Return the first minute at or after ``minute`` where the schedule fits, or None"""
+        span = _span(duration_seconds)
+        start = minute * 60
+        for _ in range(len(self.items) + 1):
+            overlaps = self.overlapping(start, start + span, exclude)
+            if not overlaps:
+                return (start // 60) % (24 * 60)
+            # 겹치는 스케줄 중 가장 늦게 끝나는 시각으로 이동 (분 단위 올림)
+            start = -(-max(item[1] for item in overlaps) // 60) * 60
+            if start - minute * 60 >= DAY:
+                break
+        return None
+
+    def outranked(self, schedule_id):
+        """True if a higher-priority schedule is playing when this one starts.
+
+        Ties at the same start go to the lower id, so exactly one plays.
+        """
+        item = self.by_id.get(schedule_id)
+        if item is None:
+            return False
+        start, _, _, priority = item
+        for other_start, _, other_id, other_priority in self.overlapping(start, start + 1, schedule_id):
+            if other_priority > priority:
+                return True
+            if other_priority == priority and other_start == start and other_id < schedule_id:
+                return True
+        return False
+
+    def conflicting_ids(self):
+        """Return the ids of every schedule that overlaps another one (computed once per timeline)"""
+        if self._conflicting is not None:
+            return self._conflicting
+        ids = set()
+        for start, end, schedule_id, _ in self.items:
+            if schedule_id not in ids:
+                overlaps = self.overlapping(start, end, schedule_id)
+                if overlaps:
+                    ids.add(schedule_id)
+                    ids.update(item[2] for item in overlaps)
+        self._conflicting = ids
+        return ids
+
+# 데이터베이스(테넌트) 파일별 (버전, 타임라인)
+_cache = {}
+_cache_lock = threading.Lock()
+
+def _load(conn):
+    return ScheduleTimeline(conn.execute('''
+        SELECT id, schedule_minute, duration_seconds, priority FROM schedules WHERE is_active = 1
+    ''').fetchall())
+
+def get_timeline(conn):
+    """Return the timeline for the current schedule data (rebuilt only when its version changed).
+
+    ``conn`` must belong to the current tenant (the cache is kept per database
+    file). Treat the result as read-only; writers update a copy and pass it to
+    remember_timeline(), so readers never see a half-applied change.
+    """
+    row = conn.execute('SELECT version FROM schedule_version WHERE id = 1').fetchone()
+    version = row[0] if row else 0
+    path = get_db_path()
+    with _cache_lock:
+        cached_version, timeline = _cache.get(path, (None, None))
+        if cached_version != version:
+            timeline = _load(conn)
+            _cache[path] = (version, timeline)
+        return timeline
+
+def remember_timeline(timeline, version):
+    """Keep an updated copy of the timeline as the one for ``version``"""
+    with _cache_lock:
+        _cache[get_db_path()] = (version, timeline)
+
+# 추가/수정 전에 겹침 확인 (정책에 따라 시간 조정 또는 거부)
+def resolve(timeline, minute, duration_seconds=None, priority=0, exclude=None, policy=None):
+    """Return the minute to store the schedule at, or raise ScheduleConflict"""
+    policy = policy or CONFLICT_POLICY
+    if policy not in ('reject', 'queue'):
+        return minute
+    conflicts = timeline.conflicts_for(minute, duration_seconds, exclude)
+    if not conflicts:
+        return minute
+    if policy == 'queue':
+        free = timeline.first_free_minute(minute, duration_seconds, exclude)
+        if free is not None:
+            return free
+    ids = [item[2] for item in conflicts]
+    raise ScheduleConflict(f'schedule overlaps {len(ids)} other schedule(s): {ids}', ids)
@@ -0,0 +1,186 @@
+# database/connection.py
+import contextlib
+import contextvars
+import hmac
+import os
+import queue
+import re
+import sqlite3
+import threading
+
+# 스케줄 데이터베이스 파일 경로
+DB_PATH = 'video_schedule.db'
+# 재사용할 유휴 연결 수 (0 이면 풀을 사용하지 않음)
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '8'))
+# 잠금 대기 시간 (초)
+BUSY_TIMEOUT = 5.0
+# 테넌트(사용자)별 데이터 폴더 - 기본 테넌트는 예전 경로(DB_PATH 등)를 그대로 사용
+TENANT_DIR = os.environ.get('TENANT_DIR', 'tenants')
+DEFAULT_TENANT = 'default'
+
+# 테넌트 이름 = 폴더 이름 (경로 문자 금지)
+_TENANT_NAME = re.compile(r'^[a-z0-9][a-z0-9_-]{0,31}$')
+
+def validate_tenant(name):
+    """Return ``name`` if it is a valid tenant name, or raise ValueError"""
+    if not isinstance(name, str) or not _TENANT_NAME.match(name):
+        raise ValueError(f'invalid tenant name: {name!r}')
+    return name
+
+_env_tenant = os.environ.get('TENANT') or DEFAULT_TENANT
+if not _TENANT_NAME.match(_env_tenant):
+    print(f"Invalid TENANT {_env_tenant!r}, using {DEFAULT_TENANT!r}")
+    _env_tenant = DEFAULT_TENANT
+# 사용할 수 있는 테넌트 (기본 테넌트 외, 쉼표로 구분) - 요청에서 이름만 바꿔 새 데이터베이스를 만들 수 없음
+# TENANT_TOKENS="acme=비밀값,beta=비밀값2" 를 설정하면 API 는 토큰으로 테넌트를 정함 (그 테넌트들도 사용 가능)
+def _parse_tenant_tokens(text):
+    tokens = {}
+    for pair in filter(None, (p.strip() for p in (text or '').split(','))):
+        name, _, token = pair.partition('=')
+        if not _TENANT_NAME.match(name) or not token:
+            print(f"Ignoring invalid TENANT_TOKENS entry for {name!r}")
+            continue
+        tokens[token] = name
+    return tokens
+
+TENANT_TOKENS = _parse_tenant_tokens(os.environ.get('TENANT_TOKENS'))
+CONFIGURED_TENANTS = frozenset(
+    [DEFAULT_TENANT, _env_tenant, *TENANT_TOKENS.values()]
+    + [name.strip() for name in os.environ.get('TENANTS', '').split(',') if _TENANT_NAME.match(name.strip())])
+
+def is_configured_tenant(name):
+    """True if ``name`` is the default tenant or listed in TENANTS / TENANT_TOKENS"""
+    return name in CONFIGURED_TENANTS
+
+def tenant_for_token(token):
+    """Return the tenant a TENANT_TOKENS token belongs to, or None"""
+    found = None
+    for known, tenant in TENANT_TOKENS.items():
+        # 모든 토큰과 비교 (일치 위치에 따라 응답 시간이 달라지지 않도록)
+        if hmac.compare_digest(known.encode('utf-8'), (token or '').encode('utf-8')):
+            found = tenant
+    return found
+
+# 현재 요청/세션의 테넌트 (스레드, asyncio 작업마다 따로 유지)
+_tenant = contextvars.ContextVar('tenant', default=_env_tenant)
+
+def get_tenant():
+    return _tenant.get()
+
+def set_tenant(name):
+    """Route this thread / task's connections to ``name``"""
+    return _tenant.set(validate_tenant(name))
+
+@contextlib.contextmanager
+def use_tenant(name):
+    """Run a block against one tenant's database"""
+    token = set_tenant(name)
+    try:
+        yield name
+    finally:
+        _tenant.reset(token)
+
+def tenant_path(filename, tenant=None):
+    """Path of a per-tenant data file (``tenants/<name>/<file>``; the default tenant keeps ``filename``)"""
+    tenant = tenant or _tenant.get()
+    if tenant == DEFAULT_TENANT:
+        return filename
+    return os.path.join(TENANT_DIR, validate_tenant(tenant), os.path.basename(filename))
+
+def get_db_path(tenant=None):
+    return tenant_path(DB_PATH, tenant)
+
+def list_tenants():
+    """Return the default tenant plus every tenant that has a database file"""
+    tenants = [DEFAULT_TENANT]
+    try:
+        names = sorted(os.listdir(TENANT_DIR))
+    except OSError:
+        names = []
+    for name in names:
+        if name != DEFAULT_TENANT and _TENANT_NAME.match(name) and os.path.exists(get_db_path(name)):
+            tenants.append(name)
+    return tenants
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to its pool.
+
+    It is still a real sqlite3.Connection, so pandas and ``with conn:`` work
+    unchanged; callers keep calling close() as before.
+    """
+
+    pool = None
+
+    def close(self):
+        pool = self.pool
+        if pool is None:
+            return super().close()
+        try:
+            # 커밋하지 않은 작업은 일반 close() 와 같이 버림
+            self.rollback()
+        except sqlite3.Error:
+            self.pool = None
+            return super().close()
+        pool.release(self)
+
+class ConnectionPool:
+    """Small LIFO pool of connections to one database file"""
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, factory=PooledConnection,
+                               check_same_thread=False)
+        # 읽기와 쓰기가 서로 막지 않도록 WAL 사용
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.pool = self
+        return conn
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, conn):
+        if self._idle.qsize() < self.size:
+            self._idle.put(conn)
+        else:
+            conn.pool = None
+            sqlite3.Connection.close(conn)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _ensure_dir(path):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+def get_pool(path=None):
+    """Return the shared pool for a database file (the current tenant's by default)"""
+    path = path or get_db_path()
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(path)
+            if pool is None:
+                _ensure_dir(path)
+                pool = _pools[path] = ConnectionPool(path)
+    return pool
+
+def get_connection(tenant=None):
+    """Open a connection to a tenant's schedule database (the current tenant by default).
+
+    Each tenant has its own file, so one tenant's writes never hold another's
+    lock and queries cannot see another tenant's rows.
+    """
+    if POOL_SIZE <= 0:
+        path = get_db_path(tenant)
+        _ensure_dir(path)
+        return sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+    return get_pool(get_db_path(tenant)).acquire()
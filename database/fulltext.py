@@ -0,0 +1,95 @@
+# database/fulltext.py
+import re
+
+# 검색어를 단어 단위로 나눔 (FTS5 문법 문자는 모두 구분자로 취급)
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+# 스케줄 제목 / 경로 트리거 (schedules 테이블을 다시 만들 때도 사용)
+SCHEDULE_FTS_TRIGGERS = (
+    '''
+    CREATE TRIGGER IF NOT EXISTS schedules_fts_insert AFTER INSERT ON schedules
+    BEGIN
+        INSERT INTO schedules_fts (rowid, title, file_path) VALUES (new.id, new.title, new.file_path);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS schedules_fts_delete AFTER DELETE ON schedules
+    BEGIN
+        INSERT INTO schedules_fts (schedules_fts, rowid, title, file_path)
+        VALUES ('delete', old.id, old.title, old.file_path);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS schedules_fts_update AFTER UPDATE OF title, file_path ON schedules
+    BEGIN
+        INSERT INTO schedules_fts (schedules_fts, rowid, title, file_path)
+        VALUES ('delete', old.id, old.title, old.file_path);
+        INSERT INTO schedules_fts (rowid, title, file_path) VALUES (new.id, new.title, new.file_path);
+    END
+    ''',
+)
+
+# 전문 검색 인덱스 초기화
+def init_fulltext(conn):
+    """Create FTS5 indexes over schedules and the video catalog, kept in sync by triggers.
+
+    The schedule index is external-content (it stores only the index and reads
+    rows back from ``schedules`` by id). The catalog index keeps its own copy
+    because ``videos`` is keyed by a text id rather than a stable rowid
+    (catalog rows are only ever added, so the unindexed-id delete path is rare).
+    """
+    c = conn.cursor()
+    existing = {row[0] for row in c.execute(
+        "SELECT name FROM sqlite_master WHERE name IN ('schedules_fts', 'videos_fts')")}
+
+    c.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS schedules_fts USING fts5(
+            title, file_path,
+            content='schedules', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    ''')
+    for trigger in SCHEDULE_FTS_TRIGGERS:
+        c.execute(trigger)
+
+    c.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5(
+            video_id UNINDEXED, title, channel,
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS videos_fts_insert AFTER INSERT ON videos
+        BEGIN
+            INSERT INTO videos_fts (video_id, title, channel) VALUES (new.video_id, new.title, new.channel);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS videos_fts_delete AFTER DELETE ON videos
+        BEGIN
+            DELETE FROM videos_fts WHERE video_id = old.video_id;
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS videos_fts_update AFTER UPDATE OF title, channel ON videos
+        BEGIN
+            UPDATE videos_fts SET title = new.title, channel = new.channel WHERE video_id = old.video_id;
+        END
+    ''')
+
+    # 처음 만든 인덱스는 기존 데이터로 채움
+    if 'schedules_fts' not in existing:
+        c.execute("INSERT INTO schedules_fts (schedules_fts) VALUES ('rebuild')")
+    if 'videos_fts' not in existing:
+        c.execute('''
+            INSERT INTO videos_fts (video_id, title, channel)
+            SELECT video_id, title, channel FROM videos
+        ''')
+
+# 사용자 검색어 -> FTS5 질의
+def fts_query(text):
+    """Turn free text into an FTS5 prefix query (every word must match), or None if empty"""
+    terms = _TERM.findall(text or '')
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
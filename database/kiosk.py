@@ -0,0 +1,287 @@
+# database/kiosk.py
+import asyncio
+import contextlib
+import json
+import os
+import time as time_module
+
+from database.media_server import MEDIA_SERVER_URL
+from database.prefetch import get_upcoming
+from database.schedule_db import current_video_path, get_current_video
+
+# 재생 상태 파일 확인 주기 (초) - 프로세스당 한 번만 확인하고 모든 화면에 전달
+WATCH_INTERVAL = 1.0
+# 연결 유지용 heartbeat 주기 (초)
+HEARTBEAT_INTERVAL = 25
+# 다음 스케줄 목록을 다시 계산하는 주기 (초)
+UPCOMING_INTERVAL = 10
+
+class NowPlayingBroadcaster:
+    """Watch the now-playing state once and fan changes out to every SSE client.
+
+    Besides ``now-playing`` it publishes ``upcoming``: the next schedules within
+    the prefetch window, so displays can warm up before they fire. Displays
+    only switch videos on ``now-playing``, after the engine has claimed and
+    recorded the fire.
+    """
+
+    def __init__(self, path=None, interval=WATCH_INTERVAL, upcoming_interval=UPCOMING_INTERVAL):
+        # 만든 곳의 테넌트 상태 파일을 감시 (감시 작업도 그 테넌트로 실행됨)
+        self.path = path or current_video_path()
+        self.interval = interval
+        self.upcoming_interval = upcoming_interval
+        self.version = 0
+        self.state = {'now-playing': None, 'upcoming': None}
+        self.versions = {'now-playing': 0, 'upcoming': 0}
+        self._changed = None
+        self._task = None
+        self._signature = None
+        self._listeners = 0
+        self._next_upcoming = 0.0
+
+    @property
+    def current(self):
+        return self.state['now-playing']
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def _publish(self, name, value):
+        if value == self.state[name] and self.versions[name]:
+            return
+        self.state[name] = value
+        self.version += 1
+        self.versions[name] = self.version
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def refresh(self, force=False):
+        """Read the now-playing file (if it changed) and the upcoming list (when due) and publish them"""
+        loop = asyncio.get_running_loop()
+        signature = await asyncio.to_thread(self._stat)
+        if force or signature != self._signature or not self.versions['now-playing']:
+            self._signature = signature
+            self._publish('now-playing', await asyncio.to_thread(get_current_video))
+        if force or loop.time() >= self._next_upcoming:
+            self._next_upcoming = loop.time() + self.upcoming_interval
+            self._publish('upcoming', await asyncio.to_thread(get_upcoming))
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.refresh()
+
+    @contextlib.asynccontextmanager
+    async def listen(self):
+        """Keep the watcher running while at least one client is connected.
+
+        The current state is loaded before the block runs, so a new client can
+        send it right away; the watcher stops when the last client leaves.
+        """
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        self._listeners += 1
+        try:
+            if self._task is None or self._task.done():
+                # 감시가 멈춰 있던 동안의 변경을 놓치지 않도록 한 번 바로 읽음
+                await self.refresh(force=True)
+                if self._task is None or self._task.done():
+                    self._task = asyncio.create_task(self._watch())
+            yield self
+        finally:
+            self._listeners -= 1
+            if not self._listeners and self._task is not None:
+                self._task.cancel()
+                self._task = None
+
+    async def wait_for_change(self, seen_version, timeout):
+        """Wait until the state moves past ``seen_version``; return True if it did"""
+        while self.version <= seen_version:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    def events_since(self, seen_version):
+        """Encode an SSE event for every state that changed after ``seen_version``"""
+        body = b''
+        for name, version in sorted(self.versions.items(), key=lambda kv: kv[1]):
+            if version > seen_version:
+                data = self.state[name]
+                if name == 'upcoming':
+                    data = {'server_now': time_module.time(), 'items': data or []}
+                body += sse_event(name, data, version)
+        return body
+
+def sse_event(event, data, event_id=None):
+    """Encode one server-sent event"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, ensure_ascii=False)}')
+    return ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+# 키오스크 플레이어 페이지 (IFrame Player 하나를 유지하고 SSE 로 영상만 교체)
+PLAYER_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+    <title>비디오 스케줄러 - 플레이어</title>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <link rel="preconnect" href="https://www.youtube.com">
+    <link rel="preconnect" href="https://i.ytimg.com">
+    <style>
+        html, body { margin: 0; padding: 0; background: #000; overflow: hidden; height: 100%; }
+        #player, #media { position: absolute; inset: 0; width: 100vw; height: 100vh; border: 0; }
+        #media { display: none; background: #000; }
+        .info {
+            position: absolute; top: 10px; left: 10px; z-index: 1000;
+            color: white; background: rgba(0,0,0,0.7); padding: 10px; border-radius: 5px;
+            font-family: Arial, sans-serif; transition: opacity 1s;
+        }
+        .info.offline { background: rgba(160,0,0,0.8); }
+    </style>
+</head>
+<body>
+    <div class="info" id="info"><strong>대기 중</strong></div>
+    <div id="player"></div>
+    <iframe id="media" allow="autoplay; fullscreen"></iframe>
+    <script>
+    (function () {
+        var EVENTS_URL = __EVENTS_URL__;
+        var MEDIA_ORIGIN = new URL(__MEDIA_URL__).origin;
+        var info = document.getElementById('info');
+        var media = document.getElementById('media');
+        var player = null, playerReady = false, pending = null, currentKey = null;
+        var warmed = {};
+        var backoff = 1000, MAX_BACKOFF = 60000;
+
+        function youtubeId(url) {
+            var m = /(?:youtube\\.com\\/(?:[^\\/]+\\/.+\\/|(?:v|e(?:mbed)?)\\/|.*[?&]v=)|youtu\\.be\\/)([^"&?\\/\\s]{11})/.exec(url || '');
+            return m ? m[1] : null;
+        }
+
+        // 유튜브 외에는 미디어 서버의 http(s) 주소만 재생 (now-playing 에 임의의 주소가 들어와도 열지 않음)
+        function mediaUrl(url) {
+            var parsed;
+            try { parsed = new URL(url, location.href); } catch (e) { return null; }
+            if (parsed.protocol !== 'http:' && parsed.protocol !== 'https:') return null;
+            return parsed.origin === MEDIA_ORIGIN ? parsed.href : null;
+        }
+
+        function escapeHtml(text) {
+            var div = document.createElement('div');
+            div.textContent = text;
+            return div.innerHTML;
+        }
+
+        function showInfo(text, offline) {
+            info.innerHTML = text;
+            info.className = offline ? 'info offline' : 'info';
+            info.style.opacity = 1;
+            clearTimeout(showInfo.timer);
+            if (!offline) showInfo.timer = setTimeout(function () { info.style.opacity = 0; }, 5000);
+        }
+
+        function apply(video) {
+            if (!playerReady) { pending = video; return; }
+            var url = video ? (video.file_path || video.url || '') : '';
+            var key = video ? url + '|' + (video.timestamp || '') : null;
+            if (key === currentKey) return;
+            currentKey = key;
+            if (!video) {
+                player.stopVideo();
+                media.style.display = 'none';
+                media.removeAttribute('src');
+                showInfo('<strong>대기 중</strong>');
+                return;
+            }
+            var id = youtubeId(url);
+            if (id) {
+                // 같은 플레이어에서 영상만 교체 (페이지/임베드 재시작 없음)
+                media.style.display = 'none';
+                media.removeAttribute('src');
+                player.loadVideoById(id);
+            } else {
+                player.stopVideo();
+                var src = mediaUrl(url);
+                if (!src) {
+                    media.style.display = 'none';
+                    media.removeAttribute('src');
+                    showInfo('<strong>재생할 수 없는 주소입니다</strong>');
+                    return;
+                }
+                media.src = src;
+                media.style.display = 'block';
+            }
+            showInfo('<strong>현재 재생 중:</strong> ' + escapeHtml(video.title || ''));
+        }
+
+        function warm(item) {
+            if (warmed[item.url]) return;
+            warmed[item.url] = true;
+            if (item.thumbnail) { new Image().src = item.thumbnail; }
+            if (!item.video_id && mediaUrl(item.url)) {
+                // 로컬 파일은 앞부분만 받아 캐시를 데움
+                fetch(item.url, { headers: { Range: 'bytes=0-1048575' } }).catch(function () {});
+            }
+        }
+
+        // 곧 재생될 항목은 미리 불러오기만 함 - 영상 교체는 서버의 now-playing 이벤트로만
+        // (클레임, 우선순위 정책, 파일 확인, 재생 기록은 서버의 스케줄러가 처리)
+        function warmUpcoming(data) {
+            (data.items || []).forEach(warm);
+        }
+
+        function connect() {
+            var source = new EventSource(EVENTS_URL);
+            source.addEventListener('now-playing', function (e) {
+                apply(JSON.parse(e.data));
+            });
+            source.addEventListener('upcoming', function (e) {
+                warmUpcoming(JSON.parse(e.data));
+            });
+            source.onopen = function () { backoff = 1000; };
+            source.onerror = function () {
+                // 지수 백오프 + 지터로 다시 연결 (많은 화면이 동시에 재접속하지 않도록)
+                source.close();
+                showInfo('서버 연결 끊김 - 다시 연결 중...', true);
+                var delay = backoff / 2 + Math.random() * backoff / 2;
+                backoff = Math.min(backoff * 2, MAX_BACKOFF);
+                setTimeout(connect, delay);
+            };
+        }
+
+        window.onYouTubeIframeAPIReady = function () {
+            player = new YT.Player('player', {
+                width: '100%', height: '100%',
+                playerVars: { autoplay: 1, rel: 0, modestbranding: 1, playsinline: 1 },
+                events: {
+                    onReady: function () {
+                        playerReady = true;
+                        if (pending !== null) { var v = pending; pending = null; apply(v); }
+                    }
+                }
+            });
+        };
+
+        var tag = document.createElement('script');
+        tag.src = 'https://www.youtube.com/iframe_api';
+        document.head.appendChild(tag);
+        connect();
+    })();
+    </script>
+</body>
+</html>
+"""
+
+def render_player_page(events_url='/events', media_url=MEDIA_SERVER_URL):
+    """Return the kiosk player HTML (non-YouTube videos play only from ``media_url``'s origin)"""
+    return (PLAYER_PAGE.replace('__EVENTS_URL__', json.dumps(events_url))
+            .replace('__MEDIA_URL__', json.dumps(media_url)))
@@ -0,0 +1,114 @@
+# database/launcher.py
+import atexit
+import os
+import shlex
+import subprocess
+import sys
+import threading
+
+# 플랫폼별 기본 플레이어 (LOCAL_PLAYER 환경 변수로 변경 가능, 예: "mpv --fs")
+# 기본 플레이어는 파일을 다른 프로그램에 넘기고 바로 끝나므로 실제 플레이어는 추적되지 않음
+# (LOCAL_PLAYER_MAX 제한과 stop_all 은 LOCAL_PLAYER 로 플레이어를 직접 지정했을 때만 적용됨)
+DEFAULT_PLAYERS = {
+    'linux': ['xdg-open'],
+    'darwin': ['open'],
+}
+
+def get_max_players():
+    """Number of players allowed at once (LOCAL_PLAYER_MAX, read when the launcher is created)"""
+    return int(os.environ.get('LOCAL_PLAYER_MAX', '2'))
+
+def get_player_command():
+    """Return the player argv prefix for this platform, or None to use os.startfile.
+
+    A configured player gets ``--`` before the file so a path can never be read
+    as an option; xdg-open / open reject ``--``, so they only get absolute paths.
+    """
+    configured = os.environ.get('LOCAL_PLAYER')
+    if configured:
+        return shlex.split(configured) + ['--']
+    for platform, command in DEFAULT_PLAYERS.items():
+        if sys.platform.startswith(platform):
+            return list(command)
+    return None
+
+class PlaybackLauncher:
+    """Start local players without a shell and keep track of the child processes.
+
+    launch() only forks the player and returns; a waiter thread per child reaps
+    it as soon as it exits, and when the cap is reached the oldest player is
+    stopped to make room for the new one. With the default openers (xdg-open,
+    open) the tracked process is the opener itself, which exits at once, so the
+    cap only applies when LOCAL_PLAYER names the real player.
+    """
+
+    def __init__(self, command=None, max_players=None):
+        self.command = command if command is not None else get_player_command()
+        self.max_players = max_players if max_players is not None else get_max_players()
+        self._children = []
+        self._lock = threading.Lock()
+
+    def reap(self):
+        """Forget players that have exited; return how many are still running"""
+        with self._lock:
+            self._children = [p for p in self._children if p.poll() is None]
+            return len(self._children)
+
+    def launch(self, file_path):
+        """Open ``file_path`` in the configured player; return True if it was started"""
+        if self.command is None:
+            if os.name == 'nt':
+                os.startfile(file_path)
+                return True
+            print("로컬 플레이어가 설정되지 않았습니다 (LOCAL_PLAYER)")
+            return False
+
+        self.reap()
+        with self._lock:
+            while self.max_players and len(self._children) >= self.max_players:
+                oldest = self._children.pop(0)
+                oldest.terminate()
+            try:
+                # 절대 경로는 '-' 로 시작하지 않으므로 옵션으로 해석되지 않음
+                process = subprocess.Popen(
+                    self.command + [os.path.abspath(file_path)],
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    start_new_session=True,
+                )
+            except OSError as e:
+                print(f"플레이어 실행 오류: {e}")
+                return False
+            self._children.append(process)
+        # 끝난 플레이어를 바로 회수 (좀비 프로세스가 다음 실행까지 남지 않도록)
+        threading.Thread(target=self._wait, args=(process,), name='player-reaper', daemon=True).start()
+        return True
+
+    def _wait(self, process):
+        process.wait()
+        with self._lock:
+            if process in self._children:
+                self._children.remove(process)
+
+    def stop_all(self):
+        """Terminate every tracked player"""
+        with self._lock:
+            for process in self._children:
+                if process.poll() is None:
+                    process.terminate()
+            self._children = []
+
+_launcher = None
+_launcher_lock = threading.Lock()
+
+def get_launcher():
+    """Return the process-wide launcher (its players are stopped when the process exits)"""
+    global _launcher
+    if _launcher is None:
+        with _launcher_lock:
+            if _launcher is None:
+                _launcher = PlaybackLauncher()
+                # 앱 / 스케줄러가 끝나면 LOCAL_PLAYER 플레이어도 종료 (새 세션으로 실행되어 함께 끝나지 않음)
+                atexit.register(_launcher.stop_all)
+    return _launcher
@@ -0,0 +1,294 @@
+# database/load_test.py
+"""Load test for app.py with many concurrent Streamlit sessions.
+
+Run ``python -m database.load_test --sessions 200 --duration 180`` to drive
+headless sessions through Streamlit's testing API (``AppTest``) against a
+throwaway copy of the database. Every session reruns the script on an
+interval the way a browser's auto-refresh does, and some reruns run a search.
+scrapetube is replaced by an in-process fake unless ``--real-search`` is given.
+
+The report covers rerun throughput and p50/p90/p99 latency, failed reruns,
+write-lock wait, and duplicate fires, meaning the same
+schedule firing more than once for the same minute according to play_history.
+Exits with status 1 when there were duplicate fires.
+
+The write-lock wait comes from a synthetic probe: a separate connection that
+runs ``BEGIN IMMEDIATE`` / ``ROLLBACK`` every 200 ms. It shows how long a
+writer would wait under this load, not how long the app's own writes waited.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time as time_module
+import types
+from datetime import datetime, timedelta
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+SEARCH_WORDS = ['요가', '재즈', 'lofi', 'piano', '뉴스', 'morning', 'workout', '명상']
+
+# 가짜 scrapetube (네트워크 없이 검색 결과 생성)
+def fake_scrapetube(latency=0.2):
+    """Return a module that mimics scrapetube's generators with synthetic videos"""
+    module = types.ModuleType('scrapetube')
+
+    def _videos(prefix, limit):
+        time_module.sleep(latency)
+        for i in range(limit or 30):
+            video_id = f'{abs(hash((prefix, i))) % 10 ** 11:011d}'
+            yield {
+                'videoId': video_id,
+                'title': {'runs': [{'text': f'{prefix} {i}'}]},
+                'longBylineText': {'runs': [{'text': f'Channel {i % 5}'}]},
+                'lengthText': {'simpleText': f'{i % 20 + 1}:{i % 60:02d}'},
+                'viewCountText': {'simpleText': f'{(i + 1) * 1000:,} views'},
+                'shortViewCountText': {'simpleText': f'{i + 1}K views'},
+            }
+
+    module.get_search = lambda query, limit=None, **kwargs: _videos(query, limit)
+    module.get_channel = lambda channel_id=None, channel_url=None, limit=None, **kwargs: \
+        _videos(channel_id or channel_url, limit)
+    module.get_playlist = lambda playlist_id, limit=None, **kwargs: _videos(playlist_id, limit)
+    return module
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, int(round(p / 100 * len(values))) - 1))]
+
+# 테스트용 데이터베이스 준비
+def prepare_workdir(workdir, source_db=None, minutes=3, fires_per_minute=2):
+    """Create the database in ``workdir`` and seed schedules for the coming minutes (changes the cwd)"""
+    os.chdir(workdir)
+    if source_db:
+        shutil.copy(source_db, 'video_schedule.db')
+    from database.schedule_db import add_schedules, init_db
+    init_db()
+    now = datetime.now()
+    add_schedules([
+        ((now + timedelta(minutes=m)).strftime('%H:%M'),
+         f'https://www.youtube.com/watch?v=loadtest{m:03d}', 'youtube', f'load test {m}-{n}')
+        for m in range(1, minutes + 1) for n in range(fires_per_minute)])
+
+class LockProbe:
+    """Periodically take the write lock and record how long it took"""
+
+    def __init__(self, path, interval=0.2):
+        self.path = path
+        self.interval = interval
+        self.waits_ms = []
+        self.timeouts = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='lock-probe', daemon=True)
+
+    def _run(self):
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        while not self._stop.wait(self.interval):
+            started = time_module.perf_counter()
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute('ROLLBACK')
+                self.waits_ms.append((time_module.perf_counter() - started) * 1000)
+            except sqlite3.OperationalError:
+                self.timeouts += 1
+        conn.close()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+# 세션 하나 실행 (AppTest 로 스크립트를 반복 실행)
+def run_session(index, config, stats, lock):
+    from streamlit.testing.v1 import AppTest
+    rng = random.Random(index)
+    deadline = time_module.monotonic() + config['duration']
+    # 브라우저들이 동시에 열리지 않도록 시작 시점을 분산
+    time_module.sleep(rng.uniform(0, min(config['interval'], config['ramp_up'])))
+    at = AppTest.from_file(APP_PATH, default_timeout=config['timeout'])
+    at.query_params['screen'] = f'load-{index}'
+    ran = False
+    while time_module.monotonic() < deadline:
+        searched = False
+        if ran and rng.random() < config['search_ratio']:
+            try:
+                at.text_input(key='youtube_search').input(rng.choice(SEARCH_WORDS))
+                next(b for b in at.button if b.label == '🔍 검색').click()
+                searched = True
+            except (KeyError, StopIteration):
+                pass
+        started = time_module.perf_counter()
+        try:
+            at.run()
+            failed = [e.message for e in at.exception]
+        except Exception as e:
+            failed = [str(e)]
+        elapsed_ms = (time_module.perf_counter() - started) * 1000
+        ran = True
+        with lock:
+            stats['latencies_ms'].append(elapsed_ms)
+            if searched:
+                stats['search_latencies_ms'].append(elapsed_ms)
+            if failed:
+                stats['failed_reruns'] += 1
+                stats['errors'].extend(failed[:1])
+        # 다음 자동 새로고침까지 대기 (약간의 지터)
+        time_module.sleep(config['interval'] * rng.uniform(0.8, 1.2))
+
+# 프로세스 하나에서 여러 세션 실행 (세션마다 스레드 - Streamlit 서버와 같은 방식)
+def run_worker(indexes, config):
+    os.chdir(config['workdir'])
+    if not config['real_search']:
+        sys.modules['scrapetube'] = fake_scrapetube(config['search_latency'])
+    import database.schedule_db as schedule_db
+    stats = {'latencies_ms': [], 'search_latencies_ms': [], 'failed_reruns': 0,
+             'errors': [], 'check_failures': 0}
+    lock = threading.Lock()
+
+    # check_schedule_once 는 오류를 삼키므로 실패를 따로 셈
+    check_schedule_once = schedule_db.check_schedule_once
+
+    def counted_check(*args, **kwargs):
+        ok = check_schedule_once(*args, **kwargs)
+        if not ok:
+            with lock:
+                stats['check_failures'] += 1
+        return ok
+
+    schedule_db.check_schedule_once = counted_check
+    threads = [threading.Thread(target=run_session, args=(i, config, stats, lock), daemon=True)
+               for i in indexes]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    from database.play_history import flush_play_history
+    flush_play_history()
+    return stats
+
+def count_duplicate_fires(db_path, since):
+    conn = sqlite3.connect(db_path)
+    try:
+        fires = conn.execute('SELECT COUNT(*) FROM play_history WHERE fired_at >= ?', (since,)).fetchone()[0]
+        duplicates = conn.execute('''
+            SELECT COALESCE(SUM(n - 1), 0) FROM (
+                SELECT COUNT(*) AS n FROM play_history WHERE fired_at >= ?
+                GROUP BY schedule_id, scheduled_at HAVING COUNT(*) > 1
+            )
+        ''', (since,)).fetchone()[0]
+    finally:
+        conn.close()
+    return fires, duplicates
+
+def run(sessions=20, duration=120, interval=5.0, processes=1, search_ratio=0.05,
+        search_latency=0.2, real_search=False, source_db=None, workdir=None, timeout=30, ramp_up=10):
+    """Run the load test and return the summary dict (the working directory is restored afterwards)"""
+    original_cwd = os.getcwd()
+    try:
+        return _run(sessions, duration, interval, processes, search_ratio, search_latency,
+                    real_search, source_db, workdir, timeout, ramp_up)
+    finally:
+        os.chdir(original_cwd)
+
+def _run(sessions, duration, interval, processes, search_ratio, search_latency,
+         real_search, source_db, workdir, timeout, ramp_up):
+    workdir = os.path.abspath(workdir or tempfile.mkdtemp(prefix='video-schedule-load-'))
+    os.makedirs(workdir, exist_ok=True)
+    source_db = os.path.abspath(source_db) if source_db else None
+    # 앱은 DB / current_video.json 을 상대 경로로 열므로 실행하는 동안은 workdir 기준
+    prepare_workdir(workdir, source_db, minutes=max(1, int(duration // 60) + 1))
+    config = {'workdir': workdir, 'duration': duration, 'interval': interval,
+              'search_ratio': search_ratio, 'search_latency': search_latency,
+              'real_search': real_search, 'timeout': timeout, 'ramp_up': ramp_up}
+
+    db_path = os.path.join(workdir, 'video_schedule.db')
+    started_epoch = int(time_module.time())
+    probe = LockProbe(db_path)
+    probe.start()
+    started = time_module.perf_counter()
+    groups = [list(range(sessions))[p::processes] for p in range(processes)]
+    if processes == 1:
+        results = [run_worker(groups[0], config)]
+    else:
+        with multiprocessing.get_context('spawn').Pool(processes) as pool:
+            results = pool.starmap(run_worker, [(group, config) for group in groups])
+    elapsed = time_module.perf_counter() - started
+    probe.stop()
+
+    latencies = [v for r in results for v in r['latencies_ms']]
+    search_latencies = [v for r in results for v in r['search_latencies_ms']]
+    errors = [e for r in results for e in r['errors']]
+    fires, duplicates = count_duplicate_fires(db_path, started_epoch)
+    return {
+        'sessions': sessions,
+        'processes': processes,
+        'duration_s': round(elapsed, 1),
+        'reruns': len(latencies),
+        'reruns_per_s': round(len(latencies) / elapsed, 2) if elapsed else 0,
+        'rerun_ms': {p: percentile(latencies, p) for p in (50, 90, 99)},
+        'rerun_max_ms': max(latencies, default=None),
+        'search_rerun_ms': {p: percentile(search_latencies, p) for p in (50, 99)},
+        'failed_reruns': sum(r['failed_reruns'] for r in results),
+        'schedule_check_failures': sum(r['check_failures'] for r in results),
+        'lock_wait_ms': {p: percentile(probe.waits_ms, p) for p in (50, 99)},
+        'lock_wait_max_ms': max(probe.waits_ms, default=None),
+        'lock_timeouts': probe.timeouts,
+        'fires': fires,
+        'duplicate_fires': duplicates,
+        'sample_errors': list(dict.fromkeys(errors))[:5],
+        'workdir': workdir,
+    }
+
+def print_report(summary):
+    def ms(value):
+        return '-' if value is None else f'{value:.0f} ms'
+
+    print(f"Sessions: {summary['sessions']} in {summary['processes']} process(es), "
+          f"{summary['duration_s']} s")
+    print(f"Reruns: {summary['reruns']} ({summary['reruns_per_s']}/s), failed {summary['failed_reruns']}, "
+          f"schedule check errors {summary['schedule_check_failures']}")
+    print("Rerun latency: " + ', '.join(f"p{p} {ms(v)}" for p, v in summary['rerun_ms'].items())
+          + f", max {ms(summary['rerun_max_ms'])}")
+    print("Search rerun latency: " + ', '.join(f"p{p} {ms(v)}" for p, v in summary['search_rerun_ms'].items()))
+    print("Write lock wait (synthetic BEGIN IMMEDIATE probe, not the app's own writes): " + ', '.join(f"p{p} {ms(v)}" for p, v in summary['lock_wait_ms'].items())
+          + f", max {ms(summary['lock_wait_max_ms'])}, timeouts {summary['lock_timeouts']}")
+    print(f"Fires: {summary['fires']}, duplicate fires: {summary['duplicate_fires']}")
+    for error in summary['sample_errors']:
+        print(f"  error: {error}")
+    print(f"Database: {summary['workdir']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test app.py with concurrent Streamlit sessions')
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=120, help='seconds')
+    parser.add_argument('--interval', type=float, default=5.0, help='seconds between reruns per session')
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--search-ratio', type=float, default=0.05, help='share of reruns that search')
+    parser.add_argument('--search-latency', type=float, default=0.2, help='fake search delay (seconds)')
+    parser.add_argument('--real-search', action='store_true', help='use the real scrapetube')
+    parser.add_argument('--db', help='copy this database as the starting data')
+    parser.add_argument('--workdir', help='directory for the test database (default: new temp dir)')
+    parser.add_argument('--json', help='also write the summary to this file')
+    args = parser.parse_args(argv)
+
+    summary = run(sessions=args.sessions, duration=args.duration, interval=args.interval,
+                  processes=max(1, args.processes), search_ratio=args.search_ratio,
+                  search_latency=args.search_latency, real_search=args.real_search,
+                  source_db=args.db, workdir=args.workdir)
+    print_report(summary)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+    return 1 if summary['duplicate_fires'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
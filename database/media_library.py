@@ -0,0 +1,275 @@
+# database/media_library.py
+import difflib
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time as time_module
+
+from database.connection import DEFAULT_TENANT, get_connection, get_tenant
+
+# 색인할 미디어 폴더 (MEDIA_DIRS 환경 변수, os.pathsep 로 구분)
+MEDIA_DIRS = [d for d in os.environ.get('MEDIA_DIRS', '').split(os.pathsep) if d]
+MEDIA_EXTENSIONS = {
+    '.mp4', '.mkv', '.webm', '.mov', '.avi', '.m4v',
+    '.mp3', '.m4a', '.wav', '.flac', '.ogg',
+    '.html', '.htm',
+}
+# watchdog 이 없을 때 다시 스캔하는 주기 (초)
+RESCAN_INTERVAL = 300
+
+_library_thread = None
+_library_lock = threading.Lock()
+
+# 미디어 라이브러리 테이블 초기화
+def init_media_library(conn):
+    """Create the local media index"""
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS media_files (
+            path TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime INTEGER NOT NULL,
+            duration REAL,
+            indexed_at INTEGER NOT NULL
+        )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_media_files_name ON media_files (name COLLATE NOCASE)')
+
+# 미디어 폴더는 모든 테넌트가 공유하므로 색인은 기본 테넌트 데이터베이스 하나에 둠
+def _index_connection():
+    return get_connection(DEFAULT_TENANT)
+
+def _normalize(path):
+    return os.path.abspath(os.path.expanduser(path))
+
+def _library_roots(dirs=None):
+    return [_normalize(d) for d in (dirs if dirs is not None else MEDIA_DIRS)]
+
+def _is_media(name):
+    return os.path.splitext(name)[1].lower() in MEDIA_EXTENSIONS
+
+# 재생 시간 확인 (ffprobe 가 있을 때만)
+def probe_duration(path):
+    """Return the media duration in seconds, or None if it cannot be probed"""
+    ffprobe = shutil.which('ffprobe')
+    if not ffprobe or path.lower().endswith(('.html', '.htm')):
+        return None
+    try:
+        result = subprocess.run(
+            [ffprobe, '-v', 'quiet', '-print_format', 'json', '-show_format', path],
+            capture_output=True, timeout=10, check=False)
+        return float(json.loads(result.stdout)['format']['duration'])
+    except (OSError, subprocess.SubprocessError, ValueError, KeyError):
+        return None
+
+def _walk(root):
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file() and _is_media(entry.name):
+                        yield entry
+        except OSError:
+            continue
+
+# 폴더 스캔 (변경된 파일만 다시 확인)
+def scan_library(dirs=None):
+    """Index every media file under the configured folders; return the number of changed rows"""
+    roots = _library_roots(dirs)
+    conn = _index_connection()
+    try:
+        known = {row[0]: (row[1], row[2]) for row in conn.execute('SELECT path, size, mtime FROM media_files')}
+        seen = set()
+        upserts = []
+        now = int(time_module.time())
+        for root in roots:
+            for entry in _walk(root):
+                path = _normalize(entry.path)
+                seen.add(path)
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                if known.get(path) == (stat.st_size, int(stat.st_mtime)):
+                    continue
+                upserts.append((path, entry.name, stat.st_size, int(stat.st_mtime),
+                                probe_duration(path), now))
+        removed = [(path,) for path in known
+                   if path not in seen and any(path.startswith(root + os.sep) for root in roots)]
+        with conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO media_files (path, name, size, mtime, duration, indexed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', upserts)
+            conn.executemany('DELETE FROM media_files WHERE path = ?', removed)
+        return len(upserts) + len(removed)
+    finally:
+        conn.close()
+
+def index_file(path):
+    """Add or refresh a single file in the index (used by the watcher)"""
+    path = _normalize(path)
+    if not _is_media(path):
+        return
+    try:
+        stat = os.stat(path)
+    except OSError:
+        remove_file(path)
+        return
+    conn = _index_connection()
+    try:
+        with conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO media_files (path, name, size, mtime, duration, indexed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (path, os.path.basename(path), stat.st_size, int(stat.st_mtime),
+                  probe_duration(path), int(time_module.time())))
+    finally:
+        conn.close()
+
+def remove_file(path):
+    """Drop a file (or every file under a folder) from the index"""
+    path = _normalize(path)
+    conn = _index_connection()
+    try:
+        with conn:
+            conn.execute("DELETE FROM media_files WHERE path = ? OR path LIKE ? ESCAPE '\\'",
+                         (path, _escape_like(path + os.sep) + '%'))
+    finally:
+        conn.close()
+
+def _escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+# 폴더 감시 (watchdog 사용, 없으면 주기적 스캔)
+def _watch(roots):
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        while True:
+            time_module.sleep(RESCAN_INTERVAL)
+            try:
+                scan_library(roots)
+            except Exception as e:
+                print(f"Media library scan error: {e}")
+
+    class Handler(FileSystemEventHandler):
+        def on_created(self, event):
+            if not event.is_directory:
+                index_file(event.src_path)
+
+        def on_modified(self, event):
+            if not event.is_directory:
+                index_file(event.src_path)
+
+        def on_deleted(self, event):
+            remove_file(event.src_path)
+
+        def on_moved(self, event):
+            remove_file(event.src_path)
+            if not event.is_directory:
+                index_file(event.dest_path)
+
+    observer = Observer()
+    for root in roots:
+        if os.path.isdir(root):
+            observer.schedule(Handler(), root, recursive=True)
+    observer.start()
+    observer.join()
+
+def start_library(dirs=None):
+    """Scan the media folders once and keep the index up to date in the background"""
+    global _library_thread
+    roots = _library_roots(dirs)
+    if not roots:
+        return
+
+    def run():
+        try:
+            scan_library(roots)
+        except Exception as e:
+            print(f"Media library scan error: {e}")
+        _watch(roots)
+
+    with _library_lock:
+        if _library_thread is None or not _library_thread.is_alive():
+            _library_thread = threading.Thread(target=run, name='media-library', daemon=True)
+            _library_thread.start()
+
+# 파일 존재 확인 (색인 조회)
+def media_exists(path):
+    """Check a local path against the index; paths outside the library fall back to the filesystem"""
+    path = _normalize(path)
+    roots = _library_roots()
+    if not any(path.startswith(root + os.sep) for root in roots):
+        return os.path.exists(path)
+    conn = _index_connection()
+    try:
+        return conn.execute('SELECT 1 FROM media_files WHERE path = ?', (path,)).fetchone() is not None
+    finally:
+        conn.close()
+
+# 미디어 검색 (접두어 → 부분 일치 → 유사 검색)
+def search_media(query, limit=20):
+    """Return [(path, name, size, duration)] matching ``query`` by prefix, substring, then fuzzily"""
+    query = (query or '').strip()
+    conn = _index_connection()
+    try:
+        if not query:
+            return conn.execute(
+                'SELECT path, name, size, duration FROM media_files ORDER BY name COLLATE NOCASE LIMIT ?',
+                (limit,)).fetchall()
+        pattern = _escape_like(query)
+        rows = conn.execute('''
+            SELECT path, name, size, duration FROM media_files
+            WHERE name LIKE ? ESCAPE '\\' ORDER BY name COLLATE NOCASE LIMIT ?
+        ''', (pattern + '%', limit)).fetchall()
+        if len(rows) < limit:
+            found = {row[0] for row in rows}
+            rows += [row for row in conn.execute('''
+                SELECT path, name, size, duration FROM media_files
+                WHERE name LIKE ? ESCAPE '\\' ORDER BY name COLLATE NOCASE LIMIT ?
+            ''', ('%' + pattern + '%', limit)) if row[0] not in found][:limit - len(rows)]
+        if not rows:
+            names = {os.path.splitext(row[1])[0].lower(): row
+                     for row in conn.execute('SELECT path, name, size, duration FROM media_files')}
+            rows = [names[name] for name in difflib.get_close_matches(query.lower(), list(names), n=limit, cutoff=0.4)]
+        return rows
+    finally:
+        conn.close()
+
+# 파일이 없는 로컬 스케줄 찾기
+def get_broken_schedules():
+    """Return {schedule_id: file_path} for active local/html schedules whose file is missing"""
+    roots = _library_roots()
+    conn = get_connection()
+    # 색인은 기본 테넌트 DB 에 있음 - 기본 테넌트면 같은 연결로 모두 확인
+    index = conn if get_tenant() == DEFAULT_TENANT else _index_connection()
+    broken = {}
+    try:
+        rows = conn.execute('''
+            SELECT id, file_path FROM schedules
+            WHERE file_type IN ('local', 'html') AND is_active = 1
+        ''').fetchall()
+        for schedule_id, file_path in rows:
+            path = _normalize(file_path)
+            if any(path.startswith(root + os.sep) for root in roots):
+                # 라이브러리 안의 경로는 색인이 기준
+                if index.execute('SELECT 1 FROM media_files WHERE path = ?', (path,)).fetchone():
+                    continue
+            elif os.path.exists(path):
+                continue
+            broken[schedule_id] = file_path
+    finally:
+        if index is not conn:
+            index.close()
+        conn.close()
+    return broken
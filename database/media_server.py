@@ -0,0 +1,225 @@
+# database/media_server.py
+import email.utils
+import hashlib
+import hmac
+import mimetypes
+import os
+import sqlite3
+import threading
+import time as time_module
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from database.connection import (
+    DEFAULT_TENANT,
+    TENANT_TOKENS,
+    get_connection,
+    get_tenant,
+    is_configured_tenant)
+from database.media_library import MEDIA_DIRS
+
+# 내장 미디어 서버 설정 (기본: 이 컴퓨터에서만 접속 가능, 원격 화면에 제공하려면 0.0.0.0)
+MEDIA_SERVER_HOST = os.environ.get('MEDIA_SERVER_HOST', '127.0.0.1')
+MEDIA_SERVER_PORT = int(os.environ.get('MEDIA_SERVER_PORT', '8765'))
+# 브라우저에서 접근할 주소 (원격 서버라면 공개 주소로 설정)
+MEDIA_SERVER_URL = os.environ.get('MEDIA_SERVER_URL', f'http://localhost:{MEDIA_SERVER_PORT}').rstrip('/')
+# 허용 경로 목록 캐시 시간 (초)
+ALLOWED_TTL = 10
+# 스크립트에서 파일을 읽을 수 있는 출처 (쉼표로 구분, 예: 키오스크 주소 http://host:8000)
+MEDIA_CORS_ORIGINS = frozenset(
+    o.strip().rstrip('/') for o in os.environ.get('MEDIA_CORS_ORIGINS', '').split(',') if o.strip())
+
+_server = None
+_server_lock = threading.Lock()
+# 테넌트별 (읽은 시각, 파일 목록)
+_allowed = {}
+_allowed_lock = threading.Lock()
+
+def _signature(tenant, path):
+    """Return the URL signature for ``path`` if the tenant has a TENANT_TOKENS token, else None"""
+    for token, owner in TENANT_TOKENS.items():
+        if owner == tenant:
+            return hmac.new(token.encode('utf-8'), path.encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+    return None
+
+def media_url(file_path, tenant=None):
+    """Return the URL the browser uses to load a local file through the media server.
+
+    Files are served from the tenant's own prefix (``/t/<tenant>/media/...``,
+    plain ``/media/...`` for the default tenant) and only if one of that
+    tenant's schedules uses them. A tenant with a token also gets a signed URL,
+    so other clients cannot build it from the tenant name.
+    """
+    tenant = tenant or get_tenant()
+    path = '/' + os.path.abspath(os.path.expanduser(file_path)).replace(os.sep, '/').lstrip('/')
+    prefix = '' if tenant == DEFAULT_TENANT else f'/t/{tenant}'
+    url = f"{MEDIA_SERVER_URL}{prefix}/media{quote(path)}"
+    signature = _signature(tenant, path)
+    return f"{url}?sig={signature}" if signature else url
+
+def _allowed_paths(tenant):
+    """Exact files of the tenant's local / html schedules, plus everything under MEDIA_DIRS"""
+    now = time_module.monotonic()
+    with _allowed_lock:
+        loaded_at, files = _allowed.get(tenant, (0.0, frozenset()))
+        if now - loaded_at >= ALLOWED_TTL:
+            conn = get_connection(tenant)
+            try:
+                rows = conn.execute(
+                    "SELECT file_path FROM schedules WHERE file_type IN ('local', 'html')").fetchall()
+            except sqlite3.OperationalError:
+                rows = []  # 아직 초기화되지 않은 테넌트
+            finally:
+                conn.close()
+            files = frozenset(os.path.abspath(path) for path, in rows)
+            _allowed[tenant] = (now, files)
+    # html 페이지가 옆 파일(이미지, css)을 쓰려면 그 폴더를 MEDIA_DIRS 에 추가해야 함 (모든 테넌트가 공유)
+    roots = tuple(os.path.abspath(d) + os.sep for d in MEDIA_DIRS)
+    return files, roots
+
+def _parse_range(header, size):
+    """Parse a single ``bytes=`` range; return (start, end) inclusive, None for no range, or False if unsatisfiable"""
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    start_text, _, end_text = header[6:].strip().partition('-')
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # bytes=-N : 마지막 N 바이트
+            length = int(end_text)
+            start, end = max(0, size - length), size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        return False
+    return start, min(end, size - 1)
+
+class MediaRequestHandler(BaseHTTPRequestHandler):
+    """Serve allowed local files with range, ETag and Last-Modified support"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'VideoSchedulerMedia/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _resolve(self):
+        url = urlsplit(self.path)
+        request_path = unquote(url.path)
+        tenant = DEFAULT_TENANT
+        if request_path.startswith('/t/'):
+            tenant, _, rest = request_path[len('/t/'):].partition('/')
+            request_path = '/' + rest
+        if not request_path.startswith('/media/') or not is_configured_tenant(tenant):
+            return None
+        signature = _signature(tenant, request_path[len('/media'):])
+        if signature and not hmac.compare_digest(
+                signature, parse_qs(url.query).get('sig', [''])[-1]):
+            return None
+        path = os.path.abspath(request_path[len('/media'):].replace('/', os.sep))
+        if os.name == 'nt':
+            path = path.lstrip(os.sep)
+        files, roots = _allowed_paths(tenant)
+        if path in files or path.startswith(roots):
+            return path
+        return None
+
+    def _serve(self, send_body):
+        path = self._resolve()
+        if path is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        with f:
+            stat = os.fstat(f.fileno())
+            size = stat.st_size
+            etag = f'"{size:x}-{stat.st_mtime_ns:x}"'
+            last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+
+            if self._not_modified(etag, stat.st_mtime):
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', last_modified)
+                self.end_headers()
+                return
+
+            byte_range = _parse_range(self.headers.get('Range'), size)
+            if_range = self.headers.get('If-Range')
+            if byte_range and if_range and if_range not in (etag, last_modified):
+                byte_range = None
+            if byte_range is False:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            if byte_range:
+                start, end = byte_range
+                self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            else:
+                start, end = 0, size - 1
+                self.send_response(HTTPStatus.OK)
+            length = end - start + 1 if size else 0
+            self.send_header('Content-Type', mimetypes.guess_type(path)[0] or 'application/octet-stream')
+            self.send_header('Content-Length', str(length))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', last_modified)
+            self.send_header('Cache-Control', 'no-cache')
+            origin = self.headers.get('Origin')
+            if origin and origin.rstrip('/') in MEDIA_CORS_ORIGINS:
+                self.send_header('Access-Control-Allow-Origin', origin)
+            self.send_header('Vary', 'Origin')
+            self.end_headers()
+
+            if send_body and length:
+                # socket.sendfile 은 가능하면 os.sendfile (zero-copy) 을 사용
+                try:
+                    self.connection.sendfile(f, offset=start, count=length)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+    def _not_modified(self, etag, mtime):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return if_none_match.strip() == '*' or etag in [t.strip() for t in if_none_match.split(',')]
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(mtime) <= since
+        return False
+
+def start_media_server(host=MEDIA_SERVER_HOST, port=MEDIA_SERVER_PORT):
+    """Start the media server in a background thread (once per process)"""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+        try:
+            server = ThreadingHTTPServer((host, port), MediaRequestHandler)
+        except OSError as e:
+            # 다른 세션/프로세스가 이미 실행 중
+            print(f"Media server not started: {e}")
+            return None
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='media-server', daemon=True).start()
+        _server = server
+        return server
@@ -0,0 +1,197 @@
+# database/migrations.py
+import re
+from datetime import datetime, timedelta
+
+# "HH:MM" 재생 시간 (CHECK 제약과 같은 형식)
+_TIME = re.compile(r'^\s*(\d{1,2}):(\d{1,2})\s*$')
+
+def parse_schedule_time(text):
+    """Return (``HH:MM``, minute of day) for a schedule time, or raise ValueError"""
+    match = _TIME.match(text or '')
+    if match:
+        hour, minute = int(match.group(1)), int(match.group(2))
+        if hour < 24 and minute < 60:
+            return f'{hour:02d}:{minute:02d}', hour * 60 + minute
+    raise ValueError(f'invalid schedule time: {text!r}')
+
+def _columns(c, table):
+    return {row[1] for row in c.execute(f'PRAGMA table_info({table})')}
+
+def _create_version_triggers(c):
+    for name, event in (('insert', 'INSERT'), ('delete', 'DELETE'),
+                        ('update', 'UPDATE OF schedule_time, file_path, file_type, title, is_active')):
+        c.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS schedules_version_{name} AFTER {event} ON schedules
+            BEGIN
+                UPDATE schedule_version SET version = version + 1 WHERE id = 1;
+            END
+        ''')
+
+# 1: 처음 스키마 (예전 try/except ALTER 로 추가하던 컬럼 포함)
+def _initial_schema(c):
+    from database.schedule_db import extract_video_id
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS schedules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            schedule_time TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            file_type TEXT NOT NULL,
+            title TEXT,
+            is_active INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_played TEXT DEFAULT NULL
+        )
+    ''')
+    columns = _columns(c, 'schedules')
+    if 'last_played' not in columns:
+        c.execute('ALTER TABLE schedules ADD COLUMN last_played TEXT DEFAULT NULL')
+    if 'video_id' not in columns:
+        c.execute('ALTER TABLE schedules ADD COLUMN video_id TEXT DEFAULT NULL')
+    missing = c.execute(
+        "SELECT id, file_path FROM schedules WHERE file_type = 'youtube' AND video_id IS NULL").fetchall()
+    c.executemany('UPDATE schedules SET video_id = ? WHERE id = ?',
+                  [(extract_video_id(path), schedule_id) for schedule_id, path in missing])
+
+# 2: 스케줄 데이터 버전 (API ETag / 캐시 무효화용)
+def _schedule_version(c):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS schedule_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    c.execute('INSERT OR IGNORE INTO schedule_version (id, version) VALUES (1, 0)')
+    _create_version_triggers(c)
+
+# 3: 정수 시간 컬럼 + CHECK 제약 (SQLite 는 제약 추가에 테이블 재생성이 필요)
+def _typed_schedules(c):
+    """Rebuild schedules with minute-of-day / epoch columns and CHECK constraints.
+
+    ``schedule_time`` stays as the display value; ``schedule_minute`` is what
+    queries compare. ``last_played_at`` is the epoch second of the fired
+    minute, so the same time on the next day is no longer mistaken for a repeat.
+    Ids are kept, so the external-content search index stays valid; its
+    triggers are recreated by init_fulltext().
+    """
+    now = datetime.now()
+    rows = []
+    for (schedule_id, schedule_time, file_path, file_type, title, is_active,
+         created_at, last_played, video_id) in c.execute('''
+            SELECT id, schedule_time, file_path, file_type, title, is_active,
+                   created_at, last_played, video_id
+            FROM schedules
+        ''').fetchall():
+        try:
+            schedule_time, schedule_minute = parse_schedule_time(schedule_time)
+        except ValueError:
+            # 재생할 수 없는 시간은 비활성화해서 보존
+            print(f"Invalid schedule time {schedule_time!r} (id {schedule_id}), deactivated")
+            schedule_time, schedule_minute, is_active = '00:00', 0, 0
+        # 마지막 재생 "HH:MM" -> 그 시각이 가장 최근에 지난 순간
+        last_played_at = None
+        try:
+            _, played_minute = parse_schedule_time(last_played)
+            played = now.replace(hour=played_minute // 60, minute=played_minute % 60, second=0, microsecond=0)
+            if played > now:
+                played -= timedelta(days=1)
+            last_played_at = int(played.timestamp())
+        except ValueError:
+            pass
+        rows.append((schedule_id, schedule_time, schedule_minute, file_path, file_type, title,
+                     1 if is_active else 0, created_at, last_played, last_played_at, video_id))
+
+    c.execute('''
+        CREATE TABLE schedules_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            schedule_time TEXT NOT NULL CHECK (schedule_time GLOB '[0-2][0-9]:[0-5][0-9]'),
+            schedule_minute INTEGER NOT NULL CHECK (schedule_minute BETWEEN 0 AND 1439
+                AND schedule_minute = CAST(substr(schedule_time, 1, 2) AS INTEGER) * 60
+                                    + CAST(substr(schedule_time, 4, 2) AS INTEGER)),
+            file_path TEXT NOT NULL CHECK (file_path != ''),
+            file_type TEXT NOT NULL CHECK (file_type IN ('youtube', 'local', 'html')),
+            title TEXT,
+            is_active INTEGER NOT NULL DEFAULT 1 CHECK (is_active IN (0, 1)),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_played TEXT DEFAULT NULL,
+            last_played_at INTEGER DEFAULT NULL,
+            video_id TEXT DEFAULT NULL
+        )
+    ''')
+    c.executemany('''
+        INSERT INTO schedules_new
+            (id, schedule_time, schedule_minute, file_path, file_type, title, is_active,
+             created_at, last_played, last_played_at, video_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    c.execute('DROP TABLE schedules')
+    c.execute('ALTER TABLE schedules_new RENAME TO schedules')
+    # 재생 확인: 활성 스케줄을 분 단위 범위로 조회
+    c.execute('CREATE INDEX idx_schedules_active_minute ON schedules (is_active, schedule_minute)')
+    c.execute('CREATE INDEX idx_schedules_minute ON schedules (schedule_minute, id)')
+    c.execute('CREATE INDEX idx_schedules_video_id ON schedules (video_id)')
+    _create_version_triggers(c)
+    c.execute('UPDATE schedule_version SET version = version + 1 WHERE id = 1')
+
+# 4: 재생 길이 / 우선순위 (겹침 확인용)
+def _duration_priority(c):
+    columns = _columns(c, 'schedules')
+    if 'duration_seconds' not in columns:
+        c.execute('''
+            ALTER TABLE schedules ADD COLUMN duration_seconds INTEGER DEFAULT NULL
+                CHECK (duration_seconds IS NULL OR duration_seconds >= 0)
+        ''')
+    if 'priority' not in columns:
+        c.execute('ALTER TABLE schedules ADD COLUMN priority INTEGER NOT NULL DEFAULT 0')
+    # 구독 카탈로그에 있는 영상은 길이를 알고 있음
+    if c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'videos'").fetchone():
+        c.execute('''
+            UPDATE schedules SET duration_seconds = (
+                SELECT v.duration_seconds FROM videos v WHERE v.video_id = schedules.video_id)
+            WHERE video_id IS NOT NULL AND duration_seconds IS NULL
+        ''')
+    # 길이 / 우선순위가 바뀌어도 버전이 올라가도록 트리거 교체
+    c.execute('DROP TRIGGER IF EXISTS schedules_version_update')
+    c.execute('''
+        CREATE TRIGGER schedules_version_update AFTER UPDATE OF
+            schedule_time, schedule_minute, file_path, file_type, title, is_active, duration_seconds, priority
+        ON schedules
+        BEGIN
+            UPDATE schedule_version SET version = version + 1 WHERE id = 1;
+        END
+    ''')
+
+# (버전, 설명, 함수) - 새 마이그레이션은 항상 끝에 추가
+MIGRATIONS = [
+    (1, 'initial schedules schema', _initial_schema),
+    (2, 'schedule version counter', _schedule_version),
+    (3, 'typed schedule columns and constraints', _typed_schedules),
+    (4, 'schedule duration and priority', _duration_priority),
+]
+
+def get_schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+# 마이그레이션 실행
+def migrate(conn):
+    """Apply pending migrations in order, each in its own transaction.
+
+    The applied version is kept in ``PRAGMA user_version``. BEGIN IMMEDIATE
+    makes concurrent starters wait for each other, and the version is re-read
+    inside the transaction so a migration never runs twice.
+    """
+    applied = []
+    for version, description, apply in MIGRATIONS:
+        if get_schema_version(conn) >= version:
+            continue
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if get_schema_version(conn) < version:
+                apply(conn.cursor())
+                conn.execute(f'PRAGMA user_version = {int(version)}')
+                applied.append(version)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            print(f"Migration {version} ({description}) failed")
+            raise
+    return applied
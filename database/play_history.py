@@ -0,0 +1,243 @@
+# database/play_history.py
+import atexit
+import math
+import queue
+import threading
+import time as time_module
+from datetime import datetime, timedelta, timezone
+
+from database.conflicts import CONFLICT_POLICY, get_timeline
+from database.connection import get_connection, get_tenant, list_tenants
+
+# 배치 쓰기 설정: BATCH_SIZE 건이 모이거나 FLUSH_INTERVAL 초가 지나면 한 번에 기록
+BATCH_SIZE = 100
+FLUSH_INTERVAL = 2.0
+# 원본 기록 보관 기간 (이후 시간별 집계로 압축)
+RETENTION_DAYS = 30
+COMPACT_INTERVAL = 6 * 60 * 60
+
+_pending = queue.SimpleQueue()
+_wakeup = threading.Event()
+_writer_lock = threading.Lock()
+_writer_thread = None
+_flush_lock = threading.Lock()
+_last_compact = 0.0
+
+# 재생 기록 테이블 초기화
+def init_play_history(conn):
+    """Create the append-only play ledger and its hourly rollup table"""
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS play_history (
+            id INTEGER PRIMARY KEY,
+            schedule_id INTEGER NOT NULL,
+            scheduled_at INTEGER NOT NULL,
+            fired_at INTEGER NOT NULL,
+            lateness_ms INTEGER NOT NULL,
+            screen TEXT,
+            file_type TEXT
+        )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_play_history_fired_at ON play_history (fired_at)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_play_history_scheduled ON play_history (scheduled_at, schedule_id)')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS play_history_hourly (
+            hour_start INTEGER NOT NULL,
+            schedule_id INTEGER NOT NULL,
+            screen TEXT NOT NULL DEFAULT '',
+            fires INTEGER NOT NULL,
+            lateness_sum_ms INTEGER NOT NULL,
+            lateness_max_ms INTEGER NOT NULL,
+            PRIMARY KEY (hour_start, schedule_id, screen)
+        ) WITHOUT ROWID
+    ''')
+
+# 재생 기록 추가 (비동기 배치 쓰기)
+def record_play(schedule_id, scheduled_at, fired_at, screen=None, file_type=None):
+    """Queue a fire for the ledger without touching the database.
+
+    ``scheduled_at`` and ``fired_at`` are datetimes; they are stored as integer
+    epoch seconds, with lateness kept in milliseconds.
+    """
+    lateness_ms = max(0, int((fired_at - scheduled_at).total_seconds() * 1000))
+    # 기록은 나중에 쓰기 스레드에서 하므로 지금 테넌트를 함께 넣어 둠
+    _pending.put((get_tenant(), (
+        schedule_id,
+        int(scheduled_at.timestamp()),
+        int(fired_at.timestamp()),
+        lateness_ms,
+        screen,
+        file_type,
+    )))
+    _wakeup.set()
+    _ensure_writer()
+
+def _ensure_writer():
+    global _writer_thread
+    if _writer_thread is not None and _writer_thread.is_alive():
+        return
+    with _writer_lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(target=_writer_loop, name='play-history-writer', daemon=True)
+            _writer_thread.start()
+
+def _drain():
+    batch = []
+    while len(batch) < BATCH_SIZE:
+        try:
+            batch.append(_pending.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+def _write_batch(batch):
+    by_tenant = {}
+    for tenant, row in batch:
+        by_tenant.setdefault(tenant, []).append(row)
+    for tenant, rows in by_tenant.items():
+        conn = get_connection(tenant)
+        try:
+            with conn:
+                conn.executemany('''
+                    INSERT INTO play_history (schedule_id, scheduled_at, fired_at, lateness_ms, screen, file_type)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', rows)
+        finally:
+            conn.close()
+
+def _writer_loop():
+    global _last_compact
+    while True:
+        # 조금 더 모아서 한 트랜잭션으로 기록
+        if _wakeup.wait(timeout=FLUSH_INTERVAL):
+            time_module.sleep(FLUSH_INTERVAL / 4)
+        _wakeup.clear()
+        try:
+            flush_play_history()
+            if time_module.time() - _last_compact > COMPACT_INTERVAL:
+                _last_compact = time_module.time()
+                for tenant in list_tenants():
+                    compact_play_history(tenant=tenant)
+        except Exception as e:
+            print(f"Play history write error: {e}")
+
+def flush_play_history():
+    """Write every queued fire now (used before reads and at exit)"""
+    with _flush_lock:
+        while True:
+            batch = _drain()
+            if not batch:
+                break
+            _write_batch(batch)
+
+atexit.register(flush_play_history)
+
+# 오래된 기록 압축 (시간별 집계로 롤업)
+def compact_play_history(retention_days=RETENTION_DAYS, tenant=None):
+    """Roll raw fires older than the retention window into hourly rows"""
+    cutoff = int(time_module.time()) - retention_days * 86400
+    conn = get_connection(tenant)
+    try:
+        with conn:
+            conn.execute('''
+                INSERT INTO play_history_hourly
+                    (hour_start, schedule_id, screen, fires, lateness_sum_ms, lateness_max_ms)
+                SELECT fired_at - fired_at % 3600, schedule_id, COALESCE(screen, ''),
+                       COUNT(*), SUM(lateness_ms), MAX(lateness_ms)
+                FROM play_history
+                WHERE fired_at < ?
+                GROUP BY 1, 2, 3
+                ON CONFLICT (hour_start, schedule_id, screen) DO UPDATE SET
+                    fires = fires + excluded.fires,
+                    lateness_sum_ms = lateness_sum_ms + excluded.lateness_sum_ms,
+                    lateness_max_ms = MAX(lateness_max_ms, excluded.lateness_max_ms)
+            ''', (cutoff,))
+            removed = conn.execute('DELETE FROM play_history WHERE fired_at < ?', (cutoff,)).rowcount
+        return removed
+    finally:
+        conn.close()
+
+# 시간별 재생 횟수
+def get_fires_per_hour(since):
+    """Return [(hour_start_epoch, fires)] since the given datetime, raw and rolled up"""
+    flush_play_history()
+    since_ts = int(since.timestamp())
+    conn = get_connection()
+    try:
+        rows = conn.execute('''
+            SELECT hour_start, SUM(fires) FROM (
+                SELECT fired_at - fired_at % 3600 AS hour_start, COUNT(*) AS fires
+                FROM play_history WHERE fired_at >= ? GROUP BY 1
+                UNION ALL
+                SELECT hour_start, SUM(fires) FROM play_history_hourly
+                WHERE hour_start >= ? GROUP BY 1
+            ) GROUP BY hour_start ORDER BY hour_start
+        ''', (since_ts, since_ts - since_ts % 3600)).fetchall()
+    finally:
+        conn.close()
+    return rows
+
+# 지연 시간 백분위수 (ms)
+def get_lateness_percentiles(since, percentiles=(50, 90, 99)):
+    """Return {percentile: lateness_ms} over raw fires since the given datetime (nearest rank)"""
+    flush_play_history()
+    since_ts = int(since.timestamp())
+    result = {}
+    conn = get_connection()
+    try:
+        count = conn.execute('SELECT COUNT(*) FROM play_history WHERE fired_at >= ?', (since_ts,)).fetchone()[0]
+        if not count:
+            return {}
+        # 값마다 한 행만 읽음 (전체 기록을 Python 으로 가져오지 않음)
+        for p in percentiles:
+            rank = min(count, max(1, math.ceil(p / 100 * count)))
+            result[p] = conn.execute('''
+                SELECT lateness_ms FROM play_history WHERE fired_at >= ?
+                ORDER BY lateness_ms LIMIT 1 OFFSET ?
+            ''', (since_ts, rank - 1)).fetchone()[0]
+    finally:
+        conn.close()
+    return result
+
+# 놓친 스케줄 조회
+def get_missed_schedules(day=None):
+    """Return active schedules whose time already passed on ``day`` without a fire.
+
+    Under the 'priority' policy a schedule outranked by another one is not
+    supposed to play, so it is not reported.
+    """
+    flush_play_history()
+    now = datetime.now()
+    day_start = (day or now).replace(hour=0, minute=0, second=0, microsecond=0)
+    day_end = day_start + timedelta(days=1)
+    conn = get_connection()
+    try:
+        schedules = conn.execute(
+            'SELECT id, title, schedule_time, schedule_minute, created_at FROM schedules WHERE is_active = 1'
+        ).fetchall()
+        played = {row[0] for row in conn.execute(
+            'SELECT DISTINCT schedule_id FROM play_history WHERE scheduled_at >= ? AND scheduled_at < ?',
+            (int(day_start.timestamp()), int(day_end.timestamp())))}
+        timeline = get_timeline(conn) if CONFLICT_POLICY == 'priority' else None
+    finally:
+        conn.close()
+
+    missed = []
+    for schedule_id, title, schedule_time, schedule_minute, created_at in schedules:
+        if schedule_id in played or (timeline is not None and timeline.outranked(schedule_id)):
+            continue
+        scheduled_at = day_start + timedelta(minutes=schedule_minute)
+        # 현재 분은 아직 재생될 수 있으므로 제외
+        if scheduled_at + timedelta(minutes=1) > now:
+            continue
+        if created_at:
+            try:
+                # created_at 은 SQLite CURRENT_TIMESTAMP (UTC) - 로컬 시각으로 바꿔서 비교
+                created_local = datetime.fromisoformat(str(created_at)).replace(
+                    tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+                if created_local > scheduled_at:
+                    continue
+            except ValueError:
+                pass
+        missed.append({'id': schedule_id, 'title': title, 'schedule_time': schedule_time})
+    return missed
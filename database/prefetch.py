@@ -0,0 +1,87 @@
+# database/prefetch.py
+import os
+import re
+from datetime import datetime
+
+from database.conflicts import CONFLICT_POLICY, get_timeline
+from database.connection import get_connection
+from database.media_server import media_url
+from database.schedule_db import next_fire_at
+
+# 미리 알려줄 다음 스케줄 수와 얼마나 앞서 알려줄지 (초)
+PREFETCH_COUNT = int(os.environ.get('PREFETCH_COUNT', '3'))
+PREFETCH_LOOKAHEAD = int(os.environ.get('PREFETCH_LOOKAHEAD', '300'))
+
+_YOUTUBE_ID = re.compile(r'(?:youtube\.com\/(?:[^\/]+\/.+\/|(?:v|e(?:mbed)?)\/|.*[?&]v=)|youtu\.be\/)([^"&?\/\s]{11})')
+
+# 곧 재생될 스케줄 조회
+def get_upcoming(count=PREFETCH_COUNT, lookahead=PREFETCH_LOOKAHEAD, now=None):
+    """Return the next ``count`` active schedules due within ``lookahead`` seconds.
+
+    Each item carries what a client needs to warm up: the fire time (epoch
+    seconds), the URL it will play and, for YouTube, the video id and thumbnail.
+    Only future fires are listed, and under the 'priority' policy the
+    schedules the engine will skip (outranked) are left out.
+    """
+    now = now or datetime.now()
+    # 앞으로 lookahead 초 안에 있는 분 범위만 조회 (자정을 넘으면 두 구간)
+    start = now.hour * 60 + now.minute
+    end = start + -(-lookahead // 60)
+    if end - start >= 24 * 60:
+        window, params = '', ()
+    elif end < 24 * 60:
+        window, params = 'AND schedule_minute BETWEEN ? AND ?', (start, end)
+    else:
+        window, params = 'AND (schedule_minute >= ? OR schedule_minute <= ?)', (start, end - 24 * 60)
+    conn = get_connection()
+    try:
+        rows = conn.execute(f'''
+            SELECT id, schedule_time, file_path, file_type, title
+            FROM schedules WHERE is_active = 1 {window}
+        ''', params).fetchall()
+        timeline = get_timeline(conn) if CONFLICT_POLICY == 'priority' else None
+    finally:
+        conn.close()
+
+    upcoming = []
+    for schedule_id, schedule_time, file_path, file_type, title in rows:
+        fire_at = next_fire_at(schedule_time, now)
+        # 이번 분에 이미 시작한 스케줄은 제외 (앞으로 재생될 항목이 잘리지 않도록)
+        if fire_at is None or fire_at <= now or (fire_at - now).total_seconds() > lookahead:
+            continue
+        # 엔진이 재생하지 않을 스케줄 ('priority' 정책에서 밀린 스케줄) 은 알리지 않음
+        if timeline is not None and timeline.outranked(schedule_id):
+            continue
+        item = {
+            'id': schedule_id,
+            'title': title,
+            'file_type': file_type,
+            'fire_at': fire_at.timestamp(),
+        }
+        if file_type == 'youtube':
+            match = _YOUTUBE_ID.search(file_path)
+            if not match:
+                continue
+            video_id = match.group(1)
+            item['video_id'] = video_id
+            item['url'] = f'https://www.youtube.com/embed/{video_id}'
+            item['thumbnail'] = f'https://i.ytimg.com/vi/{video_id}/hqdefault.jpg'
+        else:
+            item['url'] = media_url(file_path)
+        upcoming.append(item)
+    upcoming.sort(key=lambda item: item['fire_at'])
+    return upcoming[:count]
+
+# Streamlit 페이지용 미리 연결/미리 불러오기 태그
+def prefetch_tags(upcoming):
+    """Return <link> tags that preconnect to the player hosts and preload upcoming thumbnails"""
+    tags = [
+        '<link rel="preconnect" href="https://www.youtube.com">',
+        '<link rel="preconnect" href="https://i.ytimg.com">',
+    ]
+    for item in upcoming:
+        if item.get('thumbnail'):
+            tags.append(f'<link rel="preload" as="image" href="{item["thumbnail"]}">')
+        if item.get('video_id'):
+            tags.append(f'<link rel="prefetch" href="{item["url"]}">')
+    return '\n'.join(tags)
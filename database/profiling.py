@@ -0,0 +1,217 @@
+# database/profiling.py
+"""Per-rerun profiling for app.py.
+
+Opt in with ``?profile=1`` in the page URL or ``APP_PROFILE=1`` in the
+environment. Each stage of the rerun is timed (sequential checkpoints via
+``begin()``, nested sections via ``stage()``), the breakdown is shown in
+the sidebar and every profiled rerun is written to ``PROFILE_DIR`` as JSON.
+``profile=cprofile`` / ``profile=pyinstrument`` (or the same values of
+APP_PROFILE) also record a call profile: ``.prof`` files open with
+``python -m pstats`` or snakeviz, ``.html`` files in a browser.
+"""
+import contextlib
+import json
+import os
+import re
+import threading
+import time as time_module
+from datetime import datetime
+
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+# 보관할 프로파일 파일 수 (오래된 것부터 삭제)
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', '200'))
+# 이보다 오래 걸린 단계는 사이드바에서 강조 (ms)
+SLOW_STAGE_MS = float(os.environ.get('SLOW_STAGE_MS', '100'))
+
+PROFILE_MODES = ('timers', 'cprofile', 'pyinstrument')
+# 호출 프로파일러는 한 번에 하나만 켬 (중간에 st.rerun / st.stop 으로 끝난 스레드의 것은 넘겨받음)
+_owner = None
+_owner_lock = threading.Lock()
+
+def _claim_call_profiler():
+    global _owner
+    with _owner_lock:
+        if _owner is not None and _owner.is_alive():
+            return False
+        _owner = threading.current_thread()
+        return True
+
+def _release_call_profiler():
+    global _owner
+    with _owner_lock:
+        _owner = None
+
+def profile_mode(query_value=None):
+    """Return the requested mode ('timers', 'cprofile', 'pyinstrument') or None if profiling is off"""
+    for value in (query_value, os.environ.get('APP_PROFILE')):
+        value = (value or '').strip().lower()
+        if value in PROFILE_MODES:
+            return value
+        if value in ('1', 'true', 'yes'):
+            return 'timers'
+    return None
+
+class NullProfiler:
+    """Stand-in used when profiling is off (every call is a no-op)"""
+
+    enabled = False
+
+    def begin(self, name):
+        pass
+
+    def stage(self, name):
+        return contextlib.nullcontext()
+
+    def finish(self):
+        return []
+
+class RerunProfiler:
+    """Time the stages of one script run and optionally record a call profile"""
+
+    enabled = True
+
+    def __init__(self, mode='timers', started_at=None, label=''):
+        self.mode = mode
+        # 파일 이름에 쓰이므로 안전한 문자만 남김
+        self.label = re.sub(r'[^A-Za-z0-9_-]', '', label)[:40]
+        self.started_at = started_at if started_at is not None else time_module.perf_counter()
+        # [이름, ms (진행 중이면 None), 깊이] - 실행 순서대로
+        self.stages = []
+        self._current = None
+        self._depth = 0
+        self._call_profiler = None
+        self.total_ms = None
+        self.interrupted = False
+        # 첫 단계: 스크립트 시작 ~ 프로파일러 생성 (import, 페이지 설정)
+        self.stages.append(['startup', None, 0])
+        self._current = (self.stages[-1], self.started_at)
+        if mode in ('cprofile', 'pyinstrument'):
+            self._start_call_profiler()
+
+    def _start_call_profiler(self):
+        if not _claim_call_profiler():
+            print("[PROFILE] another rerun is recording a call profile; timers only")
+            return
+        try:
+            if self.mode == 'cprofile':
+                import cProfile
+                self._call_profiler = cProfile.Profile()
+                self._call_profiler.enable()
+            else:
+                from pyinstrument import Profiler
+                self._call_profiler = Profiler()
+                self._call_profiler.start()
+        except Exception as e:
+            print(f"[PROFILE] {self.mode} unavailable ({e}); timers only")
+            self._call_profiler = None
+            _release_call_profiler()
+
+    def _stop_call_profiler(self):
+        if self._call_profiler is None:
+            return
+        try:
+            if self.mode == 'cprofile':
+                self._call_profiler.disable()
+            else:
+                self._call_profiler.stop()
+        except Exception as e:
+            print(f"[PROFILE] could not stop {self.mode}: {e}")
+            self._call_profiler = None
+        _release_call_profiler()
+
+    def _open(self, name, depth):
+        entry = [name, None, depth]
+        self.stages.append(entry)
+        return entry, time_module.perf_counter()
+
+    @staticmethod
+    def _close(opened):
+        entry, started = opened
+        entry[1] = (time_module.perf_counter() - started) * 1000
+
+    def begin(self, name):
+        """End the current top-level stage and start ``name`` (no re-indenting needed)"""
+        if self._current is not None:
+            self._close(self._current)
+        self._current = self._open(name, 0)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Time a nested section inside the current stage"""
+        self._depth += 1
+        opened = self._open(name, self._depth)
+        try:
+            yield
+        finally:
+            self._close(opened)
+            self._depth -= 1
+
+    def finish(self):
+        """Close the last stage and the call profile; return [[name, ms, depth]]"""
+        if self._current is not None:
+            self._close(self._current)
+            self._current = None
+        if self.total_ms is None:
+            self.total_ms = (time_module.perf_counter() - self.started_at) * 1000
+            self._stop_call_profiler()
+        return self.stages
+
+    def abandon(self):
+        """Close a run that ended early (st.rerun / st.stop); its unfinished stages are dropped"""
+        if self.total_ms is None:
+            self.interrupted = True
+            self._current = None
+            self.stages = [entry for entry in self.stages if entry[1] is not None]
+            self.total_ms = sum(ms for _, ms, depth in self.stages if depth == 0)
+            self._stop_call_profiler()
+        return self.stages
+
+    def slowest(self, count=3):
+        """Top-level stages, slowest first"""
+        return sorted((s for s in self.stages if s[2] == 0 and s[1] is not None),
+                      key=lambda s: s[1], reverse=True)[:count]
+
+    def dump(self, directory=PROFILE_DIR):
+        """Write the stage breakdown (and call profile) to ``directory``; return the JSON path"""
+        self.finish()
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+                            + (f'-{self.label}' if self.label else ''))
+        call_profile = None
+        if self._call_profiler is not None:
+            if self.mode == 'cprofile':
+                call_profile = stem + '.prof'
+                self._call_profiler.dump_stats(call_profile)
+            else:
+                call_profile = stem + '.html'
+                with open(call_profile, 'w', encoding='utf-8') as f:
+                    f.write(self._call_profiler.output_html())
+        with open(stem + '.json', 'w', encoding='utf-8') as f:
+            json.dump({
+                'label': self.label,
+                'mode': self.mode,
+                'interrupted': self.interrupted,
+                'total_ms': round(self.total_ms, 2),
+                'stages': [{'name': name, 'ms': round(ms, 2), 'depth': depth} for name, ms, depth in self.stages],
+                'call_profile': call_profile,
+            }, f, ensure_ascii=False, indent=2)
+        _prune(directory)
+        return stem + '.json'
+
+def _prune(directory, keep=PROFILE_KEEP):
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError:
+        return
+    stems = sorted({os.path.splitext(name)[0] for name in names})
+    old = set(stems[:-keep]) if keep > 0 else set()
+    for name in names:
+        if os.path.splitext(name)[0] in old:
+            os.remove(os.path.join(directory, name))
+
+def start_profiler(query_value=None, started_at=None, label=''):
+    """Return a RerunProfiler when profiling was requested, otherwise a NullProfiler"""
+    mode = profile_mode(query_value)
+    if mode is None:
+        return NullProfiler()
+    return RerunProfiler(mode, started_at, label)
@@ -1,80 +1,247 @@
 # databse/schedule_db.py
-import sqlite3
-import pandas as pd
-from datetime import datetime, time
-import time as time_module
+from datetime import datetime, time, timedelta
 import os
 import json
 import re
-import webbrowser
+
+from database.catalog import init_catalog
+from database.conflicts import get_timeline, remember_timeline, resolve
+from database.connection import get_connection, tenant_path
+from database.fulltext import fts_query, init_fulltext
+from database.launcher import get_launcher
+from database.media_library import init_media_library, media_exists
+from database.media_server import media_url
+from database.migrations import migrate, parse_schedule_time
+from database.play_history import init_play_history
+
+# 로컬 파일 재생 방식: 'browser' (페이지 안에서 재생) 또는 'launcher' (로컬 플레이어 실행)
+LOCAL_PLAYBACK = os.environ.get('LOCAL_PLAYBACK', 'browser')
+
+# 현재 재생 상태 파일 (로컬 / 다른 프로세스와 공유) - 테넌트마다 따로 둠
+CURRENT_VIDEO_FILE = 'current_video.json'
+
+def current_video_path(tenant=None):
+    """Now-playing state file of a tenant (the current one by default)"""
+    return tenant_path(CURRENT_VIDEO_FILE, tenant)
 
 # 데이터베이스 초기화
 def init_db():
-    conn = sqlite3.connect('video_schedule.db')
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS schedules (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            schedule_time TEXT NOT NULL,
-            file_path TEXT NOT NULL,
-            file_type TEXT NOT NULL,
-            title TEXT,
-            is_active INTEGER DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            last_played TEXT DEFAULT NULL
-        )
-    ''')
-    
-    # 기존 테이블에 last_played 컬럼 추가 (이미 있으면 무시)
-    try:
-        c.execute('ALTER TABLE schedules ADD COLUMN last_played TEXT DEFAULT NULL')
-        conn.commit()
-    except:
-        pass
+    conn = get_connection()
+    # 스키마 버전 마이그레이션 (이미 적용된 것은 건너뜀)
+    migrate(conn)
     
+    # 재생 기록 / 미디어 라이브러리 / 구독 카탈로그 테이블, 전문 검색 인덱스
+    init_play_history(conn)
+    init_media_library(conn)
+    init_catalog(conn)
+    init_fulltext(conn)
+    conn.commit()
     conn.close()
 
 # 스케줄 추가
-def add_schedule(schedule_time, file_path, file_type, title):
-    conn = sqlite3.connect('video_schedule.db')
-    c = conn.cursor()
-    c.execute('''
-        INSERT INTO schedules (schedule_time, file_path, file_type, title)
-        VALUES (?, ?, ?, ?)
-    ''', (schedule_time, file_path, file_type, title))
-    conn.commit()
-    conn.close()
+def add_schedule(schedule_time, file_path, file_type, title, duration_seconds=None, priority=0):
+    """Insert a schedule and return its id.
+
+    Overlaps with other active schedules are resolved by the conflict policy
+    ('queue' may move the start, 'reject' raises ScheduleConflict).
+    """
+    return _insert_schedules([(schedule_time, file_path, file_type, title, duration_seconds, priority)])[0]
+
+# 여러 스케줄을 한 번에 추가 (하나의 트랜잭션)
+def add_schedules(schedules):
+    """Insert (schedule_time, file_path, file_type, title[, duration_seconds[, priority]]) tuples in one transaction"""
+    return len(_insert_schedules(schedules))
+
+def _insert_schedules(schedules):
+    rows = []
+    for schedule in schedules:
+        schedule_time, file_path, file_type, title, *rest = schedule
+        duration_seconds = rest[0] if rest else None
+        priority = rest[1] if len(rest) > 1 else 0
+        rows.append((parse_schedule_time(schedule_time)[1], file_path, file_type, title,
+                     duration_seconds, priority or 0))
+    conn = get_connection()
+    try:
+        # 쓰기 잠금을 잡은 상태에서 겹침 확인 (동시에 추가해도 확인이 어긋나지 않음)
+        conn.execute('BEGIN IMMEDIATE')
+        timeline = get_timeline(conn).copy()
+        ids = []
+        for schedule_minute, file_path, file_type, title, duration_seconds, priority in rows:
+            schedule_minute = resolve(timeline, schedule_minute, duration_seconds, priority)
+            cur = conn.execute('''
+                INSERT INTO schedules (schedule_time, schedule_minute, file_path, file_type, title,
+                                       video_id, duration_seconds, priority)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (f"{schedule_minute // 60:02d}:{schedule_minute % 60:02d}", schedule_minute, file_path,
+                  file_type, title, _video_id_for(file_path, file_type), duration_seconds, priority))
+            timeline.add(cur.lastrowid, schedule_minute, duration_seconds, priority)
+            ids.append(cur.lastrowid)
+        version = _schedule_version(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    remember_timeline(timeline, version)
+    return ids
+
+# 여러 영상의 재생 시간 자동 배치
+def space_schedule_times(start_time, durations, mode='interval', interval_minutes=10, gap_minutes=0):
+    """Return one ``HH:MM`` per item starting at ``start_time``.
+
+    ``mode`` is 'same' (all at start_time), 'interval' (every interval_minutes)
+    or 'back_to_back' (each starts after the previous one's duration in seconds
+    plus gap_minutes; unknown durations fall back to interval_minutes).
+    Times wrap around midnight.
+    """
+    current = parse_schedule_time(start_time)[1]
+    times = []
+    for duration in durations:
+        times.append(f"{(current // 60) % 24:02d}:{current % 60:02d}")
+        if mode == 'interval':
+            current += interval_minutes
+        elif mode == 'back_to_back':
+            # 분 단위로 올림해서 다음 영상과 겹치지 않게 함
+            current += (-(-duration // 60) if duration else interval_minutes) + gap_minutes
+    return times
+
+# 이미 스케줄에 있는 YouTube 영상 ID 조회
+def get_scheduled_video_ids(video_ids):
+    """Return the subset of ``video_ids`` that already have a schedule (one indexed query)"""
+    video_ids = list(dict.fromkeys(video_ids))
+    if not video_ids:
+        return set()
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            f"SELECT DISTINCT video_id FROM schedules WHERE video_id IN ({', '.join('?' * len(video_ids))})",
+            video_ids).fetchall()
+    finally:
+        conn.close()
+    return {row[0] for row in rows}
 
 # 스케줄 조회
 def get_schedules():
-    conn = sqlite3.connect('video_schedule.db')
-    df = pd.read_sql_query("SELECT * FROM schedules ORDER BY schedule_time", conn)
+    # pandas는 목록을 조회할 때만 불러옴 (시작 시간 단축)
+    import pandas as pd
+    conn = get_connection()
+    df = pd.read_sql_query(
+        f"SELECT {', '.join(SCHEDULE_COLUMNS)} FROM schedules ORDER BY schedule_minute, id", conn)
     conn.close()
     return df
 
+SCHEDULE_COLUMNS = ('id', 'schedule_time', 'schedule_minute', 'file_path', 'file_type', 'title',
+                    'is_active', 'created_at', 'last_played', 'last_played_at', 'video_id',
+                    'duration_seconds', 'priority')
+
+# 스케줄 목록 조회 (페이지 단위, dict 목록 - API 용)
+def list_schedules(limit=50, offset=0):
+    """Return (rows as dicts, total count) ordered by schedule_time"""
+    conn = get_connection()
+    try:
+        rows = conn.execute(f'''
+            SELECT {', '.join(SCHEDULE_COLUMNS)} FROM schedules
+            ORDER BY schedule_minute, id LIMIT ? OFFSET ?
+        ''', (limit, offset)).fetchall()
+        total = conn.execute('SELECT COUNT(*) FROM schedules').fetchone()[0]
+    finally:
+        conn.close()
+    return [dict(zip(SCHEDULE_COLUMNS, row)) for row in rows], total
+
+# 스케줄 하나 조회
+def get_schedule(schedule_id):
+    conn = get_connection()
+    try:
+        row = conn.execute(f'SELECT {", ".join(SCHEDULE_COLUMNS)} FROM schedules WHERE id = ?',
+                           (schedule_id,)).fetchone()
+    finally:
+        conn.close()
+    return dict(zip(SCHEDULE_COLUMNS, row)) if row else None
+
+# 스케줄 검색 (제목 / 경로 전문 검색)
+def search_schedules(query, limit=50):
+    """Return schedules matching every word of ``query`` as a prefix, best matches first"""
+    match = fts_query(query)
+    if match is None:
+        return []
+    columns = ', '.join(f's.{column}' for column in SCHEDULE_COLUMNS)
+    conn = get_connection()
+    try:
+        # 제목 일치를 경로 일치보다 높게 평가
+        rows = conn.execute(f'''
+            SELECT {columns} FROM schedules_fts f
+            JOIN schedules s ON s.id = f.rowid
+            WHERE schedules_fts MATCH ?
+            ORDER BY bm25(schedules_fts, 10.0, 1.0) LIMIT ?
+        ''', (match, limit)).fetchall()
+    finally:
+        conn.close()
+    return [dict(zip(SCHEDULE_COLUMNS, row)) for row in rows]
+
+def _schedule_version(conn):
+    row = conn.execute('SELECT version FROM schedule_version WHERE id = 1').fetchone()
+    return row[0] if row else 0
+
+# 겹치는 스케줄 ID (화면 표시용 - 스케줄이 바뀔 때만 다시 계산)
+def get_conflicting_ids():
+    """Return the ids of active schedules that overlap another active schedule"""
+    conn = get_connection()
+    try:
+        return get_timeline(conn).conflicting_ids()
+    finally:
+        conn.close()
+
+# 스케줄 데이터 버전
+def get_schedule_version():
+    """Return a counter that changes whenever a schedule is added, edited or removed"""
+    conn = get_connection()
+    try:
+        return _schedule_version(conn)
+    finally:
+        conn.close()
+
 # 스케줄 삭제
 def delete_schedule(schedule_id):
-    conn = sqlite3.connect('video_schedule.db')
+    conn = get_connection()
     c = conn.cursor()
     c.execute("DELETE FROM schedules WHERE id = ?", (schedule_id,))
     conn.commit()
     conn.close()
 
 # 스케줄 수정
-def update_schedule(schedule_id, schedule_time, file_path, file_type, title):
-    conn = sqlite3.connect('video_schedule.db')
-    c = conn.cursor()
-    c.execute('''
-        UPDATE schedules 
-        SET schedule_time = ?, file_path = ?, file_type = ?, title = ?
-        WHERE id = ?
-    ''', (schedule_time, file_path, file_type, title, schedule_id))
-    conn.commit()
-    conn.close()
+def update_schedule(schedule_id, schedule_time, file_path, file_type, title, duration_seconds=None, priority=None):
+    """Update a schedule; duration_seconds / priority of None keep the stored values"""
+    schedule_minute = parse_schedule_time(schedule_time)[1]
+    conn = get_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        row = conn.execute('SELECT duration_seconds, priority, is_active FROM schedules WHERE id = ?',
+                           (schedule_id,)).fetchone()
+        if row is None:
+            conn.rollback()
+            return
+        if duration_seconds is None:
+            duration_seconds = row[0]
+        if priority is None:
+            priority = row[1]
+        timeline = get_timeline(conn).copy()
+        if row[2]:
+            schedule_minute = resolve(timeline, schedule_minute, duration_seconds, priority, exclude=schedule_id)
+            timeline.add(schedule_id, schedule_minute, duration_seconds, priority)
+        conn.execute('''
+            UPDATE schedules 
+            SET schedule_time = ?, schedule_minute = ?, file_path = ?, file_type = ?, title = ?, video_id = ?,
+                duration_seconds = ?, priority = ?
+            WHERE id = ?
+        ''', (f"{schedule_minute // 60:02d}:{schedule_minute % 60:02d}", schedule_minute, file_path,
+              file_type, title, _video_id_for(file_path, file_type), duration_seconds, priority, schedule_id))
+        version = _schedule_version(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    remember_timeline(timeline, version)
 
 # 스케줄 활성화/비활성화
 def toggle_schedule(schedule_id, is_active):
-    conn = sqlite3.connect('video_schedule.db')
+    conn = get_connection()
     c = conn.cursor()
     c.execute("UPDATE schedules SET is_active = ? WHERE id = ?", (is_active, schedule_id))
     conn.commit()
@@ -88,10 +255,17 @@ def is_youtube_url(url):
         r'(watch\?v=|embed/|v/|.+\?v=)?([^&=%\?]{11})')
     return re.match(youtube_regex, url) is not None
 
-# YouTube URL을 embed URL로 변환
-def get_youtube_embed_url(url):
-    """Convert YouTube URL to embed format for iframe display"""
-    # Extract video ID from various YouTube URL formats
+# 재생 시간 형식 확인 (HH:MM)
+def is_schedule_time(text):
+    try:
+        parse_schedule_time(text)
+        return True
+    except ValueError:
+        return False
+
+# YouTube URL에서 영상 ID 추출
+def extract_video_id(url):
+    """Return the 11-character video id of a YouTube URL, or None"""
     patterns = [
         r'(?:https?://)?(?:www\.)?youtube\.com/watch\?v=([^&=%\?]{11})',
         r'(?:https?://)?(?:www\.)?youtu\.be/([^&=%\?]{11})',
@@ -100,10 +274,20 @@ def get_youtube_embed_url(url):
     ]
     
     for pattern in patterns:
-        match = re.search(pattern, url)
+        match = re.search(pattern, url or '')
         if match:
-            video_id = match.group(1)
-            return f'https://www.youtube.com/embed/{video_id}'
+            return match.group(1)
+    return None
+
+def _video_id_for(file_path, file_type):
+    return extract_video_id(file_path) if file_type == 'youtube' else None
+
+# YouTube URL을 embed URL로 변환
+def get_youtube_embed_url(url):
+    """Convert YouTube URL to embed format for iframe display"""
+    video_id = extract_video_id(url)
+    if video_id:
+        return f'https://www.youtube.com/embed/{video_id}'
     
     # If no pattern matches, return original URL
     return url
@@ -126,7 +310,7 @@ def set_current_video(file_path, title, session_state=None):
     
     # Also write to file for backward compatibility (local use)
     try:
-        with open('current_video.json', 'w', encoding='utf-8') as f:
+        with open(current_video_path(), 'w', encoding='utf-8') as f:
             json.dump(video_data, f, ensure_ascii=False)
     except:
         pass  # Ignore file errors on Streamlit Cloud
@@ -139,8 +323,8 @@ def get_current_video(session_state=None):
     
     # Fall back to file (local use)
     try:
-        if os.path.exists('current_video.json'):
-            with open('current_video.json', 'r', encoding='utf-8') as f:
+        if os.path.exists(current_video_path()):
+            with open(current_video_path(), 'r', encoding='utf-8') as f:
                 data = json.load(f)
                 if data and isinstance(data, dict):
                     return data
@@ -157,108 +341,61 @@ def clear_current_video(session_state=None):
     
     # Also clear file (local use)
     try:
-        if os.path.exists('current_video.json'):
-            os.remove('current_video.json')
+        if os.path.exists(current_video_path()):
+            os.remove(current_video_path())
     except:
         pass
 
+# 스케줄 재생 처리 (유형별 재생 동작)
+def play_schedule(file_path, file_type, title, session_state=None):
+    """Run the play action for one schedule"""
+    if file_type == 'youtube':
+        embed_url = get_youtube_embed_url(file_path)
+        print(f"[DEBUG] Setting video in session_state: {embed_url}")
+        set_current_video(embed_url, title, session_state)
+    elif file_type == 'local':
+        # 색인에 아직 없는 새 파일 (첫 스캔 중 / 다음 스캔 전) 은 파일 시스템으로 확인
+        if media_exists(file_path) or os.path.exists(file_path):
+            if LOCAL_PLAYBACK == 'launcher':
+                # Open in a local player (works only on the server machine)
+                get_launcher().launch(file_path)
+            else:
+                # Stream through the built-in media server into the page
+                set_current_video(media_url(file_path), title, session_state)
+    elif file_type == "html":
+        set_current_video(media_url(file_path), title, session_state)
+
+# 다음 재생 시각 계산
+def next_fire_at(schedule_time, now):
+    """Return the next datetime for an ``HH:MM`` schedule, or None if invalid.
+
+    A schedule whose minute is still in progress is due now.
+    """
+    try:
+        hour, minute = map(int, schedule_time.split(':'))
+        fire_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    except (ValueError, AttributeError):
+        return None
+    if fire_at + timedelta(minutes=1) <= now:
+        fire_at += timedelta(days=1)
+    return fire_at
+
 # Check schedule once (synchronous - called from main app)
-def check_schedule_once(session_state=None):
+def check_schedule_once(session_state=None, screen=None):
     """Check if any scheduled videos should play right now (non-blocking)"""
+    from database.scheduler import PlayDispatcher, SchedulerEngine
     try:
-        current_time = datetime.now().strftime("%H:%M")
-        conn = sqlite3.connect('video_schedule.db')
-        c = conn.cursor()
-        
-        # Debug logging
-        print(f"[DEBUG] Checking schedules at {current_time}")
-        
-        # Find active schedules matching current time
-        c.execute('''
-            SELECT * FROM schedules 
-            WHERE schedule_time = ? AND is_active = 1
-        ''', (current_time,))
-        
-        schedules = c.fetchall()
-        print(f"[DEBUG] Found {len(schedules)} matching schedules")
-        
-        for schedule in schedules:
-            schedule_id, _, file_path, file_type, title, _, _, last_played = schedule
-            print(f"[DEBUG] Processing schedule: {title}, last_played={last_played}")
-            
-            # Check if not already played this minute
-            if last_played != current_time:
-                print(f"[DEBUG] Playing video: {title}")
-                # Play the video
-                if file_type == 'youtube':
-                    embed_url = get_youtube_embed_url(file_path)
-                    print(f"[DEBUG] Setting video in session_state: {embed_url}")
-                    set_current_video(embed_url, title, session_state)
-                elif file_type == 'local':
-                    # For local files, still try to open (works only locally)
-                    if os.path.exists(file_path):
-                        if os.name == 'nt':
-                            os.startfile(file_path)
-                        else:
-                            os.system(f'open "{file_path}"')
-                elif file_type == "html":
-                    set_current_video(f'file://{os.path.abspath(file_path)}', title, session_state)
-                
-                # Update database with play time
-                c.execute('UPDATE schedules SET last_played = ? WHERE id = ?', (current_time, schedule_id))
-                conn.commit()
-                print(f"[DEBUG] Updated last_played to {current_time}")
-            else:
-                print(f"[DEBUG] Already played at {last_played}, skipping")
-        
-        conn.close()
+        engine = SchedulerEngine(dispatchers=[PlayDispatcher(session_state)], screen=screen)
+        engine.tick()
         return True
-        
     except Exception as e:
         print(f"Schedule check error: {e}")
         import traceback
         traceback.print_exc()
         return False
 
-# Background scheduler (legacy - kept for compatibility)
+# Background scheduler (legacy entry point - runs the scheduler engine loop)
 def check_schedule():
-    while True:
-        try:
-            current_time = datetime.now().strftime("%H:%M")
-            conn = sqlite3.connect('video_schedule.db')
-            c = conn.cursor()
-            
-            # 현재 시간과 일치하는 활성화된 스케줄 찾기
-            c.execute('''
-                SELECT * FROM schedules 
-                WHERE schedule_time = ? AND is_active = 1
-            ''', (current_time,))
-            
-            schedules = c.fetchall()
-            
-            for schedule in schedules:
-                schedule_id, _, file_path, file_type, title, _, _, last_played = schedule
-                
-                # 같은 시간대에 이미 재생되었는지 확인 (last_played와 current_time 비교)
-                if last_played != current_time:
-                    # 재생 처리
-                    if file_type == 'youtube':
-                        embed_url = get_youtube_embed_url(file_path)
-                        set_current_video(embed_url, title)
-                    elif file_type == 'local':
-                        if os.path.exists(file_path):
-                            os.startfile(file_path) if os.name == 'nt' else os.system(f'open "{file_path}"')
-                    elif file_type == "html":
-                        set_current_video(f'file://{os.path.abspath(file_path)}', title)
-                    
-                    # 데이터베이스에 재생 시간 업데이트
-                    c.execute('UPDATE schedules SET last_played = ? WHERE id = ?', (current_time, schedule_id))
-                    conn.commit()
-            
-            conn.close()
-            
-        except Exception as e:
-            print(f"스케줄 체크 오류: {e}")
-        
-        # 30초마다 체크
-        time_module.sleep(60)
\ No newline at end of file
+    """Run the scheduler engine until interrupted (blocking)"""
+    from database.scheduler import SchedulerEngine
+    SchedulerEngine(screen='background').run()
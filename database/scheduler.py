@@ -0,0 +1,344 @@
+# database/scheduler.py
+# 실행 (가짜 시계로 하루를 돌려 한 번만 재생되는지 확인): python -m database.scheduler --engines 4
+"""Single scheduler core used by every entry point.
+
+``SchedulerEngine`` finds the schedules due in the current minute, claims
+each one atomically in storage (so several engines, sessions or processes
+never fire the same minute twice), applies the conflict policy, runs the
+dispatchers and records the fire. Everything it touches is pluggable:
+
+* clock - ``SystemClock`` or ``FakeClock`` (time only moves when slept)
+* storage - ``SqliteStorage`` (the tenant database) or ``MemoryStorage``
+* dispatchers - callables taking a ``DueSchedule``; ``PlayDispatcher`` runs
+  play_schedule() (YouTube embed URL, media server or launcher)
+* tick strategy - ``MinuteTick`` wakes just after every minute boundary,
+  ``NextDueTick`` sleeps until the next scheduled minute
+
+check_schedule_once() (every Streamlit rerun), check_schedule(), the asyncio
+scheduler and the background loops in app.py / original_app.py all go
+through it.
+"""
+import argparse
+import contextlib
+import random
+import threading
+import time as time_module
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from database.conflicts import CONFLICT_POLICY, get_timeline
+from database.connection import get_connection, get_tenant, use_tenant
+from database.play_history import record_play
+from database.schedule_db import play_schedule
+
+# 백그라운드 루프의 최대 대기 시간 (초) - 스케줄이 바뀌어도 이 안에 반영됨
+TICK_INTERVAL = 30
+
+DueSchedule = namedtuple('DueSchedule', 'id file_path file_type title')
+
+class SystemClock:
+    def now(self):
+        return datetime.now()
+
+    def sleep(self, seconds):
+        time_module.sleep(seconds)
+
+class FakeClock:
+    """Clock for tests and simulations: time only moves on sleep() / advance()"""
+
+    def __init__(self, start=None):
+        self._now = start or datetime(2000, 1, 1)
+        self._lock = threading.Lock()
+
+    def now(self):
+        with self._lock:
+            return self._now
+
+    def advance(self, seconds):
+        with self._lock:
+            self._now += timedelta(seconds=seconds)
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+class SqliteStorage:
+    """Schedules in a tenant's database (the current tenant when created)"""
+
+    def __init__(self, tenant=None):
+        self.tenant = tenant or get_tenant()
+
+    def due(self, minute_start):
+        """Active schedules of this minute that have not fired in it yet"""
+        conn = get_connection(self.tenant)
+        try:
+            rows = conn.execute('''
+                SELECT id, file_path, file_type, title FROM schedules
+                WHERE is_active = 1 AND schedule_minute = ?
+                  AND (last_played_at IS NULL OR last_played_at < ?)
+                ORDER BY id
+            ''', (minute_start.hour * 60 + minute_start.minute, int(minute_start.timestamp()))).fetchall()
+        finally:
+            conn.close()
+        return [DueSchedule(*row) for row in rows]
+
+    def claim_many(self, ids, minute_start):
+        """Mark schedules as fired in this minute in one transaction; return the ids this caller won"""
+        minute_epoch = int(minute_start.timestamp())
+        conn = get_connection(self.tenant)
+        claimed = []
+        try:
+            with conn:
+                for schedule_id in ids:
+                    cur = conn.execute('''
+                        UPDATE schedules SET last_played = ?, last_played_at = ?
+                        WHERE id = ? AND is_active = 1 AND (last_played_at IS NULL OR last_played_at < ?)
+                    ''', (minute_start.strftime('%H:%M'), minute_epoch, schedule_id, minute_epoch))
+                    if cur.rowcount:
+                        claimed.append(schedule_id)
+        finally:
+            conn.close()
+        return claimed
+
+    def outranked(self, schedule_id):
+        conn = get_connection(self.tenant)
+        try:
+            with use_tenant(self.tenant):
+                return get_timeline(conn).outranked(schedule_id)
+        finally:
+            conn.close()
+
+    def load_active(self):
+        """(id, schedule_time, file_path, file_type, title) of every active schedule"""
+        conn = get_connection(self.tenant)
+        try:
+            return conn.execute('''
+                SELECT id, schedule_time, file_path, file_type, title
+                FROM schedules WHERE is_active = 1
+            ''').fetchall()
+        finally:
+            conn.close()
+
+    def next_minute(self, after_minute):
+        """Next active schedule minute after ``after_minute`` (may wrap past midnight), or None"""
+        conn = get_connection(self.tenant)
+        try:
+            row = conn.execute('''
+                SELECT COALESCE(
+                    (SELECT MIN(schedule_minute) FROM schedules WHERE is_active = 1 AND schedule_minute > ?),
+                    (SELECT MIN(schedule_minute) + 1440 FROM schedules WHERE is_active = 1))
+            ''', (after_minute,)).fetchone()
+        finally:
+            conn.close()
+        return row[0]
+
+    def record(self, schedule, minute_start, fired_at, screen):
+        with use_tenant(self.tenant):
+            record_play(schedule.id, minute_start, fired_at, screen, schedule.file_type)
+
+class MemoryStorage:
+    """In-memory storage with the same claim semantics (for fake-clock tests and simulations)"""
+
+    def __init__(self, schedules=(), priorities=None):
+        # schedules: (id, 'HH:MM', file_path, file_type, title)
+        self.schedules = {row[0]: row for row in schedules}
+        self.priorities = dict(priorities or {})
+        self.last_played_at = {}
+        self.fires = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _minute(schedule_time):
+        hour, minute = map(int, schedule_time.split(':'))
+        return hour * 60 + minute
+
+    def due(self, minute_start):
+        minute = minute_start.hour * 60 + minute_start.minute
+        epoch = int(minute_start.timestamp())
+        with self._lock:
+            return [DueSchedule(row[0], *row[2:]) for row in sorted(self.schedules.values())
+                    if self._minute(row[1]) == minute and self.last_played_at.get(row[0], -1) < epoch]
+
+    def claim_many(self, ids, minute_start):
+        epoch = int(minute_start.timestamp())
+        claimed = []
+        with self._lock:
+            for schedule_id in ids:
+                if schedule_id in self.schedules and self.last_played_at.get(schedule_id, -1) < epoch:
+                    self.last_played_at[schedule_id] = epoch
+                    claimed.append(schedule_id)
+        return claimed
+
+    def outranked(self, schedule_id):
+        minute = self._minute(self.schedules[schedule_id][1])
+        priority = self.priorities.get(schedule_id, 0)
+        return any(self._minute(row[1]) == minute and
+                   (self.priorities.get(other, 0), -other) > (priority, -schedule_id)
+                   for other, row in self.schedules.items() if other != schedule_id)
+
+    def load_active(self):
+        return list(self.schedules.values())
+
+    def next_minute(self, after_minute):
+        minutes = sorted(self._minute(row[1]) for row in self.schedules.values())
+        if not minutes:
+            return None
+        return next((m for m in minutes if m > after_minute), minutes[0] + 1440)
+
+    def record(self, schedule, minute_start, fired_at, screen):
+        with self._lock:
+            self.fires.append((schedule.id, minute_start, fired_at, screen))
+
+class PlayDispatcher:
+    """Run the play action for a fired schedule (into a session, or the shared now-playing file)"""
+
+    def __init__(self, session_state=None):
+        self.session_state = session_state
+
+    def __call__(self, schedule):
+        play_schedule(schedule.file_path, schedule.file_type, schedule.title, self.session_state)
+
+class MinuteTick:
+    """Wake just after each minute boundary (and at least every ``interval`` seconds)"""
+
+    def __init__(self, interval=TICK_INTERVAL):
+        self.interval = interval
+
+    def next_wait(self, engine, now):
+        until_next_minute = 60 - now.second - now.microsecond / 1_000_000
+        return min(self.interval, until_next_minute + 0.05)
+
+class NextDueTick:
+    """Sleep until the next scheduled minute (re-checking storage at least every ``interval`` seconds)"""
+
+    def __init__(self, interval=TICK_INTERVAL):
+        self.interval = interval
+
+    def next_wait(self, engine, now):
+        next_minute = engine.storage.next_minute(now.hour * 60 + now.minute)
+        if next_minute is None:
+            return self.interval
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        wait = (midnight + timedelta(minutes=next_minute) - now).total_seconds() + 0.05
+        return max(0.05, min(self.interval, wait))
+
+class SchedulerEngine:
+    """Find, claim and dispatch due schedules; see the module docstring for the pluggable parts"""
+
+    def __init__(self, storage=None, clock=None, dispatchers=None, tick=None, screen=None, policy=None):
+        self.storage = storage or SqliteStorage()
+        self.clock = clock or SystemClock()
+        self.dispatchers = list(dispatchers) if dispatchers is not None else [PlayDispatcher()]
+        self.tick_strategy = tick or MinuteTick()
+        self.screen = screen
+        self.policy = policy or CONFLICT_POLICY
+
+    def claim(self, ids, minute_start):
+        """Claim schedules for a minute; return the ids that should play (after the conflict policy)"""
+        if self.policy == 'priority':
+            # 'priority' 정책: 우선순위가 더 높은 스케줄과 겹치면 클레임하지 않음 (재생 / 기록 없음)
+            ids = [schedule_id for schedule_id in ids if not self.storage.outranked(schedule_id)]
+        return self.storage.claim_many(ids, minute_start) if ids else []
+
+    def play(self, schedule):
+        """Run every dispatcher for a claimed schedule (one failing does not stop the others)"""
+        for dispatcher in self.dispatchers:
+            try:
+                dispatcher(schedule)
+            except Exception as e:
+                print(f"스케줄 재생 오류: {schedule.title}: {e}")
+
+    def record(self, schedule, minute_start, fired_at):
+        self.storage.record(schedule, minute_start, fired_at, self.screen)
+
+    def dispatch(self, schedule, minute_start, fired_at=None):
+        """Play a claimed schedule, then record the fire"""
+        fired_at = fired_at or self.clock.now()
+        self.play(schedule)
+        self.record(schedule, minute_start, fired_at)
+
+    def tick(self, now=None):
+        """Fire every schedule due in the current minute; return the fired DueSchedules"""
+        now = now or self.clock.now()
+        minute_start = now.replace(second=0, microsecond=0)
+        due = self.storage.due(minute_start)
+        if not due:
+            return []
+        claimed = set(self.claim([schedule.id for schedule in due], minute_start))
+        fired = [schedule for schedule in due if schedule.id in claimed]
+        for schedule in fired:
+            self.dispatch(schedule, minute_start, now)
+        return fired
+
+    def run(self, stop=None, until=None):
+        """Tick until ``stop`` (a threading.Event) is set or the clock passes ``until``"""
+        tenant = getattr(self.storage, 'tenant', None)
+        with use_tenant(tenant) if tenant else contextlib.nullcontext():
+            while not (stop is not None and stop.is_set()):
+                now = self.clock.now()
+                if until is not None and now >= until:
+                    break
+                try:
+                    self.tick(now)
+                except Exception as e:
+                    print(f"스케줄 체크 오류: {e}")
+                wait = self.tick_strategy.next_wait(self, self.clock.now())
+                if stop is not None and isinstance(self.clock, SystemClock):
+                    stop.wait(wait)
+                else:
+                    self.clock.sleep(wait)
+
+def start_engine_thread(engine=None, name='scheduler'):
+    """Run an engine in a daemon thread; return (thread, stop event)"""
+    engine = engine or SchedulerEngine()
+    stop = threading.Event()
+    thread = threading.Thread(target=engine.run, kwargs={'stop': stop}, name=name, daemon=True)
+    thread.start()
+    return thread, stop
+
+# 가짜 시계로 여러 엔진을 동시에 돌려 한 번만 재생되는지 확인
+def simulate(schedules=200, engines=4, hours=24, tick='minute', seed=0):
+    """Run ``engines`` engines over ``hours`` of fake time on one MemoryStorage.
+
+    Returns (fires, duplicates, missed): every schedule must fire exactly once
+    per simulated day.
+    """
+    rng = random.Random(seed)
+    storage = MemoryStorage([(i, f'{rng.randrange(24):02d}:{rng.randrange(60):02d}', f'/v/{i}.mp4', 'local', f'v{i}')
+                             for i in range(1, schedules + 1)])
+    start = datetime(2000, 1, 1)
+    until = start + timedelta(hours=hours)
+    strategy = NextDueTick if tick == 'next-due' else MinuteTick
+    threads = []
+    for n in range(engines):
+        # 엔진마다 시작 시각을 조금씩 어긋나게 (실제 세션처럼)
+        engine = SchedulerEngine(storage, FakeClock(start + timedelta(seconds=rng.random() * 30)),
+                                 dispatchers=[], tick=strategy(), screen=f'engine-{n}', policy='preempt')
+        threads.append(threading.Thread(target=engine.run, kwargs={'until': until}))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    counts = {}
+    for schedule_id, minute_start, _, _ in storage.fires:
+        counts[(schedule_id, minute_start)] = counts.get((schedule_id, minute_start), 0) + 1
+    duplicates = sum(n - 1 for n in counts.values() if n > 1)
+    fired_ids = {schedule_id for schedule_id, _ in counts}
+    missed = sorted(set(storage.schedules) - fired_ids) if hours >= 24 else []
+    return len(storage.fires), duplicates, missed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulate scheduler engines on a fake clock')
+    parser.add_argument('--schedules', type=int, default=200)
+    parser.add_argument('--engines', type=int, default=4)
+    parser.add_argument('--hours', type=int, default=24)
+    parser.add_argument('--tick', choices=('minute', 'next-due'), default='minute')
+    args = parser.parse_args(argv)
+    started = time_module.perf_counter()
+    fires, duplicates, missed = simulate(args.schedules, args.engines, args.hours, args.tick)
+    print(f"{fires} fires, {duplicates} duplicates, {len(missed)} missed "
+          f"({args.engines} engines, {args.hours}h simulated in {time_module.perf_counter() - started:.1f}s)")
+    return 0 if not duplicates and not missed else 1
+
+if __name__ == '__main__':
+    raise SystemExit(main())
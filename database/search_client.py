@@ -0,0 +1,376 @@
+# database/search_client.py
+# 실행 (가짜 검색 서버로 부하 확인): python -m database.search_client --delay 2 --fail-rate 0.3
+import argparse
+import json
+import os
+import random
+import threading
+import time as time_module
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlsplit
+from urllib.request import urlopen
+
+# YouTube 요청 속도 제한 (프로세스의 모든 세션이 공유): 초당 토큰 수 / 한 번에 쓸 수 있는 토큰 수
+SEARCH_RATE = float(os.environ.get('SEARCH_RATE', '1.0'))
+SEARCH_BURST = int(os.environ.get('SEARCH_BURST', '5'))
+# 토큰을 기다리는 최대 시간 (초) - 넘으면 캐시된 결과로 대신함
+RATE_WAIT = 5.0
+# 재시도 횟수 / 첫 대기 시간 / 최대 대기 시간 (초, 지수 증가 + 무작위 지터)
+SEARCH_RETRIES = int(os.environ.get('SEARCH_RETRIES', '3'))
+RETRY_BASE = 0.5
+RETRY_CAP = 8.0
+# 검색 한 번의 최대 시간 (초) - 느린 응답은 실패로 처리
+SEARCH_TIMEOUT = float(os.environ.get('SEARCH_TIMEOUT', '15'))
+# 연속 실패 BREAKER_THRESHOLD 번이면 BREAKER_RESET 초 동안 YouTube 요청을 멈춤
+BREAKER_THRESHOLD = 5
+BREAKER_RESET = 30.0
+# 동시에 실행 중일 수 있는 검색 요청 수 (시간 초과로 포기했지만 아직 끝나지 않은 요청 포함)
+MAX_RUNNING_FETCHES = max(2, SEARCH_BURST * 2)
+# 검색 결과 캐시: 이 시간 안에는 다시 요청하지 않음 / 장애 시 이 시간까지 지난 결과 사용
+CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL', '600'))
+STALE_TTL = int(os.environ.get('SEARCH_STALE_TTL', str(24 * 60 * 60)))
+MAX_CACHE_ENTRIES = 256
+# 검색 백엔드 주소 (비우면 scrapetube, 지정하면 그 주소의 /search 사용 - 테스트용 가짜 서버)
+SEARCH_BACKEND_URL = os.environ.get('SEARCH_BACKEND_URL', '')
+
+class SearchUnavailable(Exception):
+    """Raised when search failed (or is paused) and no cached results exist"""
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, at most ``capacity`` saved up"""
+
+    def __init__(self, rate=SEARCH_RATE, capacity=SEARCH_BURST):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time_module.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, timeout=RATE_WAIT):
+        """Take one token, waiting up to ``timeout`` seconds; return False if none came"""
+        deadline = time_module.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time_module.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate if self.rate > 0 else timeout
+            if now + wait > deadline:
+                return False
+            time_module.sleep(wait)
+
+class CircuitBreaker:
+    """Stop calling a failing upstream for a while.
+
+    closed -> open after ``threshold`` consecutive failures; after
+    ``reset_timeout`` seconds one trial call is let through (half-open) and
+    its result closes or re-opens the breaker.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return 'closed'
+            if time_module.monotonic() - self.opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time_module.monotonic() - self.opened_at < self.reset_timeout or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = time_module.monotonic()
+            self._trial = False
+
+def scrapetube_fetch(query, limit):
+    """Default fetcher: raw scrapetube search items.
+
+    scrapetube makes its own requests session and sets no HTTP timeout, so a
+    hung call cannot be interrupted; SearchClient runs it in a thread of its
+    own and stops waiting after ``timeout``.
+    """
+    # scrapetube는 검색할 때만 불러옴 (시작 시간 단축)
+    import scrapetube
+    return list(scrapetube.get_search(query, limit=limit))
+
+def http_fetch(base_url, timeout=SEARCH_TIMEOUT):
+    """Fetcher that reads raw items as JSON from ``{base_url}/search?q=..&limit=..``"""
+    def fetch(query, limit):
+        with urlopen(f"{base_url.rstrip('/')}/search?q={quote(query)}&limit={int(limit)}", timeout=timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+    return fetch
+
+class SearchClient:
+    """Rate-limited, retrying, cached search in front of an injectable fetcher.
+
+    ``fetch(query, limit)`` returns raw scrapetube-style items. Results are
+    cached per (query, limit): fresh entries are served without a request,
+    and entries up to ``stale_ttl`` old are served when the rate limit, the
+    retries or the circuit breaker give up. Identical searches running at the
+    same time share one request.
+
+    Every fetch runs in a fresh daemon thread, because an abandoned fetch may
+    never return (scrapetube sets no HTTP timeout). At most ``max_running``
+    fetches may be running; past that, searches fail fast without starting
+    another thread. The breaker's half-open trial is exempt, so the client
+    recovers once the upstream answers again, even with hung threads around.
+    """
+
+    def __init__(self, fetch=None, bucket=None, breaker=None, retries=SEARCH_RETRIES,
+                 timeout=SEARCH_TIMEOUT, cache_ttl=CACHE_TTL, stale_ttl=STALE_TTL,
+                 max_entries=MAX_CACHE_ENTRIES, max_running=MAX_RUNNING_FETCHES, sleep=time_module.sleep):
+        self.fetch = fetch or scrapetube_fetch
+        self.bucket = bucket or TokenBucket()
+        self.breaker = breaker or CircuitBreaker()
+        self.retries = retries
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_running = max_running
+        self.sleep = sleep
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.running = 0
+
+    def _cached(self, key, max_age):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or time_module.time() - entry[0] > max_age:
+                return None
+            self._cache.move_to_end(key)
+            return entry[1]
+
+    def _store(self, key, results):
+        with self._lock:
+            self._cache[key] = (time_module.time(), results)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _fetch_once(self, query, limit, trial=False):
+        from database.youtube_search import parse_video
+        with self._lock:
+            if self.running >= self.max_running and not trial:
+                raise SearchUnavailable(f'{self.running} searches still running')
+            self.running += 1
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(self.fetch(query, limit))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self.running -= 1
+
+        # 느린 요청은 시간 초과 뒤에도 끝날 때까지 이 스레드에서 계속 실행됨 (다음 요청은 새 스레드)
+        threading.Thread(target=run, name='search-fetch', daemon=True).start()
+        raw = future.result(timeout=self.timeout)
+        return [video for video in map(parse_video, raw) if video]
+
+    def _fetch_with_retries(self, query, limit):
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if self.breaker.state == 'open':
+                raise SearchUnavailable(last_error or 'search paused after repeated failures')
+            if not self.bucket.acquire():
+                raise SearchUnavailable('search rate limit reached')
+            # 반쯤 열린 상태에서는 한 요청만 시험으로 보냄
+            trial = self.breaker.state == 'half-open'
+            if not self.breaker.allow():
+                raise SearchUnavailable(last_error or 'search paused after repeated failures')
+            try:
+                results = self._fetch_once(query, limit, trial)
+            except FutureTimeout:
+                last_error = f'search timed out after {self.timeout:.0f}s'
+            except Exception as e:
+                last_error = str(e) or type(e).__name__
+            else:
+                self.breaker.record_success()
+                return results
+            self.breaker.record_failure()
+            if attempt < self.retries:
+                # 전체 지터: 여러 세션이 같은 순간에 다시 몰리지 않도록
+                self.sleep(random.uniform(0, min(RETRY_CAP, RETRY_BASE * 2 ** attempt)))
+        raise SearchUnavailable(last_error)
+
+    def search(self, query, limit=10):
+        """Return (results, status); status is 'fresh', 'cached' or 'stale'.
+
+        Raises SearchUnavailable when the upstream failed and nothing is cached.
+        """
+        key = (query.strip().lower(), limit)
+        results = self._cached(key, self.cache_ttl)
+        if results is not None:
+            return results, 'cached'
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = {'done': threading.Event(), 'outcome': None}
+        if not leader:
+            # 같은 검색이 이미 진행 중이면 그 결과를 함께 씀
+            flight['done'].wait(self.timeout * (self.retries + 1) + RATE_WAIT)
+            outcome = flight['outcome']
+            if outcome is None:
+                raise SearchUnavailable('search did not finish in time')
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        try:
+            try:
+                results = self._fetch_with_retries(query, limit)
+                self._store(key, results)
+                flight['outcome'] = (results, 'fresh')
+            except SearchUnavailable as e:
+                stale = self._cached(key, self.stale_ttl)
+                if stale is None:
+                    flight['outcome'] = e
+                    raise
+                print(f"Search failed ({e}), serving cached results for {query!r}")
+                flight['outcome'] = (stale, 'stale')
+            return flight['outcome']
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight['done'].set()
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_search_client():
+    """Return the process-wide search client (shared by every session)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = SearchClient(http_fetch(SEARCH_BACKEND_URL) if SEARCH_BACKEND_URL else None)
+        return _client
+
+# 테스트 / 부하 확인용 가짜 검색 서버 (scrapetube 항목 형식으로 응답)
+class FakeSearchServer:
+    """Local HTTP search backend with configurable delay and failure rate"""
+
+    def __init__(self, delay=0.0, fail_rate=0.0, host='127.0.0.1', port=0):
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.requests = 0
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                owner.requests += 1
+                url = urlsplit(self.path)
+                params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                time_module.sleep(owner.delay)
+                if url.path != '/search' or random.random() < owner.fail_rate:
+                    self.send_response(503 if url.path == '/search' else 404)
+                    self.end_headers()
+                    return
+                query = params.get('q', '')
+                items = [{
+                    'videoId': f'{abs(hash((query, i))) % 10 ** 11:011d}',
+                    'title': {'runs': [{'text': f'{query} #{i + 1}'}]},
+                    'longBylineText': {'runs': [{'text': 'Fake Channel'}]},
+                    'lengthText': {'simpleText': f'{i + 1}:00'},
+                } for i in range(int(params.get('limit', 10)))]
+                body = json.dumps(items).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.url = f'http://{host}:{self.server.server_address[1]}'
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, name='fake-search', daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Drive the search client against a local fake backend')
+    parser.add_argument('--users', type=int, default=20, help='concurrent searching sessions')
+    parser.add_argument('--queries', type=int, default=5, help='distinct search words')
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--delay', type=float, default=0.5, help='backend response time (s)')
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--timeout', type=float, default=SEARCH_TIMEOUT)
+    args = parser.parse_args(argv)
+
+    with FakeSearchServer(args.delay, args.fail_rate) as server:
+        client = SearchClient(http_fetch(server.url, timeout=args.timeout), timeout=args.timeout, cache_ttl=0)
+        statuses = {}
+        latencies = []
+        lock = threading.Lock()
+
+        def user(n):
+            for round_ in range(args.rounds):
+                started = time_module.monotonic()
+                try:
+                    _, status = client.search(f'query {(n + round_) % args.queries}')
+                except SearchUnavailable:
+                    status = 'unavailable'
+                with lock:
+                    statuses[status] = statuses.get(status, 0) + 1
+                    latencies.append(time_module.monotonic() - started)
+
+        started = time_module.monotonic()
+        threads = [threading.Thread(target=user, args=(n,)) for n in range(args.users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time_module.monotonic() - started
+
+    latencies.sort()
+    print(f"{len(latencies)} searches in {elapsed:.1f}s, {server.requests} backend requests")
+    print(f"  statuses: {statuses}")
+    print(f"  latency p50 {latencies[len(latencies) // 2]:.2f}s, max {latencies[-1]:.2f}s")
+    print(f"  breaker: {client.breaker.state}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# database/startup_profile.py
+"""Startup profiling for app.py.
+
+Run ``python -m database.startup_profile`` to import everything app.py imports at
+module level in a fresh interpreter (``-X importtime``), print the slowest
+modules and fail when the total exceeds the budget. Set ``STARTUP_PROFILE=1``
+when running the app to show time-to-first-render in the sidebar.
+"""
+import ast
+import os
+import subprocess
+import sys
+import time as time_module
+
+# 시작 시간 예산 (ms) - 초과하면 회귀로 간주
+STARTUP_BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', '1500'))
+FIRST_RENDER_BUDGET_MS = float(os.environ.get('FIRST_RENDER_BUDGET_MS', '500'))
+
+def is_enabled():
+    return os.environ.get('STARTUP_PROFILE', '').lower() in ('1', 'true', 'yes')
+
+def top_level_imports(script_path):
+    """Return the module names imported at module level by a script"""
+    with open(script_path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), script_path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+def profile_imports(modules, cwd=None):
+    """Import ``modules`` in a fresh interpreter; return [(module, self_us, cumulative_us)]"""
+    code = '; '.join(f'import {name}' for name in modules)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, cwd=cwd, check=False)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.rstrip()[1:], int(self_us), int(cumulative_us)))
+    return rows
+
+def report(script_path='app.py', top=15, budget_ms=STARTUP_BUDGET_MS):
+    """Print the import profile for a script; return True if it fits the budget"""
+    modules = top_level_imports(script_path)
+    rows = profile_imports(modules)
+    # 최상위 모듈(들여쓰기 없음)의 누적 시간 합계
+    total_ms = sum(cum for name, _, cum in rows if not name.startswith(' ')) / 1000
+    print(f"Import time for {script_path}: {total_ms:.0f} ms (budget {budget_ms:.0f} ms)")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cum_us in sorted(rows, key=lambda r: r[2], reverse=True)[:top]:
+        print(f"{cum_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name.strip()}")
+    return total_ms <= budget_ms
+
+class RenderTimer:
+    """Measure the time from script start to the first rendered element"""
+
+    def __init__(self, started_at=None):
+        self.started_at = started_at if started_at is not None else time_module.perf_counter()
+        self.first_render_ms = None
+
+    def mark_first_render(self):
+        if self.first_render_ms is None:
+            self.first_render_ms = (time_module.perf_counter() - self.started_at) * 1000
+        return self.first_render_ms
+
+    def over_budget(self, budget_ms=FIRST_RENDER_BUDGET_MS):
+        return self.first_render_ms is not None and self.first_render_ms > budget_ms
+
+if __name__ == '__main__':
+    script = sys.argv[1] if len(sys.argv) > 1 else 'app.py'
+    sys.exit(0 if report(script) else 1)
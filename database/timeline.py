@@ -0,0 +1,147 @@
+# database/timeline.py
+import threading
+
+from database.conflicts import DEFAULT_DURATION
+from database.connection import get_connection, get_db_path
+
+DAY_MINUTES = 24 * 60
+# 이보다 짧은 빈 시간은 표시하지 않음 (분)
+MIN_GAP_MINUTES = 30
+# 보관할 화면(시간대 / 기간 / 날짜) 조합 수
+MAX_VIEWS = 32
+
+class ScheduleArrays:
+    """Every schedule of one data version as parallel NumPy arrays (one query, sorted by UTC minute)"""
+
+    def __init__(self, rows):
+        # numpy는 타임라인을 만들 때만 불러옴 (시작 시간 단축)
+        import numpy as np
+        # rows: (id, schedule_minute, duration_seconds, priority, is_active, title, file_type)
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.minutes = np.array([row[1] for row in rows], dtype=np.int32)
+        durations = np.array([row[2] or 0 for row in rows], dtype=np.int64)
+        # 길이를 모르면 기본 길이, 재생은 최소 1분 (분 단위 올림)
+        durations = np.where(durations > 0, durations, DEFAULT_DURATION)
+        self.duration_minutes = np.maximum(-(-durations // 60), 1).astype(np.int32)
+        self.priorities = np.array([row[3] or 0 for row in rows], dtype=np.int32)
+        self.active = np.array([bool(row[4]) for row in rows], dtype=bool)
+        self.titles = np.array([row[5] or '' for row in rows], dtype=object)
+        self.file_types = np.array([row[6] for row in rows], dtype=object)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def local_minutes(self, offset_minutes):
+        """Minute of the local day for every schedule (UTC minute + offset, wrapped)"""
+        return (self.minutes + offset_minutes) % DAY_MINUTES
+
+    def local_labels(self, offset_minutes):
+        """``HH:MM`` local time for every schedule, keyed by id"""
+        local = self.local_minutes(offset_minutes)
+        return dict(zip(self.ids.tolist(), (f'{m // 60:02d}:{m % 60:02d}' for m in local.tolist())))
+
+class TimelineView:
+    """Occurrences of the active schedules over ``days`` local days, with hourly load and gaps.
+
+    Built in one vectorized pass: schedule minutes are shifted into local
+    time, repeated for each day by broadcasting, and the minutes they cover
+    are counted with a difference array (+1 at each start, -1 at each end,
+    then a cumulative sum), which gives hourly busy minutes and the gaps.
+    """
+
+    def __init__(self, arrays, offset_minutes, days, min_gap=MIN_GAP_MINUTES):
+        import numpy as np
+        self.days = days
+        span = days * DAY_MINUTES
+        active = np.flatnonzero(arrays.active)
+        local = arrays.local_minutes(offset_minutes)[active]
+        order = np.argsort(local, kind='stable')
+        index = active[order]
+        local = local[order]
+        length = arrays.duration_minutes[index]
+
+        # 첫날 0시 이전에 시작해서 넘어오는 재생까지 포함하려고 전날부터 계산
+        day_starts = np.arange(-1, days, dtype=np.int64) * DAY_MINUTES
+        starts = (day_starts[:, None] + local[None, :]).ravel()
+        ends = starts + np.tile(length, days + 1)
+        schedule_index = np.tile(index, days + 1)
+        visible = (ends > 0) & (starts < span)
+
+        self.starts = starts[visible]
+        self.ends = ends[visible]
+        self.schedule_index = schedule_index[visible]
+        self.ids = arrays.ids[self.schedule_index]
+        self.titles = arrays.titles[self.schedule_index]
+        self.file_types = arrays.file_types[self.schedule_index]
+
+        diff = np.zeros(span + 1, dtype=np.int32)
+        np.add.at(diff, np.clip(self.starts, 0, span), 1)
+        np.add.at(diff, np.clip(self.ends, 0, span), -1)
+        playing = np.cumsum(diff[:-1])
+        busy = playing > 0
+        # 시간(행)마다 재생 중인 분 / 시작하는 스케줄 수 / 동시에 재생되는 최대 수
+        self.busy_minutes = busy.reshape(days * 24, 60).sum(axis=1)
+        self.overlap_peak = playing.reshape(days * 24, 60).max(axis=1)
+        self.starts_per_hour = np.bincount(
+            self.starts[self.starts >= 0] // 60, minlength=days * 24)[:days * 24]
+
+        # 빈 시간: busy 가 False 인 구간의 시작 / 끝
+        edges = np.diff(np.concatenate(([1], busy.astype(np.int8), [1])))
+        gap_starts = np.flatnonzero(edges == -1)
+        gap_ends = np.flatnonzero(edges == 1)
+        long_enough = gap_ends - gap_starts >= min_gap
+        self.gap_starts = gap_starts[long_enough]
+        self.gap_ends = gap_ends[long_enough]
+
+    def hourly_grid(self, values=None):
+        """Reshape an hourly array to (days, 24); busy minutes by default"""
+        return (self.busy_minutes if values is None else values).reshape(self.days, 24)
+
+    def occurrences_between(self, start_minute, end_minute):
+        """Slice of the occurrences starting in [start_minute, end_minute) (starts are sorted)"""
+        return slice(*self.starts.searchsorted([start_minute, end_minute]))
+
+_cache = {}
+_views = {}
+_cache_lock = threading.Lock()
+
+def get_schedule_arrays():
+    """Load schedules into arrays once per schedule data version (per tenant database)"""
+    path = get_db_path()
+    conn = get_connection()
+    try:
+        row = conn.execute('SELECT version FROM schedule_version WHERE id = 1').fetchone()
+        version = row[0] if row else 0
+        with _cache_lock:
+            cached = _cache.get(path)
+            if cached is not None and cached[0] == version:
+                return version, cached[1]
+        arrays = ScheduleArrays(conn.execute('''
+            SELECT id, schedule_minute, duration_seconds, priority, is_active, title, file_type
+            FROM schedules ORDER BY schedule_minute, id
+        ''').fetchall())
+    finally:
+        conn.close()
+    with _cache_lock:
+        _cache[path] = (version, arrays)
+    return version, arrays
+
+# 일 / 주 타임라인 (스케줄이 바뀌지 않으면 계산한 결과를 재사용)
+def get_timeline_view(offset_minutes, days=1, start_date=None):
+    """Return the TimelineView for ``days`` local days from ``start_date`` (cached per data version).
+
+    Schedules repeat daily, so the view only depends on the data version,
+    the time-zone offset and the number of days; ``start_date`` just keeps a
+    cached view from outliving the day it was built for.
+    """
+    version, arrays = get_schedule_arrays()
+    key = (get_db_path(), version, offset_minutes, days, start_date)
+    with _cache_lock:
+        view = _views.get(key)
+    if view is None:
+        view = TimelineView(arrays, offset_minutes, days)
+        with _cache_lock:
+            if len(_views) >= MAX_VIEWS:
+                _views.clear()
+            _views[key] = view
+    return view
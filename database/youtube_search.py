@@ -0,0 +1,161 @@
+# database/youtube_search.py
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from database.schedule_db import get_scheduled_video_ids
+from database.search_client import get_search_client
+
+# 여러 검색어를 동시에 검색할 때 쓰는 스레드 수 (프로세스 전체에서 공유)
+SEARCH_WORKERS = int(os.environ.get('SEARCH_WORKERS', '4'))
+# 한 번에 검색할 수 있는 최대 검색어 수
+MAX_QUERIES = 8
+
+# 정렬 기준
+SORT_KEYS = {
+    'relevance': None,
+    'duration': lambda v: v.get('duration_seconds') or 0,
+    'views': lambda v: v.get('views') or 0,
+    'channel': lambda v: v.get('channel', {}).get('name', '').lower(),
+}
+
+# "1:02:03" → 3723
+def parse_duration(text):
+    """Convert a ``H:MM:SS`` / ``M:SS`` length into seconds (None if unknown)"""
+    if not text or not re.match(r'^\d+(:\d{1,2}){0,2}$', text.strip()):
+        return None
+    seconds = 0
+    for part in text.strip().split(':'):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+# "1,234,567 views" / "조회수 1,234회" → 1234567
+def parse_views(text):
+    """Extract the full view count from a view-count text (None if unknown)"""
+    digits = re.sub(r'[^\d]', '', text or '')
+    return int(digits) if digits else None
+
+# scrapetube 검색 결과 한 건을 화면/API 에서 쓰는 형태로 변환
+def parse_video(video):
+    """Convert a raw scrapetube search item into the app's video dict (None if it has no id)"""
+    video_id = video.get('videoId')
+    if not video_id:
+        return None
+    return {
+        'title': video.get('title', {}).get('runs', [{}])[0].get('text', 'No Title'),
+        'link': f'https://www.youtube.com/watch?v={video_id}',
+        'videoId': video_id,
+        'thumbnails': [{'url': f'https://i.ytimg.com/vi/{video_id}/hqdefault.jpg'}],
+        'channel': {
+            'name': video.get('longBylineText', {}).get('runs', [{}])[0].get('text', 'Unknown')
+        },
+        'duration': video.get('lengthText', {}).get('simpleText', 'N/A'),
+        'duration_seconds': parse_duration(video.get('lengthText', {}).get('simpleText')),
+        'viewCount': {
+            'short': video.get('shortViewCountText', {}).get('simpleText', 'N/A')
+        },
+        'views': parse_views(video.get('viewCountText', {}).get('simpleText')),
+    }
+
+# YouTube 검색 (속도 제한 / 재시도 / 캐시를 거쳐 scrapetube 호출)
+def search_with_status(query, limit=10):
+    """Search YouTube and return (parsed video dicts, 'fresh' | 'cached' | 'stale').
+
+    Raises SearchUnavailable when YouTube cannot be reached and nothing is cached.
+    """
+    results, status = get_search_client().search(query, limit)
+    return list(results), status
+
+def search_videos(query, limit=10):
+    """Search YouTube and return parsed video dicts"""
+    return search_with_status(query, limit)[0]
+
+_search_pool = None
+_search_pool_lock = threading.Lock()
+
+def _get_search_pool():
+    global _search_pool
+    with _search_pool_lock:
+        if _search_pool is None:
+            _search_pool = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix='youtube-search')
+        return _search_pool
+
+# "요가, 음악; 뉴스" → ['요가', '음악', '뉴스']
+def split_queries(text):
+    """Split comma / semicolon / newline separated keywords, dropping blanks and repeats"""
+    queries = []
+    for part in re.split(r'[,;\n]', text or ''):
+        part = part.strip()
+        if part and part not in queries:
+            queries.append(part)
+    return queries[:MAX_QUERIES]
+
+# 여러 검색어 동시 검색
+def search_many(queries, limit=10):
+    """Search several queries concurrently and merge the results.
+
+    Each query is a separate scrapetube round trip, so they run on a shared,
+    bounded thread pool and the total wait is close to the slowest query.
+    Results are interleaved by rank (every query's best match first), deduped
+    by video id, and each video lists the ``queries`` that found it.
+    Returns (results, {query: error message}) so one failed query does not
+    hide the others.
+    """
+    futures = [(query, _get_search_pool().submit(search_videos, query, limit)) for query in queries]
+    per_query = []
+    errors = {}
+    for query, future in futures:
+        try:
+            per_query.append((query, future.result()))
+        except Exception as e:
+            errors[query] = str(e)
+
+    merged = {}
+    for rank in range(max((len(results) for _, results in per_query), default=0)):
+        for query, results in per_query:
+            if rank >= len(results):
+                continue
+            video = results[rank]
+            if video['videoId'] in merged:
+                if query not in merged[video['videoId']]['queries']:
+                    merged[video['videoId']]['queries'].append(query)
+            else:
+                merged[video['videoId']] = dict(video, queries=[query])
+    return list(merged.values()), errors
+
+# 검색 결과 정리 (중복 제거, 필터, 정렬)
+def process_results(results, hide_scheduled=False, min_seconds=None, max_seconds=None,
+                    channels=None, sort_by='relevance', descending=True):
+    """Dedupe, filter and sort parsed search results without another search.
+
+    Every result gets ``scheduled`` (already in the schedules table, looked up
+    with one indexed query); ``hide_scheduled`` drops those.
+    """
+    # 처음 나온 순서(관련도)대로 하나씩만 남김
+    seen = set()
+    unique = []
+    for video in results:
+        if video['videoId'] not in seen:
+            seen.add(video['videoId'])
+            unique.append(video)
+    scheduled = get_scheduled_video_ids(video['videoId'] for video in unique)
+
+    processed = []
+    for video in unique:
+        video = dict(video, scheduled=video['videoId'] in scheduled)
+        if hide_scheduled and video['scheduled']:
+            continue
+        seconds = video.get('duration_seconds')
+        if min_seconds is not None and (seconds is None or seconds < min_seconds):
+            continue
+        if max_seconds is not None and (seconds is None or seconds > max_seconds):
+            continue
+        if channels and video.get('channel', {}).get('name') not in channels:
+            continue
+        processed.append(video)
+
+    key = SORT_KEYS.get(sort_by)
+    if key is not None:
+        processed.sort(key=key, reverse=descending and sort_by != 'channel')
+    return processed
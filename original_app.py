@@ -1,6 +1,5 @@
 import streamlit as st
 import streamlit.components.v1 as components
-import sqlite3
 import pandas as pd
 from datetime import datetime, time
 import threading
@@ -22,6 +21,8 @@ from database.schedule_db import (
     clear_current_video,
     set_current_video,
     check_schedule_once)
+from database.conflicts import ScheduleConflict
+from database.scheduler import SchedulerEngine
 
 # 페이지 설정
 st.set_page_config(page_title="비디오 스케줄러", page_icon="🎬", layout="wide")
@@ -33,52 +34,9 @@ def extract_youtube_id(url):
     return match.group(1) if match else None
 
 
-# 비디오 재생 체크 (백그라운드)
+# 비디오 재생 체크 (백그라운드) - check_schedule_once 와 같은 스케줄러 엔진으로 매 분 확인
 def check_schedule():
-    while True:
-        try:
-            current_time = datetime.now().strftime("%H:%M")
-            conn = sqlite3.connect('video_schedule.db')
-            c = conn.cursor()
-            
-            # 현재 시간과 일치하는 활성화된 스케줄 찾기
-            c.execute('''
-                SELECT * FROM schedules 
-                WHERE schedule_time = ? AND is_active = 1
-            ''', (current_time,))
-            
-            schedules = c.fetchall()
-            
-            for schedule in schedules:
-                schedule_id, _, file_path, file_type, title, _, _, last_played = schedule
-                
-                # 같은 시간대에 이미 재생되었는지 확인 (last_played와 current_time 비교)
-                if last_played != current_time:
-                    # 재생 처리
-                    if file_type == 'youtube':
-                        # Use embedded player for Streamlit Cloud
-                        set_current_video(file_path, title)
-                    elif file_type == 'local':
-                        if os.path.exists(file_path):
-                            if os.name == 'nt':
-                                os.startfile(file_path)
-                            else:
-                                os.system(f'open "{file_path}"')
-                    elif file_type == "html":
-                        # Use embedded display for HTML files
-                        set_current_video(f'file://{os.path.abspath(file_path)}', title)
-                    
-                    # 데이터베이스에 재생 시간 업데이트
-                    c.execute('UPDATE schedules SET last_played = ? WHERE id = ?', (current_time, schedule_id))
-                    conn.commit()
-            
-            conn.close()
-            
-        except Exception as e:
-            print(f"스케줄 체크 오류: {e}")
-        
-        # 30초마다 체크
-        time_module.sleep(30)
+    SchedulerEngine(screen='background').run()
 
 # 세션 상태 초기화
 if 'scheduler_started' not in st.session_state:
@@ -248,11 +206,17 @@ with tab1:
                         with button_col1:
                             if st.button("✅ 스케줄 추가", key=f"add_schedule_{idx}", type="primary", use_container_width=True):
                                 if schedule_title and schedule_time_input:
-                                    add_schedule(schedule_time_input, video_url, "youtube", schedule_title)
-                                    st.success(f"✅ '{schedule_title}' 스케줄이 {schedule_time_input}에 추가되었습니다!")
-                                    st.session_state.selected_video = None
-                                    time_module.sleep(1)
-                                    st.rerun()
+                                    try:
+                                        add_schedule(schedule_time_input, video_url, "youtube", schedule_title)
+                                    except ScheduleConflict as e:
+                                        st.error(f"⚠️ 다른 스케줄 {len(e.conflicts)}개와 재생 시간이 겹쳐 추가하지 않았습니다.")
+                                    except ValueError:
+                                        st.error("⚠️ 시간을 HH:MM 형식으로 입력해주세요.")
+                                    else:
+                                        st.success(f"✅ '{schedule_title}' 스케줄이 {schedule_time_input}에 추가되었습니다!")
+                                        st.session_state.selected_video = None
+                                        time_module.sleep(1)
+                                        st.rerun()
                                 else:
                                     st.error("⚠️ 제목과 시간을 모두 입력해주세요.")
                         
@@ -298,9 +262,15 @@ with tab2:
                 st.warning("⚠️ 파일이 존재하지 않습니다. 경로를 확인해주세요.")
             
             if valid:
-                add_schedule(time_str, file_path, f_type, title)
-                st.success(f"✅ '{title}' 스케줄이 {time_str}에 추가되었습니다!")
-                st.rerun()
+                try:
+                    add_schedule(time_str, file_path, f_type, title)
+                except ScheduleConflict as e:
+                    st.error(f"⚠️ 다른 스케줄 {len(e.conflicts)}개와 재생 시간이 겹쳐 추가하지 않았습니다.")
+                except ValueError:
+                    st.error("⚠️ 시간을 HH:MM 형식으로 입력해주세요.")
+                else:
+                    st.success(f"✅ '{title}' 스케줄이 {time_str}에 추가되었습니다!")
+                    st.rerun()
         else:
             st.error("⚠️ 제목과 파일 경로를 모두 입력해주세요.")
 
@@ -347,10 +317,16 @@ with tab3:
                                 st.warning("⚠️ 파일이 존재하지 않습니다. 경로를 확인해주세요.")
                             
                             if valid:
-                                update_schedule(row['id'], edit_time, edit_file_path, f_type, edit_title)
-                                st.session_state.editing_id = None
-                                st.success(f"✅ '{edit_title}' 스케줄이 수정되었습니다!")
-                                st.rerun()
+                                try:
+                                    update_schedule(row['id'], edit_time, edit_file_path, f_type, edit_title)
+                                except ScheduleConflict as e:
+                                    st.error(f"⚠️ 다른 스케줄 {len(e.conflicts)}개와 재생 시간이 겹쳐 수정하지 않았습니다.")
+                                except ValueError:
+                                    st.error("⚠️ 시간을 HH:MM 형식으로 입력해주세요.")
+                                else:
+                                    st.session_state.editing_id = None
+                                    st.success(f"✅ '{edit_title}' 스케줄이 수정되었습니다!")
+                                    st.rerun()
                     
                     with btn_col2:
                         if st.button("❌ 취소", key=f"cancel_{row['id']}", use_container_width=True):
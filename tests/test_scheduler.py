@@ -0,0 +1,80 @@
+# tests/test_scheduler.py
+import threading
+import time as time_module
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import connection, play_history
+from database.connection import get_connection, use_tenant
+from database.play_history import flush_play_history
+from database.schedule_db import add_schedule, init_db
+from database.scheduler import FakeClock, MinuteTick, NextDueTick, SchedulerEngine, SqliteStorage
+
+TENANT = 'scheduler-test'
+START = datetime(2000, 1, 1)
+
+@pytest.fixture
+def tenant_db(tmp_path, monkeypatch):
+    # 테넌트 데이터베이스를 임시 폴더에 만듦
+    monkeypatch.setattr(connection, 'TENANT_DIR', str(tmp_path))
+    # 쓰기 스레드가 모든 테넌트 (작업 폴더의 기본 데이터베이스 포함) 를 압축하지 않도록 (되돌리지 않음)
+    play_history._last_compact = time_module.time()
+    with use_tenant(TENANT):
+        init_db()
+        yield TENANT
+        # 쓰기 스레드가 임시 폴더를 되돌린 뒤에 기록하지 않도록 먼저 기록
+        flush_play_history()
+
+def run_engines(tenant, count, hours, tick=MinuteTick, policy='preempt'):
+    played = []
+    lock = threading.Lock()
+
+    def dispatcher(schedule):
+        with lock:
+            played.append(schedule.id)
+
+    until = START + timedelta(hours=hours)
+    threads = []
+    for n in range(count):
+        # 엔진마다 시작 시각을 조금씩 어긋나게
+        engine = SchedulerEngine(SqliteStorage(tenant), FakeClock(START + timedelta(seconds=7 * n)),
+                                 dispatchers=[dispatcher], tick=tick(), screen=f'engine-{n}', policy=policy)
+        threads.append(threading.Thread(target=engine.run, kwargs={'until': until}))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return played
+
+@pytest.mark.parametrize('tick', [MinuteTick, NextDueTick])
+def test_engines_sharing_a_database_fire_each_schedule_once(tenant_db, tick):
+    ids = [add_schedule(f'{minute // 60:02d}:{minute % 60:02d}', f'/v/{minute}.mp4', 'local', f'v{minute}')
+           for minute in range(5, 120, 7)]
+
+    played = run_engines(tenant_db, count=4, hours=2, tick=tick)
+    assert sorted(played) == sorted(ids)
+
+    flush_play_history()
+    conn = get_connection(tenant_db)
+    try:
+        fires = conn.execute('SELECT schedule_id, COUNT(*) FROM play_history GROUP BY schedule_id').fetchall()
+        last_played = conn.execute('SELECT COUNT(*) FROM schedules WHERE last_played_at IS NULL').fetchone()[0]
+    finally:
+        conn.close()
+    assert sorted(fires) == [(schedule_id, 1) for schedule_id in sorted(ids)]
+    assert last_played == 0
+
+def test_priority_policy_only_claims_the_highest_priority(tenant_db):
+    low = add_schedule('00:10', '/v/low.mp4', 'local', 'low', priority=1)
+    high = add_schedule('00:10', '/v/high.mp4', 'local', 'high', priority=5)
+
+    played = run_engines(tenant_db, count=3, hours=1, policy='priority')
+    assert played == [high]
+
+    conn = get_connection(tenant_db)
+    try:
+        unclaimed = conn.execute('SELECT last_played_at FROM schedules WHERE id = ?', (low,)).fetchone()[0]
+    finally:
+        conn.close()
+    assert unclaimed is None
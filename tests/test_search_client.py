@@ -0,0 +1,119 @@
+# tests/test_search_client.py
+import threading
+import time as time_module
+
+import pytest
+
+from database.search_client import (
+    CircuitBreaker,
+    FakeSearchServer,
+    SearchClient,
+    SearchUnavailable,
+    TokenBucket,
+    http_fetch)
+
+def make_client(fetch, **kwargs):
+    kwargs.setdefault('bucket', TokenBucket(rate=1000, capacity=1000))
+    kwargs.setdefault('timeout', 2.0)
+    kwargs.setdefault('sleep', lambda seconds: None)
+    return SearchClient(fetch, **kwargs)
+
+@pytest.fixture
+def server():
+    with FakeSearchServer() as server:
+        yield server
+
+def test_retries_until_the_backend_answers(server):
+    fetch = http_fetch(server.url)
+    calls = []
+
+    def flaky(query, limit):
+        calls.append(query)
+        if len(calls) < 3:
+            raise ConnectionError('reset by peer')
+        return fetch(query, limit)
+
+    results, status = make_client(flaky, retries=3).search('cats', 3)
+    assert status == 'fresh'
+    assert [video['title'] for video in results] == ['cats #1', 'cats #2', 'cats #3']
+    assert len(calls) == 3
+    assert server.requests == 1
+
+def test_breaker_opens_then_recovers_after_a_trial(server):
+    server.fail_rate = 1.0
+    breaker = CircuitBreaker(threshold=2, reset_timeout=0.2)
+    client = make_client(http_fetch(server.url), breaker=breaker, retries=0, cache_ttl=0)
+    for _ in range(2):
+        with pytest.raises(SearchUnavailable):
+            client.search('dogs')
+    assert breaker.state == 'open'
+
+    # 열린 동안은 백엔드에 요청하지 않음
+    requests = server.requests
+    with pytest.raises(SearchUnavailable):
+        client.search('dogs')
+    assert server.requests == requests
+
+    server.fail_rate = 0.0
+    time_module.sleep(0.25)
+    assert breaker.state == 'half-open'
+    _, status = client.search('dogs')
+    assert status == 'fresh'
+    assert breaker.state == 'closed'
+
+def test_serves_stale_results_when_the_backend_fails(server):
+    client = make_client(http_fetch(server.url), retries=1, cache_ttl=0, stale_ttl=60)
+    fresh, status = client.search('birds', 2)
+    assert status == 'fresh'
+
+    server.fail_rate = 1.0
+    stale, status = client.search('birds', 2)
+    assert status == 'stale'
+    assert stale == fresh
+
+    # 캐시에 없는 검색은 그대로 실패
+    with pytest.raises(SearchUnavailable):
+        client.search('fish', 2)
+
+def test_identical_searches_share_one_request(server):
+    server.delay = 0.3
+    client = make_client(http_fetch(server.url), cache_ttl=0)
+    outcomes = []
+
+    def search():
+        outcomes.append(client.search('Trains', 4))
+
+    threads = [threading.Thread(target=search) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert server.requests == 1
+    assert len(outcomes) == 6
+    assert all(results == outcomes[0][0] for results, _ in outcomes)
+
+def test_hung_fetches_do_not_block_the_breaker_trial(server):
+    release = threading.Event()
+
+    def hang(query, limit):
+        # scrapetube 처럼 시간 제한 없이 멈춘 요청
+        release.wait()
+        return []
+
+    breaker = CircuitBreaker(threshold=2, reset_timeout=0.2)
+    client = make_client(hang, breaker=breaker, retries=0, timeout=0.05, cache_ttl=0, max_running=2)
+    try:
+        for query in ('a', 'b'):
+            with pytest.raises(SearchUnavailable, match='timed out'):
+                client.search(query)
+        assert breaker.state == 'open'
+        assert client.running == 2
+
+        # 멈춘 요청이 남아 있어도 시험 요청은 새 스레드에서 실행됨
+        client.fetch = http_fetch(server.url)
+        time_module.sleep(0.25)
+        _, status = client.search('c')
+        assert status == 'fresh'
+        assert breaker.state == 'closed'
+    finally:
+        release.set()